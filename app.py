@@ -1,16 +1,32 @@
-from flask import Flask, render_template, request, send_file, jsonify, send_from_directory
+from flask import Flask, Request, render_template, request, send_file, jsonify, send_from_directory, Response
 import os
 import logging
 import shutil
 from datetime import datetime
-from scripts.convert_to_3d import create_3d_model
+from scripts.convert_to_3d import create_3d_model, create_sheet_models
+from scripts.compress_glb import compressed_path
+from scripts.job_bundle import save_job, load_job, bundle_layout, stream_bundle
+from scripts.lazy_artifacts import ensure_artifact
+from scripts.upload_ingest import IngestStream, HeaderStream, UploadRejected
+from scripts.validate_image import validate_image_stream
+from scripts.phash_index import PHASH_CONFIG, image_hashes, get_index
 from werkzeug.utils import secure_filename
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+class IngestRequest(Request):
+    """Stream uploaded files to disk chunk by chunk instead of buffering them."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Validation only needs the image headers, so nothing is written to disk
+        if self.endpoint in ('validate_image', 'validate_images'):
+            return HeaderStream(max_bytes=app.config['MAX_CONTENT_LENGTH'])
+        return IngestStream(UPLOAD_FOLDER, app.config['MAX_CONTENT_LENGTH'])
+
 app = Flask(__name__)
+app.request_class = IngestRequest
 
 # Configure absolute paths
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -50,9 +66,26 @@ def serve_upload(filename):
         logger.error(f"File not found at {full_path}")
         return "File not found", 404
 
+def accepts_meshopt():
+    """Check whether the client advertised EXT_meshopt_compression support."""
+    return 'meshopt' in request.headers.get('X-Mesh-Compression', '').lower() or \
+           request.args.get('meshopt') == '1'
+
 @app.route('/output/<filename>')
 def serve_output(filename):
     logger.debug(f"Serving output file: {filename}")
+    ensure_artifact(OUTPUT_FOLDER, filename)
+    if filename.endswith('.glb') and accepts_meshopt():
+        compressed_filename = compressed_path(filename)
+        compressed_file = os.path.join(OUTPUT_FOLDER, compressed_filename)
+        # Variants written before larger ones were skipped can still be on disk
+        source_file = os.path.join(OUTPUT_FOLDER, filename)
+        if os.path.exists(compressed_file) and os.path.exists(source_file) and \
+                os.path.getsize(compressed_file) < os.path.getsize(source_file):
+            logger.debug(f"Serving compressed variant: {compressed_filename}")
+            response = send_from_directory(OUTPUT_FOLDER, compressed_filename)
+            response.headers['Vary'] = 'X-Mesh-Compression'
+            return response
     return send_from_directory(OUTPUT_FOLDER, filename)
 
 def allowed_file(filename):
@@ -63,6 +96,43 @@ def allowed_file(filename):
 def index():
     return render_template('upload.html')
 
+def job_output_urls(base_url, job_id, files):
+    """Public URLs of a job's files, plus a bundle URL once the job is saved for bundling."""
+    output_urls = {}
+    for file_type, file_path in files.items():
+        output_urls[file_type] = f"{base_url}/outputs/{os.path.basename(file_path)}"
+
+    # Remember the job's artifacts so they can be fetched as one bundle
+    if job_id:
+        save_job(OUTPUT_FOLDER, secure_filename(job_id), files)
+        output_urls['bundle'] = f"{base_url}/api/jobs/{job_id}/bundle.zip"
+    return output_urls
+
+def similar_jobs(base_url, hashes, is_outfit, outfit_type):
+    """
+    Earlier jobs whose upload is within the near-duplicate radius, was
+    processed with the same outfit settings, and whose artifacts are still listed.
+    """
+    matches = []
+    for entry in get_index(OUTPUT_FOLDER).search(hashes):
+        if entry.get('isOutfit') != is_outfit or (is_outfit and entry.get('outfitType') != outfit_type):
+            continue
+        job = load_job(OUTPUT_FOLDER, secure_filename(entry['job_id'])) if entry.get('job_id') else None
+        if job is None:
+            continue
+        outputs = job_output_urls(base_url, None, job['files'])
+        outputs['bundle'] = f"{base_url}/api/jobs/{entry['job_id']}/bundle.zip"
+        matches.append({
+            'jobId': entry['job_id'],
+            'file': entry.get('file'),
+            'distance': entry['distance'],
+            'exact': entry.get('sha256') == hashes.get('sha256'),
+            'isOutfit': entry.get('isOutfit'),
+            'outfitType': entry.get('outfitType'),
+            'outputs': outputs
+        })
+    return matches
+
 @app.route('/api/convert', methods=['POST'])
 def convert():
     try:
@@ -83,17 +153,40 @@ def convert():
         # Get additional parameters
         is_outfit = request.form.get('isOutfit', 'false').lower() == 'true'
         outfit_type = request.form.get('outfitType', None)
+        symmetry = request.form.get('symmetry', None)  # Optional override; detected on the server when unset
+        remove_background = request.form.get('removeBackground')  # Unset: server default
+        crop_subject = request.form.get('cropSubject')  # Unset: server default
+        split_items = request.form.get('splitItems', 'false').lower() == 'true'  # One job per item on a sheet
+        allow_duplicate = request.form.get('allowDuplicate', 'false').lower() == 'true'  # Convert despite a prior result
 
         # Secure the filename
         filename = secure_filename(file.filename)
         
-        # Save uploaded file
+        # Move the already-received upload into place
         upload_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(upload_path)
+        upload_info = file.stream.finalize(upload_path)
+        logger.info(f"Received {filename}: {upload_info['format']} {upload_info['width']}x{upload_info['height']}, "
+                    f"{upload_info['size']} bytes, sha256 {upload_info['sha256']}")
         
         # Set correct permissions for the uploaded file
         os.chmod(upload_path, 0o644)
 
+        # Offer an earlier result for a near-duplicate before spending an MPX job on it
+        base_url = f"http://{request.host}"
+        try:
+            upload_info.update(image_hashes(upload_path))
+        except Exception as e:
+            logger.error(f"Perceptual hashing failed for {filename}: {str(e)}")
+        if PHASH_CONFIG['check_uploads'] and not allow_duplicate and 'dhash' in upload_info:
+            matches = similar_jobs(base_url, upload_info, is_outfit, outfit_type)
+            if matches:
+                logger.info(f"{filename} is a near-duplicate of {', '.join(m['jobId'] for m in matches)}")
+                return jsonify({
+                    'success': False,
+                    'message': 'A similar image was already converted; resend with allowDuplicate=true to convert anyway',
+                    'matches': matches
+                }), 409
+
         # Generate output filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
         base_name = os.path.splitext(filename)[0]
@@ -102,31 +195,78 @@ def convert():
         # Convert to 3D
         params = {
             'isOutfit': is_outfit,
-            'outfitType': outfit_type
+            'outfitType': outfit_type,
+            'symmetry': symmetry,
+            'removeBackground': remove_background.lower() == 'true' if remove_background is not None else None,
+            'cropSubject': crop_subject.lower() == 'true' if crop_subject is not None else None,
+            'upload': upload_info
         }
-        result = create_3d_model(params, upload_path, output_path)
+        if split_items:
+            result = create_sheet_models(params, upload_path, output_path)
+        else:
+            result = create_3d_model(params, upload_path, output_path)
 
         if not result['success']:
+            if 'quality' in result:
+                return jsonify({
+                    'success': False,
+                    'message': result['error'],
+                    'quality': result['quality']
+                }), 422
             return jsonify({
                 'success': False,
                 'message': f"Conversion failed: {result.get('error', 'Unknown error')}"
             }), 500
 
+        # Index the upload so later near-duplicates are offered this result
+        if 'dhash' in upload_info:
+            try:
+                get_index(OUTPUT_FOLDER).add({
+                    'phash': upload_info['phash'],
+                    'dhash': upload_info['dhash'],
+                    'color': upload_info['color'],
+                    'sha256': upload_info['sha256'],
+                    'file': filename,
+                    'job_id': result.get('parentId') or result.get('requestId'),
+                    'isOutfit': is_outfit,
+                    'outfitType': outfit_type
+                })
+            except OSError as e:
+                logger.error(f"Could not index {filename}: {str(e)}")
+
         # Generate URLs for all output files
-        base_url = f"http://{request.host}"
-        output_urls = {}
-        
-        for file_type, file_path in result['files'].items():
-            relative_path = os.path.relpath(file_path, start=os.path.dirname(OUTPUT_FOLDER))
-            output_urls[file_type] = f"{base_url}/outputs/{os.path.basename(file_path)}"
+        if 'parentId' in result:
+            # Items are reported one by one; the parent bundle holds every item's artifacts
+            items = [{
+                'index': item['index'],
+                'success': item['success'],
+                'requestId': item.get('requestId'),
+                'outputs': job_output_urls(base_url, item.get('requestId'), item.get('files', {})),
+                'message': item.get('error')
+            } for item in result['items']]
+            return jsonify({
+                'success': True,
+                'message': f"Converted {sum(item['success'] for item in items)} of {len(items)} items",
+                'parentId': result['parentId'],
+                'outputs': job_output_urls(base_url, result['parentId'], result['files']),
+                'items': items
+            })
+
+        request_id = result.get('requestId')
+        output_urls = job_output_urls(base_url, request_id, result['files'])
 
         return jsonify({
             'success': True,
             'message': 'Conversion completed successfully',
             'outputs': output_urls,
-            'requestId': result.get('requestId')
+            'requestId': request_id
         })
 
+    except UploadRejected as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), e.status
     except Exception as e:
         app.logger.error(f"Error in /api/convert: {str(e)}")
         return jsonify({
@@ -136,11 +276,53 @@ def convert():
 
 @app.route('/download/<filename>')
 def download(filename):
+    ensure_artifact(OUTPUT_FOLDER, filename)
     return send_file(
         os.path.join(OUTPUT_FOLDER, filename),
         as_attachment=True
     )
 
+@app.route('/api/jobs/<job_id>/bundle.zip')
+def job_bundle(job_id):
+    """
+    Stream a ZIP of a job's artifacts, optionally limited with ?files=glb,fbx_roblox.
+
+    The archive is generated on the fly from a precomputed layout, so Range
+    requests resume a download without building the archive anywhere.
+    """
+    selected = [f for f in request.args.get('files', '').split(',') if f] or None
+    job = load_job(OUTPUT_FOLDER, secure_filename(job_id))
+    for file_type, filename in (job or {}).get('files', {}).items():
+        if not selected or file_type in selected:
+            ensure_artifact(OUTPUT_FOLDER, filename)
+    try:
+        layout = bundle_layout(OUTPUT_FOLDER, secure_filename(job_id), selected)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 413
+    if layout is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    segments, total_size, etag = layout
+
+    status, start, end = 200, 0, total_size - 1
+    byte_range = request.range
+    if_range = request.headers.get('If-Range')
+    if byte_range and (not if_range or if_range.strip('"') == etag):
+        span = byte_range.range_for_length(total_size)
+        if span is None:
+            return Response(status=416, headers={'Content-Range': f"bytes */{total_size}"})
+        status, (start, end) = 206, (span[0], span[1] - 1)
+
+    headers = {
+        'Content-Length': str(end - start + 1),
+        'Content-Disposition': f'attachment; filename="{secure_filename(job_id)}.zip"',
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"'
+    }
+    if status == 206:
+        headers['Content-Range'] = f"bytes {start}-{end}/{total_size}"
+    logger.debug(f"Streaming bundle {job_id}: bytes {start}-{end} of {total_size}")
+    return Response(stream_bundle(segments, start, end), status=status, headers=headers, mimetype='application/zip')
+
 @app.route('/api/validate-image', methods=['POST'])
 def validate_image():
     if 'file' not in request.files:
@@ -157,22 +339,43 @@ def validate_image():
             'message': 'No file selected'
         }), 400
     
-    if not allowed_file(file.filename):
+    result = validate_image_stream(file.stream, file.stream.size)
+    return jsonify(result), 200 if result['success'] else 400
+
+@app.route('/api/validate-images', methods=['POST'])
+def validate_images():
+    """Validate every uploaded 'files' part from its headers in one call."""
+    files = request.files.getlist('files')
+    if not files:
         return jsonify({
             'success': False,
-            'message': 'Invalid file type. Please upload a PNG or JPG image.'
+            'message': 'No files provided'
         }), 400
-    
-    # If validation passes
+
+    results = []
+    for file in files:
+        result = validate_image_stream(file.stream, file.stream.size)
+        result['filename'] = file.filename
+        results.append(result)
+
     return jsonify({
-        'success': True,
-        'message': 'File is valid'
+        'success': all(result['success'] for result in results),
+        'valid': sum(1 for result in results if result['success']),
+        'invalid': sum(1 for result in results if not result['success']),
+        'results': results
     })
 
+@app.errorhandler(UploadRejected)
+def upload_rejected(e):
+    return jsonify({
+        'success': False,
+        'message': str(e)
+    }), e.status
+
 @app.before_request
 def log_request_info():
     logger.debug('Headers: %s', request.headers)
-    logger.debug('Body: %s', request.get_data())
+    logger.debug('Body: %s, %s bytes', request.content_type, request.content_length)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -48,6 +48,7 @@ interface ModelUrls {
   fbx_roblox?: string;
   usdz?: string;
   thumbnail?: string;
+  lods?: string;
   [key: string]: string | undefined;
 }
 
@@ -278,6 +279,7 @@ interface ResultsSectionProps {
     fbx_roblox?: string;
     usdz?: string;
     thumbnail?: string;
+    lods?: string;
   };
   conversionId: string;
   onNewConversion: () => void;
@@ -323,6 +325,7 @@ const ResultsSection: React.FC<ResultsSectionProps> = ({
         {modelUrls.glb && (
           <ModelViewer 
             modelUrl={modelUrls.glb}
+            lodManifestUrl={modelUrls.lods}
             conversionId={conversionId}
           />
         )}
@@ -1,15 +1,23 @@
 'use client';
 
-import React, { useRef, useState, useEffect } from 'react';
+import React, { useRef, useState, useEffect, Suspense } from 'react';
 import { Canvas } from '@react-three/fiber';
 import { OrbitControls, useGLTF, useProgress } from '@react-three/drei';
 import { Box, CircularProgress, Typography, LinearProgress } from '@mui/material';
 
 interface ModelViewerProps {
   modelUrl: string | null;
+  lodManifestUrl?: string | null;
   conversionId?: string | null;
 }
 
+interface LodManifest {
+  levels: { name: string; file: string; triangles: number; bytes: number }[];
+}
+
+// Lets the server pick the meshopt-compressed variant; drei registers the decoder
+const withMeshopt = (url: string) => `${url}${url.includes('?') ? '&' : '?'}meshopt=1`;
+
 function Model({ url }: { url: string }) {
   const { scene } = useGLTF(url);
   
@@ -29,11 +37,42 @@ function Model({ url }: { url: string }) {
   return <primitive object={scene} />;
 }
 
+function LodLevel({ url, visible, onLoaded }: { url: string; visible: boolean; onLoaded: () => void }) {
+  const { scene } = useGLTF(url);
+
+  useEffect(() => {
+    onLoaded();
+  }, [url]);
+
+  return <primitive object={scene} visible={visible} />;
+}
+
+// Shows the coarsest level first and swaps in each finer level once it has loaded
+function ProgressiveModel({ urls }: { urls: string[] }) {
+  const [level, setLevel] = useState(0);
+
+  return (
+    <>
+      {urls.map((url, index) => (index === level || index === level + 1) && (
+        <Suspense key={url} fallback={null}>
+          <LodLevel
+            url={url}
+            visible={index === level}
+            onLoaded={() => setLevel(current => Math.max(current, index))}
+          />
+        </Suspense>
+      ))}
+    </>
+  );
+}
+
 const ModelViewer: React.FC<ModelViewerProps> = ({ 
   modelUrl, 
+  lodManifestUrl,
   conversionId
 }) => {
   const [loading, setLoading] = useState(true);
+  const [lodUrls, setLodUrls] = useState<string[] | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [key, setKey] = useState(0);
   const { progress, errors } = useProgress();
@@ -47,7 +86,7 @@ const ModelViewer: React.FC<ModelViewerProps> = ({
       
       try {
         // Preload the model
-        useGLTF.preload(modelUrl);
+        useGLTF.preload(withMeshopt(modelUrl));
       } catch (error) {
         const errorMessage = error instanceof Error ? error.message : 'Unknown error occurred';
         console.error('Error loading model:', errorMessage);
@@ -57,6 +96,22 @@ const ModelViewer: React.FC<ModelViewerProps> = ({
     }
   }, [modelUrl, conversionId]);
 
+  // Fetch the LOD manifest so the coarse mesh can be shown right away
+  useEffect(() => {
+    setLodUrls(null);
+    if (!lodManifestUrl) {
+      return;
+    }
+
+    fetch(lodManifestUrl)
+      .then(response => response.ok ? response.json() : Promise.reject(response.statusText))
+      .then((manifest: LodManifest) => {
+        const baseUrl = lodManifestUrl.substring(0, lodManifestUrl.lastIndexOf('/') + 1);
+        setLodUrls(manifest.levels.map(level => withMeshopt(baseUrl + level.file)));
+      })
+      .catch(err => console.warn('LOD manifest unavailable, loading full model:', err));
+  }, [lodManifestUrl]);
+
   // Handle progress and errors
   useEffect(() => {
     if (errors.length > 0) {
@@ -89,7 +144,7 @@ const ModelViewer: React.FC<ModelViewerProps> = ({
     );
   }
 
-  if (loading) {
+  if (loading && !lodUrls) {
     return (
       <div style={containerStyle}>
         <CircularProgress size={40} />
@@ -122,7 +177,11 @@ const ModelViewer: React.FC<ModelViewerProps> = ({
         <ambientLight intensity={0.5} />
         <spotLight position={[10, 10, 10]} angle={0.15} penumbra={1} />
         <pointLight position={[-10, -10, -10]} />
-        <Model url={modelUrl} />
+        {lodUrls ? (
+          <ProgressiveModel urls={lodUrls} />
+        ) : (
+          <Model url={withMeshopt(modelUrl)} />
+        )}
         <OrbitControls />
       </Canvas>
     </div>
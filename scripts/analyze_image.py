@@ -3,37 +3,55 @@ import numpy as np
 import sys
 import json
 import os
+import time
 import logging
+import argparse
 from datetime import datetime
+from PIL import Image
 
 # Setup logging with absolute path
 LOG_DIR = '/home/mml_admin/2dto3d/logs'
 LOG_FILE = os.path.join(LOG_DIR, 'opencv_analysis.log')
 
-print(f"Setting up logging to: {LOG_FILE}")  # Debug print
-
-try:
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
-        print(f"Created log directory: {LOG_DIR}")
-except Exception as e:
-    print(f"Error creating log directory: {e}")
-
-try:
-    logging.basicConfig(
-        level=logging.DEBUG,  # Changed to DEBUG for more verbose logging
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOG_FILE),
-            logging.StreamHandler()
-        ]
-    )
-    print("Logging configured successfully")
-except Exception as e:
-    print(f"Error configuring logging: {e}")
+def setup_logging():
+    """File and console logging for command line runs; importers keep their own configuration"""
+    print(f"Setting up logging to: {LOG_FILE}")  # Debug print
+
+    try:
+        if not os.path.exists(LOG_DIR):
+            os.makedirs(LOG_DIR)
+            print(f"Created log directory: {LOG_DIR}")
+    except Exception as e:
+        print(f"Error creating log directory: {e}")
+
+    try:
+        logging.basicConfig(
+            level=logging.DEBUG,  # Changed to DEBUG for more verbose logging
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(LOG_FILE),
+                logging.StreamHandler()
+            ]
+        )
+        print("Logging configured successfully")
+    except Exception as e:
+        print(f"Error configuring logging: {e}")
 
 logger = logging.getLogger(__name__)
 
+# The metrics are coarse, so analysis runs on a reduced decode and is rescaled to original pixels
+ANALYSIS_CONFIG = {
+    'max_side': int(os.getenv('ANALYZE_MAX_SIDE', '1024')),   # Smallest longer side the reduced decode keeps
+    'debug_images': os.getenv('ANALYZE_DEBUG_IMAGES', '0') == '1'
+}
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
 def check_dependencies():
     try:
         import cv2
@@ -46,7 +64,39 @@ def check_dependencies():
         }))
         return False
 
-def analyze_image(image_path):
+def find_main_contour(gray, subject_dark=False):
+    """Threshold a grayscale image and return its largest external contour, all contours and the mask"""
+    mode = cv2.THRESH_BINARY_INV if subject_dark else cv2.THRESH_BINARY
+    _, thresh = cv2.threshold(gray, 127, 255, mode)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, contours, thresh
+    return max(contours, key=cv2.contourArea), contours, thresh
+
+def find_subject_contour(gray):
+    """Largest subject contour, all contours and the mask, flipping the threshold on a light backdrop"""
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    return find_main_contour(gray, subject_dark=border.mean() > 127)
+
+def load_reduced(image_path, max_side=None):
+    """
+    Decode an image at the largest 1/2, 1/4 or 1/8 reduction whose longer
+    side stays at max_side or above. JPEGs are scaled inside the DCT, so the
+    full-size bitmap is never built. Returns the image and the factor from
+    reduced to original pixels.
+    """
+    max_side = max_side or ANALYSIS_CONFIG['max_side']
+    with Image.open(image_path) as probe:
+        original_side = max(probe.size)
+    factor = 1
+    while factor < 8 and original_side / (factor * 2) >= max_side:
+        factor *= 2
+    img = cv2.imread(image_path, REDUCED_FLAGS[factor])
+    if img is None:
+        return None, 1.0
+    return img, original_side / max(img.shape[:2])
+
+def analyze_image(image_path, full_resolution=False, debug_images=None):
     """Analyze image using OpenCV to determine object characteristics"""
     try:
         logger.info("="*50)
@@ -57,34 +107,33 @@ def analyze_image(image_path):
             logger.error(f"Image file does not exist: {image_path}")
             raise FileNotFoundError(f"Image not found: {image_path}")
         
-        # Read image
-        img = cv2.imread(image_path)
+        # Read image, reduced unless the full-resolution path is asked for
+        if full_resolution:
+            img, scale = cv2.imread(image_path), 1.0
+        else:
+            img, scale = load_reduced(image_path)
         if img is None:
             logger.error(f"Could not read image: {image_path}")
             raise Exception("Could not read image")
         
-        logger.info(f"Image loaded successfully. Size: {img.shape}")
+        logger.info(f"Image loaded successfully. Size: {img.shape}, scale to original: {scale:.3f}")
         
         # Convert to grayscale
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # Get contours
-        _, thresh = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Get contours and the largest one
+        main_contour, contours, thresh = find_main_contour(gray)
         
-        if not contours:
+        if main_contour is None:
             logger.error("No contours found in image")
             raise Exception("No contours found in image")
         
         logger.info(f"Found {len(contours)} contours")
         
-        # Get the largest contour
-        main_contour = max(contours, key=cv2.contourArea)
-        
-        # Calculate properties
-        area = cv2.contourArea(main_contour)
-        perimeter = cv2.arcLength(main_contour, True)
-        x, y, w, h = cv2.boundingRect(main_contour)
+        # Calculate properties in original pixels
+        area = cv2.contourArea(main_contour) * scale * scale
+        perimeter = cv2.arcLength(main_contour, True) * scale
+        x, y, w, h = (round(v * scale) for v in cv2.boundingRect(main_contour))
         
         logger.info(f"Main contour properties - Area: {area}, Perimeter: {perimeter}, Width: {w}, Height: {h}")
         
@@ -95,10 +144,11 @@ def analyze_image(image_path):
         shape_type = "cylindrical" if 0.6 < h/w < 1.8 and circularity > 0.6 else "irregular"
         logger.info(f"Detected shape type: {shape_type} (circularity: {circularity:.2f})")
         
-        # Calculate average color
-        mask = np.zeros(img.shape[:2], dtype=np.uint8)
-        cv2.drawContours(mask, [main_contour], -1, (255), -1)
-        average_color = cv2.mean(img, mask=mask)[:3]
+        # Calculate average color inside the contour, masking only its bounding box
+        bx, by, bw, bh = cv2.boundingRect(main_contour)
+        mask = np.zeros((bh, bw), dtype=np.uint8)
+        cv2.drawContours(mask, [main_contour], -1, (255), -1, offset=(-bx, -by))
+        average_color = cv2.mean(img[by:by + bh, bx:bx + bw], mask=mask)[:3]
         
         # Analyze symmetry
         symmetry = "symmetric" if analyze_symmetry(gray, main_contour) else "asymmetric"
@@ -120,15 +170,20 @@ def analyze_image(image_path):
                 "type": shape_type,
                 "circularity": circularity,
                 "symmetry": symmetry
+            },
+            "analysis": {
+                "size": [img.shape[1], img.shape[0]],
+                "scale": scale
             }
         }
         
-        # Save debug images
-        debug_dir = os.path.join(os.path.dirname(image_path), 'debug')
-        if not os.path.exists(debug_dir):
-            os.makedirs(debug_dir)
-            
-        cv2.imwrite(os.path.join(debug_dir, 'contours.png'), thresh)
+        # Save debug images when asked for
+        if ANALYSIS_CONFIG['debug_images'] if debug_images is None else debug_images:
+            debug_dir = os.path.join(os.path.dirname(image_path), 'debug')
+            if not os.path.exists(debug_dir):
+                os.makedirs(debug_dir)
+                
+            cv2.imwrite(os.path.join(debug_dir, 'contours.png'), thresh)
         
         logger.info("Analysis completed successfully")
         logger.info(f"Analysis results: {json.dumps(analysis, indent=2)}")
@@ -180,16 +235,73 @@ def generate_3d_prompt(analysis):
     
     return prompt.strip()
 
+def benchmark_analysis(image_paths):
+    """
+    Compare the reduced and full-resolution paths on a set of images.
+
+    Reports the time of each path and the drift of the reduced metrics:
+    relative error of the dimensions and circularity, color distance, and
+    whether the shape type and symmetry verdicts still agree.
+    """
+    results = []
+    for image_path in image_paths:
+        start_time = time.time()
+        full = analyze_image(image_path, full_resolution=True, debug_images=False)
+        full_time = time.time() - start_time
+        start_time = time.time()
+        fast = analyze_image(image_path, debug_images=False)
+        fast_time = time.time() - start_time
+
+        def drift(section, key):
+            reference = full[section][key]
+            return abs(fast[section][key] - reference) / reference if reference else 0.0
+
+        results.append({
+            'file': os.path.basename(image_path),
+            'scale': fast['analysis']['scale'],
+            'full_time_s': round(full_time, 4),
+            'fast_time_s': round(fast_time, 4),
+            'width_drift': round(drift('dimensions', 'width'), 4),
+            'height_drift': round(drift('dimensions', 'height'), 4),
+            'aspect_ratio_drift': round(drift('dimensions', 'aspect_ratio'), 4),
+            'circularity_drift': round(drift('shape', 'circularity'), 4),
+            'color_distance': max(abs(a - b) for a, b in zip(fast['color']['average_rgb'], full['color']['average_rgb'])),
+            'same_type': fast['shape']['type'] == full['shape']['type'],
+            'same_symmetry': fast['shape']['symmetry'] == full['shape']['symmetry']
+        })
+
+    summary = {'images': len(results)}
+    if results:
+        summary.update({
+            'speedup': round(sum(r['full_time_s'] for r in results) / max(sum(r['fast_time_s'] for r in results), 1e-9), 2),
+            'max_dimension_drift': max(max(r['width_drift'], r['height_drift']) for r in results),
+            'max_circularity_drift': max(r['circularity_drift'] for r in results),
+            'max_color_distance': max(r['color_distance'] for r in results),
+            'type_agreement': sum(r['same_type'] for r in results) / len(results),
+            'symmetry_agreement': sum(r['same_symmetry'] for r in results) / len(results)
+        })
+    return {'summary': summary, 'images': results}
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze object shape in images with OpenCV')
+    parser.add_argument('inputs', nargs='+', help='Image files')
+    parser.add_argument('--full', action='store_true', help='Analyze at full resolution')
+    parser.add_argument('--debug', action='store_true', help='Write the debug threshold image')
+    parser.add_argument('--benchmark', action='store_true', help='Compare the reduced path against full resolution')
+    args = parser.parse_args()
+
+    setup_logging()
+    print(f"Starting analysis with arguments: {sys.argv}")  # Debug print
+    if args.benchmark:
+        print(json.dumps(benchmark_analysis(args.inputs), indent=2))
+        return
+    for image_path in args.inputs:
+        analysis = analyze_image(image_path, full_resolution=args.full, debug_images=args.debug or None)
+        print(json.dumps(analysis))
+
 if __name__ == "__main__":
     try:
-        if len(sys.argv) != 2:
-            print(json.dumps({"error": "Usage: python analyze_image.py <image_path>"}))
-            sys.exit(1)
-            
-        print(f"Starting analysis with arguments: {sys.argv}")  # Debug print
-        analysis = analyze_image(sys.argv[1])
-        print(json.dumps(analysis))
-        
+        main()
     except Exception as e:
         print(json.dumps({"error": str(e)}), file=sys.stderr)
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from glb_io import read_glb, read_accessor
+from fbx_io import read_fbx, find_node, find_children, string_value, properties70, object_graph, load_fbx_meshes
+from collision_hull import COLLISION_SUFFIX
+from compress_glb import COMPRESSION_CONFIG
+from generate_lods import LOD_CONFIG
+from roblox_rules import ROBLOX_CONFIG, config_hash, check_model_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AUDIT_CONFIG = {
+    'outputs_dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'outputs'),
+    'cache_file': '.roblox_audit_cache.json',
+    'report_file': 'roblox_audit_report.json',
+    'default_outfit_type': 'clothes',
+    'source_outfit_type': 'unknown',   # Source GLBs are never fitted to an outfit type
+    'source_rules': ('uv_maps',),      # Rules that hold for any artifact, so source GLBs are still checked for them
+    'max_workers': int(os.getenv('AUDIT_MAX_WORKERS', str(os.cpu_count() or 2)))
+}
+
+def _metrics(vertices, faces, edges, area):
+    return {
+        'vertex_density': vertices / area if area > 0 else 0,
+        'triangle_density': faces / area if area > 0 else 0,
+        'edge_vertex_ratio': edges / vertices if vertices > 0 else 0
+    }
+
+def _triangle_area(positions, faces):
+    corners = positions[faces.astype(np.int64)]
+    return float(np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1).sum() / 2.0)
+
+def fbx_model_stats(path):
+    """
+    Model statistics of a binary FBX in the layout verify_model_for_roblox
+    gets from Blender, read without launching Blender.
+
+    Lengths use Blender's import conventions: the file unit scale relative to
+    centimeters and the file up axis mapped to Z.
+    """
+    _, nodes = read_fbx(path)
+    by_id, _, children = object_graph(nodes)
+    settings = properties70(find_node(nodes, 'GlobalSettings')) if find_node(nodes, 'GlobalSettings') else {}
+    unit_scale = settings.get('UnitScaleFactor', [1.0])[0] / 100.0
+    axes = {
+        'x': settings.get('CoordAxis', [0])[0],
+        'y': settings.get('FrontAxis', [2])[0],
+        'z': settings.get('UpAxis', [1])[0]
+    }
+
+    stats = {'vertices': 0, 'faces': 0, 'edges': 0, 'materials': 0, 'uvs': 0,
+             'vertex_groups': 0, 'collision_meshes': 0}
+    dims = {'x': 0, 'y': 0, 'z': 0}
+    total_area = 0.0
+    for mesh in load_fbx_meshes(path):
+        positions = mesh['positions'] * unit_scale
+        if len(positions):
+            extent = positions.max(axis=0) - positions.min(axis=0)
+            for axis, index in axes.items():
+                dims[axis] = max(dims[axis], float(extent[index]))
+        total_area += _triangle_area(positions, mesh['faces'])
+        if mesh['name'].endswith(COLLISION_SUFFIX):
+            stats['collision_meshes'] += 1
+            continue
+
+        model_children = [by_id[i] for i in children.get(mesh['model_id'], []) if i in by_id]
+        geometry = next((child for child in model_children if child['name'] == 'Geometry'), None)
+        stats['vertices'] += mesh['control_points']
+        stats['faces'] += mesh['polygons']
+        stats['edges'] += mesh['edges']
+        stats['materials'] += sum(1 for child in model_children if child['name'] == 'Material')
+        if geometry is not None:
+            stats['uvs'] += len(find_children(geometry, 'LayerElementUV'))
+            # Blender creates one vertex group per skin cluster
+            for skin_id in children.get(geometry['props'][0][1], []):
+                if skin_id in by_id and by_id[skin_id]['name'] == 'Deformer':
+                    stats['vertex_groups'] += sum(
+                        1 for i in children.get(skin_id, []) if i in by_id and by_id[i]['name'] == 'Deformer'
+                    )
+
+    bone_names = [string_value(obj['props'][1]) for obj in by_id.values()
+                  if obj['name'] == 'Model' and len(obj['props']) > 2 and string_value(obj['props'][2]) == 'LimbNode']
+    armature = {'bones': len(bone_names), 'bone_names': bone_names} if bone_names else None
+
+    return {
+        'geometry': {
+            'vertices': stats['vertices'],
+            'triangles': stats['faces'],
+            'edges': stats['edges'],
+            'collision_meshes': stats['collision_meshes']
+        },
+        'materials': {'count': stats['materials'], 'uv_layers': stats['uvs']},
+        'rigging': {'vertex_groups': stats['vertex_groups'], 'armature': armature},
+        'dimensions': dims,
+        'metrics': _metrics(stats['vertices'], stats['faces'], stats['edges'], total_area)
+    }
+
+def glb_model_stats(path):
+    """
+    Model statistics of a GLB in the same layout as fbx_model_stats.
+
+    Node transforms are not applied, matching load_glb_mesh; glTF Y-up
+    meters map to Blender Z-up meters.
+    """
+    gltf, bin_data = read_glb(path)
+    stats = {'vertices': 0, 'faces': 0, 'edges': 0, 'materials': 0, 'uvs': 0,
+             'vertex_groups': 0, 'collision_meshes': 0}
+    dims = {'x': 0, 'y': 0, 'z': 0}
+    total_area = 0.0
+    axes = {'x': 0, 'y': 2, 'z': 1}
+
+    skins = gltf.get('skins', [])
+    for node in gltf.get('nodes', []):
+        if 'mesh' not in node:
+            continue
+        if node.get('name', '').endswith(COLLISION_SUFFIX):
+            stats['collision_meshes'] += 1
+            continue
+        gltf_mesh = gltf['meshes'][node['mesh']]
+        positions, faces, materials = [], [], set()
+        offset = 0
+        for primitive in gltf_mesh['primitives']:
+            if primitive.get('mode', 4) != 4:
+                continue
+            primitive_positions = read_accessor(gltf, bin_data, primitive['attributes']['POSITION']).astype(np.float64)
+            if 'indices' in primitive:
+                indices = read_accessor(gltf, bin_data, primitive['indices']).reshape(-1, 3).astype(np.int64)
+            else:
+                indices = np.arange(len(primitive_positions)).reshape(-1, 3)
+            positions.append(primitive_positions)
+            faces.append(indices + offset)
+            offset += len(primitive_positions)
+            materials.add(primitive.get('material'))
+        if not positions:
+            continue
+        positions = np.concatenate(positions)
+        faces = np.concatenate(faces)
+
+        edges = np.sort(np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]), axis=1)
+        stats['vertices'] += len(positions)
+        stats['faces'] += len(faces)
+        stats['edges'] += len(np.unique(edges, axis=0))
+        stats['materials'] += len(materials - {None})
+        stats['uvs'] += sum(1 for name in gltf_mesh['primitives'][0]['attributes'] if name.startswith('TEXCOORD_'))
+        if 'skin' in node:
+            stats['vertex_groups'] += len(skins[node['skin']]['joints'])
+
+        extent = positions.max(axis=0) - positions.min(axis=0)
+        for axis, index in axes.items():
+            dims[axis] = max(dims[axis], float(extent[index]))
+        total_area += _triangle_area(positions, faces)
+
+    joints = sorted({joint for skin in skins for joint in skin['joints']})
+    bone_names = [gltf['nodes'][joint].get('name', f"joint_{joint}") for joint in joints]
+    armature = {'bones': len(bone_names), 'bone_names': bone_names} if bone_names else None
+
+    return {
+        'geometry': {
+            'vertices': stats['vertices'],
+            'triangles': stats['faces'],
+            'edges': stats['edges'],
+            'collision_meshes': stats['collision_meshes']
+        },
+        'materials': {'count': stats['materials'], 'uv_layers': stats['uvs']},
+        'rigging': {'vertex_groups': stats['vertex_groups'], 'armature': armature},
+        'dimensions': dims,
+        'metrics': _metrics(stats['vertices'], stats['faces'], stats['edges'], total_area)
+    }
+
+def audit_file(path, outfit_type):
+    """
+    Read one artifact and check it against the Roblox rules of its outfit
+    type; artifacts without one only get the outfit-independent rules.
+    """
+    start_time = time.time()
+    if path.lower().endswith('.fbx'):
+        stats = fbx_model_stats(path)
+    else:
+        stats = glb_model_stats(path)
+    failures = check_model_stats(stats, outfit_type)
+    if outfit_type not in ROBLOX_CONFIG:
+        failures = [failure for failure in failures if failure['rule'] in AUDIT_CONFIG['source_rules']]
+    return {
+        'file': os.path.basename(path),
+        'outfit_type': outfit_type,
+        'failures': failures,
+        'geometry': stats['geometry'],
+        'dimensions': stats['dimensions'],
+        'read_time_s': round(time.time() - start_time, 4)
+    }
+
+def audit_targets(outputs_dir):
+    """Processed Roblox FBX files and source GLBs; LOD levels and meshopt variants are derived files."""
+    derived = tuple(f"_{level['name']}.glb" for level in LOD_CONFIG['levels'] if level['max_triangles'])
+    derived += (f"{COMPRESSION_CONFIG['suffix']}.glb",)
+    return sorted(
+        os.path.join(outputs_dir, name) for name in os.listdir(outputs_dir)
+        if name.endswith('_roblox.fbx') or (name.endswith('.glb') and not name.endswith(derived))
+    )
+
+def outfit_type_for(path, default):
+    """
+    Outfit type of a processed Roblox file, from the pipeline's validation
+    sidecar or the default. Source GLBs are unprocessed MPX output and are
+    marked unknown rather than held to an outfit's limits.
+    """
+    base = os.path.splitext(path)[0]
+    if not base.endswith('_roblox'):
+        return AUDIT_CONFIG['source_outfit_type']
+    base = base[:-len('_roblox')]
+    sidecar = f"{base}_roblox_validation.json"
+    try:
+        with open(sidecar) as f:
+            outfit_type = json.load(f).get('outfit_type')
+        if outfit_type in ROBLOX_CONFIG:
+            return outfit_type
+    except (OSError, ValueError):
+        pass
+    return default
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def audit_outputs(outputs_dir, default_outfit_type=None, max_workers=None):
+    """
+    Validate every artifact in the outputs directory against ROBLOX_CONFIG.
+
+    Files are read in a process pool. A file is only re-read when its size,
+    mtime, outfit type or the hash of its outfit rules changed since the
+    cached result. Returns the consolidated report.
+    """
+    start_time = time.time()
+    default_outfit_type = default_outfit_type or AUDIT_CONFIG['default_outfit_type']
+    cache_path = os.path.join(outputs_dir, AUDIT_CONFIG['cache_file'])
+    cache = load_cache(cache_path)
+
+    results, pending = {}, {}
+    for path in audit_targets(outputs_dir):
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        outfit_type = outfit_type_for(path, default_outfit_type)
+        key = {'size': stat.st_size, 'mtime': stat.st_mtime,
+               'outfit_type': outfit_type, 'config_hash': config_hash(outfit_type)}
+        cached = cache.get(name)
+        if cached and all(cached.get(k) == v for k, v in key.items()):
+            results[name] = cached['result']
+        else:
+            pending[name] = (path, key)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers or AUDIT_CONFIG['max_workers']) as executor:
+            futures = {name: executor.submit(audit_file, path, key['outfit_type'])
+                       for name, (path, key) in pending.items()}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                    cache[name] = dict(pending[name][1], result=results[name])
+                except Exception as e:
+                    logger.error(f"Audit failed for {name}: {str(e)}")
+                    results[name] = {'file': name, 'outfit_type': pending[name][1]['outfit_type'], 'error': str(e)}
+
+    # Drop entries for files that no longer exist
+    cache = {name: entry for name, entry in cache.items() if name in results}
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f)
+
+    rule_counts = {}
+    for result in results.values():
+        for failure in result.get('failures', []):
+            counts = rule_counts.setdefault(failure['rule'], {'severity': failure['severity'], 'files': 0})
+            counts['files'] += 1
+
+    report = {
+        'outputs_dir': os.path.abspath(outputs_dir),
+        'config_hash': config_hash(),
+        'files': len(results),
+        'revalidated': len(pending),
+        'cached': len(results) - len(pending),
+        'read_errors': sum(1 for r in results.values() if 'error' in r),
+        'failing_files': sum(1 for r in results.values() if any(f['severity'] == 'error' for f in r.get('failures', []))),
+        'rule_failures': dict(sorted(rule_counts.items(), key=lambda item: -item[1]['files'])),
+        'audit_time_s': round(time.time() - start_time, 4),
+        'results': [results[name] for name in sorted(results)]
+    }
+    with open(os.path.join(outputs_dir, AUDIT_CONFIG['report_file']), 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Audited {report['files']} files ({report['revalidated']} re-read, {report['cached']} cached) "
+                f"in {report['audit_time_s']}s: {report['failing_files']} failing")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-validate generated outputs against the Roblox rules without Blender')
+    parser.add_argument('outputs_dir', nargs='?', default=AUDIT_CONFIG['outputs_dir'], help='Directory to audit')
+    parser.add_argument('--outfit-type', choices=sorted(ROBLOX_CONFIG), default=AUDIT_CONFIG['default_outfit_type'],
+                        help='Outfit type for processed files without a validation sidecar')
+    parser.add_argument('--workers', type=int, default=AUDIT_CONFIG['max_workers'], help='Worker processes')
+    args = parser.parse_args()
+
+    report = audit_outputs(args.outputs_dir, args.outfit_type, args.workers)
+    summary = {key: value for key, value in report.items() if key != 'results'}
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if report['read_errors'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BAKE_CONFIG = {
+    'texture_size': 512,
+    'max_distance': 0.02,   # Search distance as a fraction of the bounding box diagonal
+    'leaf_size': 8,
+    'chunk_size': 4096,
+    'dilation': 4,          # Texels to pad past UV island borders
+    'max_workers': int(os.getenv('BAKE_MAX_WORKERS', str(os.cpu_count() or 1)))
+}
+
+_worker_state = {}
+
+def build_bvh(triangles, leaf_size=None):
+    """
+    Build a median-split BVH over (F, 3, 3) triangle vertices.
+
+    Returns flat node arrays (bounds, children, leaf ranges) and the triangle
+    permutation the leaf ranges index into.
+    """
+    leaf_size = leaf_size or BAKE_CONFIG['leaf_size']
+    centroids = triangles.mean(axis=1)
+    tri_min = triangles.min(axis=1)
+    tri_max = triangles.max(axis=1)
+    order = np.arange(len(triangles))
+
+    node_min, node_max, left, right, start, count = [], [], [], [], [], []
+    stack = [(0, len(triangles), -1, False)]
+    while stack:
+        lo, hi, parent, is_right = stack.pop()
+        index = len(node_min)
+        if parent >= 0:
+            (right if is_right else left)[parent] = index
+
+        members = order[lo:hi]
+        node_min.append(tri_min[members].min(axis=0))
+        node_max.append(tri_max[members].max(axis=0))
+        left.append(-1)
+        right.append(-1)
+        start.append(lo)
+        count.append(hi - lo)
+
+        if hi - lo <= leaf_size:
+            continue
+
+        # Split at the centroid median along the longest axis
+        axis = int(np.argmax(node_max[index] - node_min[index]))
+        mid = (hi - lo) // 2
+        partition = np.argpartition(centroids[members, axis], mid)
+        order[lo:hi] = members[partition]
+        count[index] = 0
+        stack.append((lo + mid, hi, index, True))
+        stack.append((lo, lo + mid, index, False))
+
+    return {
+        'min': np.array(node_min),
+        'max': np.array(node_max),
+        'left': np.array(left),
+        'right': np.array(right),
+        'start': np.array(start),
+        'count': np.array(count),
+        'order': order
+    }
+
+def intersect_segments(bvh, triangles, origins, directions):
+    """
+    Find, for each segment origin + t * direction (t in [0, 1]), the triangle hit
+    closest to the segment midpoint. Traversal is breadth-first over
+    (segment, node) pairs so every step is a vectorized NumPy operation.
+    """
+    n = len(origins)
+    best_dist = np.full(n, np.inf)
+    best_tri = np.full(n, -1)
+    best_uv = np.zeros((n, 2))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_dir = 1.0 / np.where(np.abs(directions) < 1e-12, 1e-12, directions)
+
+    rays = np.arange(n)
+    nodes = np.zeros(n, dtype=np.int64)
+    while len(rays):
+        t0 = (bvh['min'][nodes] - origins[rays]) * inv_dir[rays]
+        t1 = (bvh['max'][nodes] - origins[rays]) * inv_dir[rays]
+        t_near = np.minimum(t0, t1).max(axis=1)
+        t_far = np.maximum(t0, t1).min(axis=1)
+        gap = np.maximum(0.0, np.maximum(t_near - 0.5, 0.5 - t_far))
+        keep = (t_near <= t_far) & (t_far >= 0.0) & (t_near <= 1.0) & (gap < best_dist[rays])
+        rays, nodes = rays[keep], nodes[keep]
+
+        leaf = bvh['count'][nodes] > 0
+        if leaf.any():
+            leaf_rays = rays[leaf]
+            leaf_nodes = nodes[leaf]
+            counts = bvh['count'][leaf_nodes]
+            pair_rays = np.repeat(leaf_rays, counts)
+            local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            pair_tris = bvh['order'][np.repeat(bvh['start'][leaf_nodes], counts) + local]
+            _intersect_pairs(triangles, origins, directions, pair_rays, pair_tris,
+                             best_dist, best_tri, best_uv)
+
+        inner = ~leaf
+        rays = np.concatenate([rays[inner], rays[inner]])
+        nodes = np.concatenate([bvh['left'][nodes[inner]], bvh['right'][nodes[inner]]])
+
+    return best_tri, best_uv
+
+def _intersect_pairs(triangles, origins, directions, rays, tris, best_dist, best_tri, best_uv):
+    """Double-sided Moller-Trumbore test for (segment, triangle) pairs."""
+    v0 = triangles[tris, 0]
+    edge1 = triangles[tris, 1] - v0
+    edge2 = triangles[tris, 2] - v0
+    d = directions[rays]
+    p = np.cross(d, edge2)
+    det = np.einsum('ij,ij->i', edge1, p)
+    valid = np.abs(det) > 1e-14
+    inv_det = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+    s = origins[rays] - v0
+    u = np.einsum('ij,ij->i', s, p) * inv_det
+    q = np.cross(s, edge1)
+    v = np.einsum('ij,ij->i', d, q) * inv_det
+    t = np.einsum('ij,ij->i', edge2, q) * inv_det
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
+
+    rays, tris, u, v, dist = rays[hit], tris[hit], u[hit], v[hit], np.abs(t[hit] - 0.5)
+    if not len(rays):
+        return
+
+    # Keep the closest hit per segment, then merge with previous best
+    order = np.lexsort((dist, rays))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = rays[order][1:] != rays[order][:-1]
+    order = order[first]
+    better = dist[order] < best_dist[rays[order]]
+    order = order[better]
+    best_dist[rays[order]] = dist[order]
+    best_tri[rays[order]] = tris[order]
+    best_uv[rays[order]] = np.stack([u[order], v[order]], axis=1)
+
+def rasterize_uv(uvs, size):
+    """
+    Find the texels covered by each low-poly triangle in UV space.
+
+    Returns texel rows, columns, triangle ids and barycentric weights.
+    """
+    pixels = np.stack([uvs[..., 0] * size, (1.0 - uvs[..., 1]) * size], axis=-1)
+    rows, cols, tris, weights = [], [], [], []
+
+    for tri, corners in enumerate(pixels):
+        lower = np.maximum(np.floor(corners.min(axis=0) - 0.5).astype(int), 0)
+        upper = np.minimum(np.ceil(corners.max(axis=0) - 0.5).astype(int), size - 1)
+        if (upper < lower).any():
+            continue
+        xs, ys = np.meshgrid(np.arange(lower[0], upper[0] + 1), np.arange(lower[1], upper[1] + 1))
+        centers = np.stack([xs.ravel() + 0.5, ys.ravel() + 0.5], axis=1)
+
+        a, b, c = corners
+        area = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+        if abs(area) < 1e-12:
+            continue
+        w1 = ((centers[:, 0] - a[0]) * (c[1] - a[1]) - (centers[:, 1] - a[1]) * (c[0] - a[0])) / area
+        w2 = ((b[0] - a[0]) * (centers[:, 1] - a[1]) - (b[1] - a[1]) * (centers[:, 0] - a[0])) / area
+        w0 = 1.0 - w1 - w2
+        inside = (w0 >= -1e-6) & (w1 >= -1e-6) & (w2 >= -1e-6)
+        if not inside.any():
+            continue
+        cols.append(xs.ravel()[inside])
+        rows.append(ys.ravel()[inside])
+        tris.append(np.full(inside.sum(), tri))
+        weights.append(np.stack([w0[inside], w1[inside], w2[inside]], axis=1))
+
+    if not rows:
+        return np.empty(0, int), np.empty(0, int), np.empty(0, int), np.empty((0, 3))
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(tris), np.concatenate(weights)
+
+def _init_worker(bvh, triangles, normals):
+    _worker_state['bvh'] = bvh
+    _worker_state['triangles'] = triangles
+    _worker_state['normals'] = normals
+
+def _trace_chunk(origins, directions):
+    """Trace one chunk of segments and return interpolated high-poly normals."""
+    triangles = _worker_state['triangles']
+    tri, uv = intersect_segments(_worker_state['bvh'], triangles, origins, directions)
+    result = np.zeros((len(origins), 3))
+    hit = tri >= 0
+    corner_normals = _worker_state['normals'][tri[hit]]
+    u, v = uv[hit, 0:1], uv[hit, 1:2]
+    result[hit] = (1.0 - u - v) * corner_normals[:, 0] + u * corner_normals[:, 1] + v * corner_normals[:, 2]
+    return result, hit
+
+def dilate(image, filled, iterations):
+    """Grow baked texels outward so mip-mapping does not bleed the background."""
+    for _ in range(iterations):
+        total = np.zeros_like(image)
+        weight = np.zeros(filled.shape)
+        for axis, shift in ((0, 1), (0, -1), (1, 1), (1, -1)):
+            total += np.roll(image * filled[..., None], shift, axis=axis)
+            weight += np.roll(filled, shift, axis=axis)
+        grow = ~filled & (weight > 0)
+        image[grow] = total[grow] / weight[grow][:, None]
+        filled = filled | grow
+    return image
+
+def bake_normal_map(high, low, size=None, executor=None):
+    """
+    Bake high-poly normals into a tangent-space normal map for the low-poly mesh.
+
+    high: positions (V, 3), faces (F, 3), normals (V, 3)
+    low: per-corner positions, normals, tangents (T, 3, 3), bitangent_signs (T, 3), uvs (T, 3, 2)
+    Returns an (size, size, 3) uint8 image in OpenGL (Y+) convention.
+    """
+    size = size or BAKE_CONFIG['texture_size']
+    high_triangles = high['positions'][high['faces']].astype(np.float64)
+    high_normals = high['normals'][high['faces']].astype(np.float64)
+    bvh = build_bvh(high_triangles)
+
+    rows, cols, tris, weights = rasterize_uv(low['uvs'], size)
+    w = weights[:, :, None]
+    position = (low['positions'][tris] * w).sum(axis=1)
+    normal = (low['normals'][tris] * w).sum(axis=1)
+    tangent = (low['tangents'][tris] * w).sum(axis=1)
+    sign = np.where((low['bitangent_signs'][tris] * weights).sum(axis=1) < 0, -1.0, 1.0)
+
+    normal /= np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-12)
+    tangent -= normal * np.einsum('ij,ij->i', tangent, normal)[:, None]
+    tangent /= np.maximum(np.linalg.norm(tangent, axis=1, keepdims=True), 1e-12)
+    bitangent = sign[:, None] * np.cross(normal, tangent)
+
+    extent = high['positions'].max(axis=0) - high['positions'].min(axis=0)
+    distance = BAKE_CONFIG['max_distance'] * float(np.linalg.norm(extent))
+    origins = position - normal * distance
+    directions = normal * (2.0 * distance)
+
+    chunk = BAKE_CONFIG['chunk_size']
+    bounds = [(i, min(i + chunk, len(origins))) for i in range(0, len(origins), chunk)]
+    own_executor = executor is None and len(bounds) > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=BAKE_CONFIG['max_workers'], initializer=_init_worker,
+                                       initargs=(bvh, high_triangles, high_normals))
+    try:
+        if executor is None:
+            _init_worker(bvh, high_triangles, high_normals)
+            results = [_trace_chunk(origins[a:b], directions[a:b]) for a, b in bounds]
+        else:
+            results = list(executor.map(_trace_chunk, [origins[a:b] for a, b in bounds],
+                                        [directions[a:b] for a, b in bounds]))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    high_normal = np.concatenate([r[0] for r in results]) if results else np.zeros((0, 3))
+    hit = np.concatenate([r[1] for r in results]) if results else np.zeros(0, bool)
+    high_normal[~hit] = normal[~hit]
+    high_normal /= np.maximum(np.linalg.norm(high_normal, axis=1, keepdims=True), 1e-12)
+
+    tangent_space = np.stack([
+        np.einsum('ij,ij->i', high_normal, tangent),
+        np.einsum('ij,ij->i', high_normal, bitangent),
+        np.einsum('ij,ij->i', high_normal, normal)
+    ], axis=1)
+
+    image = np.zeros((size, size, 3))
+    image[..., 2] = 1.0
+    filled = np.zeros((size, size), dtype=bool)
+    image[rows, cols] = tangent_space
+    filled[rows, cols] = True
+    image = dilate(image, filled, BAKE_CONFIG['dilation'])
+
+    stats = {
+        'texels': int(len(rows)),
+        'hit_ratio': round(float(hit.mean()), 4) if len(hit) else 0.0,
+        'high_triangles': int(len(high['faces'])),
+        'low_triangles': int(len(low['uvs'])),
+        'bvh_nodes': int(len(bvh['min']))
+    }
+    return np.clip(np.rint((image * 0.5 + 0.5) * 255), 0, 255).astype(np.uint8), stats
+
+def bake_from_file(input_path, output_path, size=None):
+    """Bake a normal map from the arrays a Blender export wrote to an .npz file."""
+    from PIL import Image
+
+    start_time = time.time()
+    data = np.load(input_path)
+    high = {key[5:]: data[key] for key in data.files if key.startswith('high_')}
+    low = {key[4:]: data[key] for key in data.files if key.startswith('low_')}
+
+    image, stats = bake_normal_map(high, low, size)
+    Image.fromarray(image, 'RGB').save(output_path, optimize=True)
+    stats['bake_time_s'] = round(time.time() - start_time, 3)
+    stats['output'] = output_path
+    logger.info(f"Baked normal map to {output_path} in {stats['bake_time_s']}s")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Bake a tangent-space normal map from high to low poly')
+    parser.add_argument('input', help='.npz file with high_* and low_* arrays')
+    parser.add_argument('output', help='Output PNG path')
+    parser.add_argument('--size', type=int, default=BAKE_CONFIG['texture_size'], help='Texture size')
+    args = parser.parse_args()
+
+    try:
+        stats = bake_from_file(args.input, args.output, args.size)
+        print(json.dumps({'success': True, 'stats': stats}))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+
+from analyze_image import analyze_image, ANALYSIS_CONFIG
+from remove_background import file_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_CONFIG = {
+    # Results are stored as <sha256>.<ext>.json, the layout output/ already uses for analysis files
+    'results_dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'output'),
+    'index_file': '.analysis_index.json',  # Path, size and mtime to content hash, so unchanged files are not re-read
+    'extensions': ('.png', '.jpg', '.jpeg'),
+    'max_workers': int(os.getenv('ANALYZE_MAX_WORKERS', str(os.cpu_count() or 2)))
+}
+
+def _init_worker():
+    """Workers keep their OpenCV import for the whole batch and run single-threaded, since the pool is the parallelism."""
+    cv2.setNumThreads(1)
+    logging.getLogger('analyze_image').setLevel(logging.WARNING)
+
+def _analyze_worker(path, result_path):
+    start_time = time.time()
+    analysis = analyze_image(path, debug_images=False)
+    analysis['analysis']['max_side'] = ANALYSIS_CONFIG['max_side']
+    analysis['analysis']['time_s'] = round(time.time() - start_time, 4)
+    temp_path = f"{result_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(analysis, f, indent=2)
+    os.replace(temp_path, result_path)
+    return analysis
+
+def batch_targets(source):
+    """Image files in a directory tree, or the paths listed in a manifest (JSON list or one path per line)."""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, dirs, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(BATCH_CONFIG['extensions']) and not name.startswith('.')
+        )
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        if source.endswith('.json'):
+            paths = json.load(f)
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [path if os.path.isabs(path) else os.path.join(base_dir, path) for path in paths]
+
+def load_index(index_path):
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def analyze_batch(source, results_dir=None, max_workers=None):
+    """
+    Analyze every image of a directory or manifest, reusing stored results.
+
+    Results are looked up by content hash, so renamed or copied images are
+    not analyzed again and identical files are analyzed once. Hashes are
+    kept in an index keyed by path, size and mtime, so an unchanged corpus
+    is not even re-read. Misses are analyzed in a process pool. Returns
+    the batch report.
+    """
+    start_time = time.time()
+    results_dir = results_dir or BATCH_CONFIG['results_dir']
+    os.makedirs(results_dir, exist_ok=True)
+    index_path = os.path.join(results_dir, BATCH_CONFIG['index_file'])
+    index = load_index(index_path)
+
+    entries, pending = [], {}
+    for path in batch_targets(source):
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            entries.append({'file': path, 'error': str(e)})
+            continue
+        indexed = index.get(path)
+        if indexed and indexed['size'] == stat.st_size and indexed['mtime'] == stat.st_mtime:
+            sha256 = indexed['sha256']
+        else:
+            sha256 = file_hash(path)
+            index[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256}
+
+        result_path = os.path.join(results_dir, f"{sha256}{os.path.splitext(path)[1].lower()}.json")
+        entry = {'file': path, 'sha256': sha256, 'result_file': os.path.basename(result_path)}
+        try:
+            with open(result_path) as f:
+                analysis = json.load(f)
+            if analysis.get('analysis', {}).get('max_side') != ANALYSIS_CONFIG['max_side']:
+                raise ValueError("Stored result was made with other settings")
+            entry.update(cached=True, result=analysis)
+        except (OSError, ValueError):
+            entry['cached'] = False
+            pending.setdefault(result_path, path)
+        entries.append(entry)
+
+    results = {}
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers or BATCH_CONFIG['max_workers'],
+                                 initializer=_init_worker) as executor:
+            futures = {result_path: executor.submit(_analyze_worker, path, result_path)
+                       for result_path, path in pending.items()}
+            for result_path, future in futures.items():
+                try:
+                    results[result_path] = future.result()
+                except Exception as e:
+                    logger.error(f"Analysis failed for {pending[result_path]}: {str(e)}")
+                    results[result_path] = {'error': str(e)}
+
+    for entry in entries:
+        if entry.get('cached') is False:
+            result = results[os.path.join(results_dir, entry['result_file'])]
+            if 'error' in result:
+                entry['error'] = result['error']
+            else:
+                entry['result'] = result
+
+    # Drop index entries for files that no longer exist
+    index = {path: value for path, value in index.items() if os.path.exists(path)}
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(temp_path, index_path)
+
+    report = {
+        'source': os.path.abspath(source),
+        'results_dir': os.path.abspath(results_dir),
+        'files': len(entries),
+        'analyzed': len(pending),
+        'cached': sum(1 for entry in entries if entry.get('cached')),
+        'errors': sum(1 for entry in entries if 'error' in entry),
+        'batch_time_s': round(time.time() - start_time, 4),
+        'results': entries
+    }
+    logger.info(f"Analyzed {report['files']} images ({report['analyzed']} computed, {report['cached']} cached) "
+                f"in {report['batch_time_s']}s")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze a directory or manifest of images with a result cache')
+    parser.add_argument('source', help='Image directory, or a manifest file (JSON list or one path per line)')
+    parser.add_argument('--results-dir', default=BATCH_CONFIG['results_dir'], help='Where results are stored by hash')
+    parser.add_argument('--workers', type=int, default=BATCH_CONFIG['max_workers'], help='Worker processes')
+    parser.add_argument('--all', action='store_true', help='Print every result, not just the summary')
+    args = parser.parse_args()
+
+    report = analyze_batch(args.source, args.results_dir, args.workers)
+    if not args.all:
+        report = {key: value for key, value in report.items() if key != 'results'}
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['errors'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import time
+import numpy as np
+
+from bake_normals import build_bvh
+
+CAGE_CONFIG = {
+    'min_clearance': 0.005,      # Garment distance kept outside the body cage
+    'outer_margin': 0.01,        # Extra offset of the outer cage past the garment
+    'smoothing_iterations': 2,   # Offset smoothing passes over the cage edges
+    'chunk_size': 16384
+}
+
+INNER_CAGE_SUFFIX = '_InnerCage'
+OUTER_CAGE_SUFFIX = '_OuterCage'
+
+def closest_point_on_triangles(points, a, b, c):
+    """Vectorized closest point on triangles (a, b, c) to points (Ericson, RTCD 5.1.5)."""
+    ab, ac, ap = b - a, c - a, points - a
+    d1 = np.einsum('ij,ij->i', ab, ap)
+    d2 = np.einsum('ij,ij->i', ac, ap)
+    bp = points - b
+    d3 = np.einsum('ij,ij->i', ab, bp)
+    d4 = np.einsum('ij,ij->i', ac, bp)
+    cp = points - c
+    d5 = np.einsum('ij,ij->i', ab, cp)
+    d6 = np.einsum('ij,ij->i', ac, cp)
+
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = 1.0 / (va + vb + vc)
+        result = a + ab * (vb * denom)[:, None] + ac * (vc * denom)[:, None]
+
+        # Edge and vertex regions, most specific last so they win
+        t_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        on_bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        result[on_bc] = (b + (c - b) * t_bc[:, None])[on_bc]
+        t_ac = d2 / (d2 - d6)
+        on_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        result[on_ac] = (a + ac * t_ac[:, None])[on_ac]
+        t_ab = d1 / (d1 - d3)
+        on_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        result[on_ab] = (a + ab * t_ab[:, None])[on_ab]
+
+    at_c = (d6 >= 0) & (d5 <= d6)
+    result[at_c] = c[at_c]
+    at_b = (d3 >= 0) & (d4 <= d3)
+    result[at_b] = b[at_b]
+    at_a = (d1 <= 0) & (d2 <= 0)
+    result[at_a] = a[at_a]
+    return result
+
+def _box_distance(points, lower, upper):
+    return np.linalg.norm(np.maximum(np.maximum(lower - points, points - upper), 0.0), axis=1)
+
+def _test_leaves(bvh, triangles, points, queries, nodes, best_dist, best_tri, best_point):
+    """Evaluate every triangle of the given leaves and keep the closest per query."""
+    counts = bvh['count'][nodes]
+    pair_queries = np.repeat(queries, counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    pair_tris = bvh['order'][np.repeat(bvh['start'][nodes], counts) + local]
+    tri = triangles[pair_tris]
+    closest = closest_point_on_triangles(points[pair_queries], tri[:, 0], tri[:, 1], tri[:, 2])
+    dist = np.linalg.norm(points[pair_queries] - closest, axis=1)
+
+    order = np.lexsort((dist, pair_queries))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pair_queries[order][1:] != pair_queries[order][:-1]
+    order = order[first]
+    better = order[dist[order] < best_dist[pair_queries[order]]]
+    best_dist[pair_queries[better]] = dist[better]
+    best_tri[pair_queries[better]] = pair_tris[better]
+    best_point[pair_queries[better]] = closest[better]
+
+def closest_points(bvh, triangles, points):
+    """
+    Closest surface point, triangle and distance for every query point.
+
+    A greedy descent to the nearest leaf gives each query an initial bound,
+    then a breadth-first traversal over (query, node) pairs prunes every node
+    whose box is farther than the best distance found so far.
+    """
+    n = len(points)
+    best_dist = np.full(n, np.inf)
+    best_tri = np.full(n, -1)
+    best_point = np.zeros((n, 3))
+    queries = np.arange(n)
+
+    nodes = np.zeros(n, dtype=np.int64)
+    inner = bvh['count'][nodes] == 0
+    while inner.any():
+        left = bvh['left'][nodes[inner]]
+        right = bvh['right'][nodes[inner]]
+        p = points[inner]
+        go_left = _box_distance(p, bvh['min'][left], bvh['max'][left]) <= \
+            _box_distance(p, bvh['min'][right], bvh['max'][right])
+        nodes[inner] = np.where(go_left, left, right)
+        inner = bvh['count'][nodes] == 0
+    _test_leaves(bvh, triangles, points, queries, nodes, best_dist, best_tri, best_point)
+
+    nodes = np.zeros(n, dtype=np.int64)
+    while len(queries):
+        near = _box_distance(points[queries], bvh['min'][nodes], bvh['max'][nodes]) < best_dist[queries]
+        queries, nodes = queries[near], nodes[near]
+
+        leaf = bvh['count'][nodes] > 0
+        if leaf.any():
+            _test_leaves(bvh, triangles, points, queries[leaf], nodes[leaf], best_dist, best_tri, best_point)
+
+        inner = ~leaf
+        queries = np.concatenate([queries[inner], queries[inner]])
+        nodes = np.concatenate([bvh['left'][nodes[inner]], bvh['right'][nodes[inner]]])
+
+    return best_point, best_tri, best_dist
+
+def _query_cage(bvh, triangles, points):
+    chunk = CAGE_CONFIG['chunk_size']
+    parts = [closest_points(bvh, triangles, points[i:i + chunk]) for i in range(0, len(points), chunk)]
+    if not parts:
+        return np.zeros((0, 3)), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+def vertex_normals(positions, faces):
+    """Area-weighted vertex normals."""
+    face_normals = np.cross(positions[faces[:, 1]] - positions[faces[:, 0]],
+                            positions[faces[:, 2]] - positions[faces[:, 0]])
+    normals = np.zeros_like(positions)
+    for corner in range(3):
+        np.add.at(normals, faces[:, corner], face_normals)
+    return normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+def fit_to_cage(garment_positions, cage_positions, cage_faces):
+    """
+    Fit a garment over the body cage and derive the outer cage.
+
+    Garment vertices inside the cage, or closer than the clearance, are
+    pushed out along the cage normal. Each cage vertex then moves outward
+    by the farthest garment offset on its adjacent triangles so the outer
+    cage encloses the garment. Returns the fitted garment positions, the
+    outer cage positions (inner cage topology) and timing stats.
+    """
+    start_time = time.time()
+    garment = np.asarray(garment_positions, dtype=np.float64)
+    cage = np.asarray(cage_positions, dtype=np.float64)
+    faces = np.asarray(cage_faces, dtype=np.int64)
+    triangles = cage[faces]
+    bvh = build_bvh(triangles)
+    build_time = time.time() - start_time
+
+    query_start = time.time()
+    closest, tri, _ = _query_cage(bvh, triangles, garment)
+    query_time = time.time() - query_start
+
+    face_normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    face_normals /= np.maximum(np.linalg.norm(face_normals, axis=1, keepdims=True), 1e-12)
+    normal = face_normals[tri]
+    offset = np.einsum('ij,ij->i', garment - closest, normal)
+
+    clearance = CAGE_CONFIG['min_clearance']
+    push = offset < clearance
+    fitted = garment.copy()
+    fitted[push] = closest[push] + normal[push] * clearance
+    offset = np.maximum(offset, clearance)
+
+    # Outer cage: each cage vertex covers the garment offsets on its triangles
+    reach = np.zeros(len(cage))
+    for corner in range(3):
+        np.maximum.at(reach, faces[tri, corner], offset)
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    for _ in range(CAGE_CONFIG['smoothing_iterations']):
+        total = np.zeros(len(cage))
+        count = np.zeros(len(cage))
+        np.add.at(total, edges[:, 0], reach[edges[:, 1]])
+        np.add.at(count, edges[:, 0], 1)
+        reach = np.maximum(reach, total / np.maximum(count, 1))
+    outer = cage + vertex_normals(cage, faces) * (reach + CAGE_CONFIG['outer_margin'])[:, None]
+
+    stats = {
+        'garment_vertices': int(len(garment)),
+        'cage_vertices': int(len(cage)),
+        'pushed_vertices': int(push.sum()),
+        'max_outer_offset': round(float(reach.max() + CAGE_CONFIG['outer_margin']), 5) if len(cage) else 0.0,
+        'bvh_build_time_s': round(build_time, 4),
+        'query_time_s': round(query_time, 4),
+        'fit_time_s': round(time.time() - start_time, 4)
+    }
+    return fitted, outer, stats
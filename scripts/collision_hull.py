@@ -0,0 +1,76 @@
+import numpy as np
+
+# Convex collision budget per outfit type. Items with more than one part are
+# approximated by a decomposition into that many convex pieces.
+COLLISION_CONFIG = {
+    'clothes': {'parts': 4, 'max_hull_vertices': 16},
+    'hats': {'parts': 1, 'max_hull_vertices': 32},
+    'shoes': {'parts': 2, 'max_hull_vertices': 24},
+    'default': {'parts': 1, 'max_hull_vertices': 32}
+}
+
+COLLISION_SUFFIX = '_Collision'
+
+def fibonacci_directions(count):
+    """Evenly distributed unit vectors on the sphere."""
+    i = np.arange(count) + 0.5
+    phi = np.arccos(1.0 - 2.0 * i / count)
+    theta = np.pi * (1.0 + 5 ** 0.5) * i
+    return np.stack([np.cos(theta) * np.sin(phi), np.sin(theta) * np.sin(phi), np.cos(phi)], axis=1)
+
+def farthest_point_sample(points, count):
+    """Greedy farthest-point subset of the given size, seeded at the point farthest from the centroid."""
+    if len(points) <= count:
+        return points
+    chosen = [int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))]
+    distance = np.linalg.norm(points - points[chosen[0]], axis=1)
+    for _ in range(count - 1):
+        chosen.append(int(np.argmax(distance)))
+        distance = np.minimum(distance, np.linalg.norm(points - points[chosen[-1]], axis=1))
+    return points[chosen]
+
+def support_points(points, budget):
+    """
+    Pick at most budget points lying on the convex hull.
+
+    Extreme points along many sample directions are exact hull vertices; when
+    there are more than the budget, farthest-point sampling keeps a spread-out
+    subset so the simplified hull still covers the silhouette.
+    """
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    if len(points) <= 4:
+        return points
+    center = points.mean(axis=0)
+    directions = fibonacci_directions(max(budget * 4, 64))
+    extremes = np.unique(np.argmax((points - center) @ directions.T, axis=0))
+    return farthest_point_sample(points[extremes], budget)
+
+def kmeans_partition(points, parts, iterations=10):
+    """Split points into spatial clusters with Lloyd's k-means; returns per-point labels."""
+    if parts <= 1 or len(points) <= parts:
+        return np.zeros(len(points), dtype=np.int64)
+    centers = farthest_point_sample(points, parts).copy()
+    labels = np.zeros(len(points), dtype=np.int64)
+    for _ in range(iterations):
+        distance = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = np.argmin(distance, axis=1)
+        for k in range(parts):
+            members = points[labels == k]
+            if len(members):
+                centers[k] = members.mean(axis=0)
+    return labels
+
+def collision_point_sets(positions, outfit_type):
+    """
+    Return one hull point set per convex part for an outfit type, each within
+    the configured hull vertex budget.
+    """
+    config = COLLISION_CONFIG.get(outfit_type, COLLISION_CONFIG['default'])
+    positions = np.asarray(positions, dtype=np.float64)
+    labels = kmeans_partition(positions, config['parts'])
+    point_sets = []
+    for k in np.unique(labels):
+        points = support_points(positions[labels == k], config['max_hull_vertices'])
+        if len(points) >= 4:
+            point_sets.append(points)
+    return point_sets
@@ -0,0 +1,420 @@
+import os
+import json
+import time
+import logging
+import argparse
+import numpy as np
+
+from glb_io import (
+    load_glb_mesh, write_glb, read_glb,
+    ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPRESSION_CONFIG = {
+    'position_bits': 16,
+    'normal_bits': 8,
+    'uv_bits': 16,
+    'suffix': '_meshopt'
+}
+
+# meshoptimizer bitstream constants (vertex codec v0, index sequence codec v1)
+VERTEX_HEADER = 0xA0
+SEQUENCE_HEADER = 0xD1
+BYTE_GROUP_SIZE = 16
+VERTEX_BLOCK_MAX_SIZE = 256
+TAIL_MAX_SIZE = 32
+GROUP_BITS = (0, 2, 4, 8)
+
+def _vertex_block_size(vertex_size):
+    return min((8192 // vertex_size) & ~(BYTE_GROUP_SIZE - 1), VERTEX_BLOCK_MAX_SIZE)
+
+def _zigzag8(values):
+    return ((values << 1) ^ (values.view(np.int8) >> 7).view(np.uint8)).astype(np.uint8)
+
+def _unzigzag8(values):
+    return ((values >> 1) ^ (0 - (values & 1)).astype(np.uint8)).astype(np.uint8)
+
+def _encode_bytes(groups):
+    """Encode (G, 16) zigzag deltas with a 2-bit-per-group header, as meshopt does."""
+    sizes = np.empty((len(groups), 4), dtype=np.int64)
+    sizes[:, 0] = np.where((groups == 0).all(axis=1), 0, 1 << 30)
+    sizes[:, 1] = 4 + (groups >= 3).sum(axis=1)
+    sizes[:, 2] = 8 + (groups >= 15).sum(axis=1)
+    sizes[:, 3] = BYTE_GROUP_SIZE
+
+    # Same preference order as the reference encoder: wider groups win ties
+    selected = np.full(len(groups), 3)
+    best = sizes[:, 3].copy()
+    for bits_log2 in (2, 1, 0):
+        better = sizes[:, bits_log2] < best
+        selected[better] = bits_log2
+        best[better] = sizes[better, bits_log2]
+
+    header = np.zeros((len(groups) + 3) // 4, dtype=np.uint8)
+    np.bitwise_or.at(header, np.arange(len(groups)) // 4,
+                     (selected << ((np.arange(len(groups)) % 4) * 2)).astype(np.uint8))
+
+    out = [header.tobytes()]
+    for group, bits_log2 in zip(groups, selected):
+        bits = GROUP_BITS[bits_log2]
+        if bits == 0:
+            continue
+        if bits == 8:
+            out.append(group.tobytes())
+            continue
+        sentinel = (1 << bits) - 1
+        encoded = np.minimum(group, sentinel).reshape(-1, 8 // bits)
+        packed = np.zeros(len(encoded), dtype=np.uint8)
+        for k in range(8 // bits):
+            packed = (packed << bits) | encoded[:, k]
+        out.append(packed.astype(np.uint8).tobytes())
+        out.append(group[group >= sentinel].tobytes())
+    return b''.join(out)
+
+def encode_vertex_buffer(vertices):
+    """
+    Encode a (count, stride) uint8 vertex array with the meshopt vertex codec.
+
+    Each byte lane is delta-encoded against the previous vertex, zigzagged and
+    bit-packed in groups of 16, which is the ATTRIBUTES mode payload of
+    EXT_meshopt_compression.
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.uint8)
+    count, vertex_size = vertices.shape
+    if vertex_size % 4 or vertex_size > 256:
+        raise ValueError("Vertex stride must be a multiple of 4 and at most 256 bytes")
+
+    out = [bytes([VERTEX_HEADER])]
+    last = vertices[0].copy() if count else np.zeros(vertex_size, dtype=np.uint8)
+    first = last.copy()
+    block_size = _vertex_block_size(vertex_size)
+
+    for start in range(0, count, block_size):
+        block = vertices[start:start + block_size]
+        previous = np.vstack([last[None, :], block[:-1]])
+        deltas = _zigzag8((block - previous).astype(np.uint8))
+        padded = (len(block) + BYTE_GROUP_SIZE - 1) & ~(BYTE_GROUP_SIZE - 1)
+        lanes = np.zeros((vertex_size, padded), dtype=np.uint8)
+        lanes[:, :len(block)] = deltas.T
+        for lane in lanes:
+            out.append(_encode_bytes(lane.reshape(-1, BYTE_GROUP_SIZE)))
+        last = block[-1].copy()
+
+    tail_size = max(vertex_size, TAIL_MAX_SIZE)
+    out.append(bytes(tail_size - vertex_size))
+    out.append(first.tobytes())
+    return b''.join(out)
+
+def decode_vertex_buffer(data, count, vertex_size):
+    """Decode a meshopt vertex codec stream back into a (count, stride) uint8 array."""
+    if data[0] != VERTEX_HEADER:
+        raise ValueError("Unsupported vertex codec header")
+
+    tail_size = max(vertex_size, TAIL_MAX_SIZE)
+    last = np.frombuffer(data, dtype=np.uint8, count=vertex_size, offset=len(data) - vertex_size).copy()
+    result = np.empty((count, vertex_size), dtype=np.uint8)
+    block_size = _vertex_block_size(vertex_size)
+    offset = 1
+
+    for start in range(0, count, block_size):
+        block_count = min(block_size, count - start)
+        padded = (block_count + BYTE_GROUP_SIZE - 1) & ~(BYTE_GROUP_SIZE - 1)
+        group_count = padded // BYTE_GROUP_SIZE
+        deltas = np.empty((vertex_size, padded), dtype=np.uint8)
+
+        for k in range(vertex_size):
+            header = data[offset:offset + (group_count + 3) // 4]
+            offset += len(header)
+            for g in range(group_count):
+                bits = GROUP_BITS[(header[g // 4] >> ((g % 4) * 2)) & 3]
+                target = deltas[k, g * BYTE_GROUP_SIZE:(g + 1) * BYTE_GROUP_SIZE]
+                if bits == 0:
+                    target[:] = 0
+                elif bits == 8:
+                    target[:] = np.frombuffer(data, dtype=np.uint8, count=BYTE_GROUP_SIZE, offset=offset)
+                    offset += BYTE_GROUP_SIZE
+                else:
+                    per_byte = 8 // bits
+                    packed = np.frombuffer(data, dtype=np.uint8, count=BYTE_GROUP_SIZE // per_byte, offset=offset)
+                    offset += len(packed)
+                    shifts = np.arange(per_byte - 1, -1, -1) * bits
+                    values = ((packed[:, None] >> shifts) & ((1 << bits) - 1)).reshape(-1).astype(np.uint8)
+                    escaped = np.nonzero(values == (1 << bits) - 1)[0]
+                    values[escaped] = np.frombuffer(data, dtype=np.uint8, count=len(escaped), offset=offset)
+                    offset += len(escaped)
+                    target[:] = values
+
+        # Prefix-sum the decoded deltas per byte lane with 8-bit wraparound
+        lane_deltas = _unzigzag8(deltas[:, :block_count]).T.astype(np.int64)
+        block = (np.cumsum(lane_deltas, axis=0) + last) & 0xFF
+        result[start:start + block_count] = block
+        last = block[-1].astype(np.uint8)
+
+    if len(data) - offset != tail_size:
+        raise ValueError("Malformed vertex stream")
+    return result
+
+def encode_index_sequence(indices):
+    """Encode indices with the meshopt index sequence codec (INDICES mode)."""
+    out = bytearray([SEQUENCE_HEADER])
+    last = [0, 0]
+    current = 0
+    for index in indices.tolist():
+        cd = index - last[current]
+        current ^= int(abs(cd) >= 30)
+        d = (index - last[current]) & 0xFFFFFFFF
+        v = ((d << 1) ^ (0xFFFFFFFF if d & 0x80000000 else 0)) & 0xFFFFFFFF
+        v = ((v << 1) | current) & 0xFFFFFFFF
+        while True:
+            out.append((v & 127) | (128 if v > 127 else 0))
+            v >>= 7
+            if not v:
+                break
+        last[current] = index
+    out.extend(bytes(4))
+    return bytes(out)
+
+def decode_index_sequence(data, count):
+    """Decode a meshopt index sequence stream into a uint32 array."""
+    if data[0] != SEQUENCE_HEADER:
+        raise ValueError("Unsupported index sequence header")
+    result = np.empty(count, dtype=np.uint32)
+    last = [0, 0]
+    offset = 1
+    for i in range(count):
+        v = 0
+        shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            v |= (byte & 127) << shift
+            shift += 7
+            if byte < 128:
+                break
+        current = v & 1
+        v >>= 1
+        d = (v >> 1) ^ (0xFFFFFFFF if v & 1 else 0)
+        index = (last[current] + d) & 0xFFFFFFFF
+        result[i] = index
+        last[current] = index
+    return result
+
+def quantize_mesh(mesh):
+    """
+    Quantize vertex attributes as allowed by KHR_mesh_quantization.
+
+    Positions become uint16 on a uniform grid whose scale and offset move into
+    the node transform, normals become normalized int8 and UVs in [0, 1]
+    normalized uint16. Every attribute is padded to a 4-byte stride.
+    """
+    positions = mesh['positions'].astype(np.float64)
+    lower = positions.min(axis=0)
+    position_max = (1 << COMPRESSION_CONFIG['position_bits']) - 1
+    scale = max(float((positions.max(axis=0) - lower).max()), 1e-9) / position_max
+    quantized = {
+        'POSITION': np.zeros((len(positions), 4), dtype=np.uint16),
+        'translation': lower.tolist(),
+        'scale': scale
+    }
+    quantized['POSITION'][:, :3] = np.rint((positions - lower) / scale).astype(np.uint16)
+
+    if mesh.get('normals') is not None:
+        normal_max = (1 << (COMPRESSION_CONFIG['normal_bits'] - 1)) - 1
+        normals = np.zeros((len(positions), 4), dtype=np.int8)
+        normals[:, :3] = np.rint(np.clip(mesh['normals'], -1.0, 1.0) * normal_max).astype(np.int8)
+        quantized['NORMAL'] = normals
+
+    if mesh.get('uvs') is not None:
+        uvs = mesh['uvs']
+        if uvs.min() >= 0.0 and uvs.max() <= 1.0:
+            uv_max = (1 << COMPRESSION_CONFIG['uv_bits']) - 1
+            quantized['TEXCOORD_0'] = np.rint(uvs * uv_max).astype(np.uint16)
+        else:
+            quantized['TEXCOORD_0'] = uvs.astype(np.float32)
+
+    return quantized
+
+def build_compressed_glb(mesh):
+    """Build a quantized GLB whose vertex and index streams use EXT_meshopt_compression."""
+    quantized = quantize_mesh(mesh)
+    vertex_count = len(mesh['positions'])
+    indices = mesh['faces'].reshape(-1)
+    index_type = np.uint16 if vertex_count < 65536 else np.uint32
+
+    gltf = {
+        'asset': {'version': '2.0', 'generator': '2dto3d pipeline'},
+        'extensionsUsed': ['KHR_mesh_quantization', 'EXT_meshopt_compression'],
+        'extensionsRequired': ['KHR_mesh_quantization', 'EXT_meshopt_compression'],
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{
+            'mesh': 0,
+            'name': 'geometry_0',
+            'translation': quantized['translation'],
+            'scale': [quantized['scale']] * 3
+        }],
+        'bufferViews': [],
+        'accessors': []
+    }
+    compressed = bytearray()
+    fallback_length = 0
+
+    def add_compressed_view(payload, raw_length, stride, count, mode, target):
+        nonlocal fallback_length
+        while len(compressed) % 4:
+            compressed.append(0)
+        view = {
+            'buffer': 1,
+            'byteOffset': fallback_length,
+            'byteLength': raw_length,
+            'target': target,
+            'extensions': {'EXT_meshopt_compression': {
+                'buffer': 0,
+                'byteOffset': len(compressed),
+                'byteLength': len(payload),
+                'byteStride': stride,
+                'count': count,
+                'mode': mode
+            }}
+        }
+        if mode == 'ATTRIBUTES':
+            view['byteStride'] = stride
+        compressed.extend(payload)
+        fallback_length += (raw_length + 3) & ~3
+        gltf['bufferViews'].append(view)
+        return len(gltf['bufferViews']) - 1
+
+    attributes = {}
+    for name in ('POSITION', 'NORMAL', 'TEXCOORD_0'):
+        if name not in quantized:
+            continue
+        array = quantized[name]
+        raw = array.view(np.uint8).reshape(vertex_count, -1)
+        view = add_compressed_view(encode_vertex_buffer(raw), raw.size, raw.shape[1], vertex_count,
+                                   'ATTRIBUTES', ARRAY_BUFFER)
+        accessor = {
+            'bufferView': view,
+            'componentType': {np.uint16: 5123, np.int8: 5120, np.float32: 5126}[array.dtype.type],
+            'count': vertex_count,
+            'type': 'VEC3' if name != 'TEXCOORD_0' else 'VEC2'
+        }
+        if name == 'POSITION':
+            accessor['min'] = array[:, :3].min(axis=0).tolist()
+            accessor['max'] = array[:, :3].max(axis=0).tolist()
+        elif array.dtype != np.float32:
+            accessor['normalized'] = True
+        gltf['accessors'].append(accessor)
+        attributes[name] = len(gltf['accessors']) - 1
+
+    index_view = add_compressed_view(encode_index_sequence(indices), indices.size * np.dtype(index_type).itemsize,
+                                     np.dtype(index_type).itemsize, indices.size, 'INDICES', ELEMENT_ARRAY_BUFFER)
+    gltf['accessors'].append({
+        'bufferView': index_view,
+        'componentType': 5123 if index_type == np.uint16 else 5125,
+        'count': int(indices.size),
+        'type': 'SCALAR'
+    })
+    primitive = {'attributes': attributes, 'indices': len(gltf['accessors']) - 1, 'material': 0}
+
+    material = json.loads(json.dumps(mesh.get('material') or {'name': 'Material_0'}))
+    texture = mesh.get('texture')
+    if texture is not None:
+        while len(compressed) % 4:
+            compressed.append(0)
+        gltf['bufferViews'].append({'buffer': 0, 'byteOffset': len(compressed), 'byteLength': len(texture['data'])})
+        compressed.extend(texture['data'])
+        gltf['images'] = [{'bufferView': len(gltf['bufferViews']) - 1, 'mimeType': texture['mimeType']}]
+        gltf['textures'] = [{'source': 0}]
+        if texture.get('sampler'):
+            gltf['samplers'] = [texture['sampler']]
+            gltf['textures'][0]['sampler'] = 0
+        material.setdefault('pbrMetallicRoughness', {})['baseColorTexture'] = {'index': 0}
+
+    gltf['materials'] = [material]
+    gltf['meshes'] = [{'name': 'geometry_0', 'primitives': [primitive]}]
+    gltf['buffers'] = [
+        {'byteLength': len(compressed)},
+        {'byteLength': fallback_length, 'extensions': {'EXT_meshopt_compression': {'fallback': True}}}
+    ]
+    return gltf, bytes(compressed)
+
+def decode_compressed_glb(path):
+    """Decode every meshopt-compressed buffer view of a GLB, returning the raw streams."""
+    gltf, bin_data = read_glb(path)
+    streams = []
+    for view in gltf['bufferViews']:
+        extension = view.get('extensions', {}).get('EXT_meshopt_compression')
+        if extension is None:
+            continue
+        payload = bin_data[extension['byteOffset']:extension['byteOffset'] + extension['byteLength']]
+        if extension['mode'] == 'ATTRIBUTES':
+            streams.append(decode_vertex_buffer(payload, extension['count'], extension['byteStride']))
+        else:
+            streams.append(decode_index_sequence(payload, extension['count']))
+    return streams
+
+def compressed_path(glb_path):
+    base, ext = os.path.splitext(glb_path)
+    return f"{base}{COMPRESSION_CONFIG['suffix']}{ext}"
+
+def compress_glb(glb_path, output_path=None):
+    """
+    Write the quantized, meshopt-compressed variant of a GLB and a size/timing
+    report. A variant that is not smaller than the source is deleted and
+    None is returned in place of its path.
+    """
+    output_path = output_path or compressed_path(glb_path)
+    mesh = load_glb_mesh(glb_path)
+
+    start_time = time.time()
+    gltf, bin_data = build_compressed_glb(mesh)
+    compressed_size = write_glb(output_path, gltf, bin_data)
+    encode_time = time.time() - start_time
+
+    start_time = time.time()
+    decode_compressed_glb(output_path)
+    decode_time = time.time() - start_time
+
+    original_size = os.path.getsize(glb_path)
+    original_texture = len(mesh['texture']['data']) if mesh.get('texture') else 0
+    report = {
+        'source': os.path.basename(glb_path),
+        'output': os.path.basename(output_path),
+        'original_bytes': original_size,
+        'compressed_bytes': compressed_size,
+        'ratio': round(compressed_size / original_size, 4) if original_size else None,
+        'geometry_original_bytes': original_size - original_texture,
+        'geometry_compressed_bytes': compressed_size - original_texture,
+        'encode_time_s': round(encode_time, 4),
+        'decode_time_s': round(decode_time, 4),
+        'position_error': float(gltf['nodes'][0]['scale'][0] / 2)
+    }
+    if compressed_size >= original_size:
+        # Small or texture-heavy meshes gain nothing; serving the variant would only add bytes
+        os.remove(output_path)
+        report['skipped'] = 'compressed variant is not smaller than the source'
+        logger.info(f"Skipped compressed variant of {glb_path}: {original_size} -> {compressed_size} bytes")
+        return None, report
+
+    report_path = os.path.splitext(output_path)[0] + '.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    logger.info(f"Compressed {glb_path}: {original_size} -> {compressed_size} bytes "
+                f"(encode {report['encode_time_s']}s, decode {report['decode_time_s']}s)")
+    return output_path, report
+
+def main():
+    parser = argparse.ArgumentParser(description='Write quantized, meshopt-compressed GLB variants')
+    parser.add_argument('inputs', nargs='+', help='GLB files to compress')
+    args = parser.parse_args()
+
+    for glb_path in args.inputs:
+        _, report = compress_glb(glb_path)
+        print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
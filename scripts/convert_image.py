@@ -7,6 +7,14 @@ import requests
 from mpx_genai_sdk import Masterpiecex
 from dotenv import load_dotenv
 from PIL import Image
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from optimize_textures import TEXTURE_CONFIG, optimize_artifacts
+from skin_weights import compute_skin_weights, weight_batches
+from cage_fitting import fit_to_cage, INNER_CAGE_SUFFIX, OUTER_CAGE_SUFFIX
+from normalize_image import normalize_image
+from roblox_rules import ROBLOX_CONFIG
 
 def download_file(url, output_path):
     """
@@ -128,6 +136,64 @@ def rename_downloaded_file(src_path, dst_path):
         print(f"Error renaming file {src_path}: {str(e)}", file=sys.stderr)
         return False
 
+def _world_positions(obj):
+    positions = np.empty(len(obj.data.vertices) * 3, dtype=np.float64)
+    obj.data.vertices.foreach_get('co', positions)
+    matrix = np.array(obj.matrix_world)
+    return positions.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+def _set_world_positions(obj, positions):
+    inverse = np.linalg.inv(np.array(obj.matrix_world))
+    local = positions @ inverse[:3, :3].T + inverse[:3, 3]
+    obj.data.vertices.foreach_set('co', local.ravel())
+    obj.data.update()
+
+def apply_skin_weights(mesh_obj, armature):
+    """
+    Weight the mesh to the armature bones by distance to each bone segment,
+    writing the vertex groups in bulk.
+    """
+    bones = list(armature.data.bones)
+    armature_matrix = np.array(armature.matrix_world)
+    heads = np.array([bone.head_local for bone in bones]) @ armature_matrix[:3, :3].T + armature_matrix[:3, 3]
+    tails = np.array([bone.tail_local for bone in bones]) @ armature_matrix[:3, :3].T + armature_matrix[:3, 3]
+
+    indices, weights, stats = compute_skin_weights(_world_positions(mesh_obj), [bone.name for bone in bones],
+                                                   heads, tails)
+
+    start_time = time.time()
+    mesh_obj.vertex_groups.clear()
+    groups = [mesh_obj.vertex_groups.new(name=bone.name) for bone in bones]
+    for bone_index, weight, vertices in weight_batches(indices, weights):
+        groups[bone_index].add(vertices, weight, 'REPLACE')
+    stats['write_time_s'] = round(time.time() - start_time, 4)
+    return stats
+
+def fit_layered_cages(mesh_obj, cage_obj):
+    """
+    Fit the garment over the R15 body cage and add the inner and outer cage
+    meshes Roblox layered clothing expects.
+    """
+    import bpy
+
+    cage_mesh = cage_obj.data
+    cage_mesh.calc_loop_triangles()
+    cage_faces = np.empty(len(cage_mesh.loop_triangles) * 3, dtype=np.int64)
+    cage_mesh.loop_triangles.foreach_get('vertices', cage_faces)
+
+    fitted, outer, stats = fit_to_cage(_world_positions(mesh_obj), _world_positions(cage_obj),
+                                       cage_faces.reshape(-1, 3))
+    _set_world_positions(mesh_obj, fitted)
+
+    # The body cage is the inner cage; the outer cage shares its topology
+    cage_obj.name = f"{mesh_obj.name}{INNER_CAGE_SUFFIX}"
+    outer_obj = cage_obj.copy()
+    outer_obj.data = cage_mesh.copy()
+    outer_obj.name = f"{mesh_obj.name}{OUTER_CAGE_SUFFIX}"
+    bpy.context.scene.collection.objects.link(outer_obj)
+    _set_world_positions(outer_obj, outer)
+    return stats
+
 def process_outfit_fbx(fbx_path, outfit_type):
     """
     Process an existing FBX file from Masterpiece to meet Roblox outfit requirements.
@@ -174,7 +240,20 @@ def process_outfit_fbx(fbx_path, outfit_type):
                 
             print(f"Found armature: {armature.name}")
             
-            # Parent mesh to armature with automatic weights
+            # Fit the garment over the body cage and emit inner/outer cages
+            cage = next((obj for obj in bpy.context.scene.objects
+                         if obj.type == 'MESH' and obj.name.startswith('R15_Cage')), None)
+            if cage:
+                cage_stats = fit_layered_cages(masterpiece_mesh, cage)
+                print(f"Cage fitting: {json.dumps(cage_stats)}")
+            else:
+                print("Warning: R15_Cage not found in template, skipping cage fitting")
+            
+            # Weight the mesh in world space before parenting changes its transform
+            skin_stats = apply_skin_weights(masterpiece_mesh, armature)
+            print(f"Skin weights: {json.dumps(skin_stats)}")
+            
+            # Parent mesh to armature with the computed weights
             masterpiece_mesh.parent = armature
             mod = masterpiece_mesh.modifiers.new(name="Armature", type='ARMATURE')
             if mod:  # Check if modifier was created successfully
@@ -232,6 +311,10 @@ def process_outfit_fbx(fbx_path, outfit_type):
 
 def convert_image(image_path, file_name, is_outfit='false', outfit_type=''):
     try:
+        # Bring the image within the MPX limits, then validate what is actually submitted
+        image_path, normalize_report = normalize_image(image_path)
+        print(f"Debug: Normalized image: {json.dumps(normalize_report)}", file=sys.stderr)
+
         # Validate image with detailed requirements check
         is_valid, validation_result = validate_image(image_path)
         if not is_valid:
@@ -276,7 +359,7 @@ def convert_image(image_path, file_name, is_outfit='false', outfit_type=''):
         print("\nStarting 3D conversion...")
         response = client.functions.imageto3d(
             image_url=public_url,
-            texture_size=2048
+            texture_size=TEXTURE_CONFIG['source_size']
         )
         print(f"Conversion started! Request ID: {response.requestId}")
         
@@ -352,6 +435,12 @@ def convert_image(image_path, file_name, is_outfit='false', outfit_type=''):
                         else:
                             print(f"Successfully downloaded {file_type} to {file_path}")  # Debug print
                     
+                    # Downscale the embedded textures to the Roblox texture size for this outfit type
+                    texture_size = ROBLOX_CONFIG.get(outfit_type, {}).get('texture_size', TEXTURE_CONFIG['default_size'])
+                    texture_reports = optimize_artifacts([final_paths['glb'], final_paths['fbx']], texture_size)
+                    for report in texture_reports.values():
+                        print(f"Debug: Texture stage for {report['file']}: {report.get('bytes_saved', report.get('error'))}", file=sys.stderr)
+                    
                     if is_outfit == 'true' and outfit_type:
                         # Process the FBX file for the specific outfit type
                         fbx_path = os.path.join(download_dir, f"{file_name}.fbx")
@@ -12,6 +12,25 @@ import trimesh
 import numpy as np
 import subprocess
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generate_lods import ensure_lod_chain
+from compress_glb import compress_glb
+from optimize_vertex_cache import optimize_glb
+from optimize_textures import optimize_artifacts
+from collision_hull import COLLISION_SUFFIX
+from roblox_mesh import export_roblox_mesh
+from roblox_rules import ROBLOX_CONFIG, validate_model_stats
+from render_previews import render_previews
+from lazy_artifacts import register_remote
+from normalize_image import normalize_image
+from remove_background import remove_background, BACKGROUND_CONFIG
+from crop_subject import crop_subject, CROP_CONFIG
+from quality_gate import preflight, record_outcome
+from split_sheet import split_sheet
+from mirror_symmetry import SYMMETRY_CONFIG
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -41,38 +60,32 @@ ROBLOX_STYLE_CONFIG = {
     "scale_factor": 0.01  # Roblox world scale
 }
 
-# Roblox configuration for different outfit types
-ROBLOX_CONFIG = {
-    'clothes': {
-        'max_triangles': 8000,
-        'skeleton': 'R15',
-        'bones': [
-            'HumanoidRootNode', 'Torso', 'UpperTorso', 'LowerTorso',
-            'RightArm', 'RightForearm', 'LeftArm', 'LeftForearm',
-            'RightLeg', 'RightForeleg', 'LeftLeg', 'LeftForeleg'
-        ],
-        'uv_regions': {
-            'shirt': {'top': [0, 0, 1, 0.5], 'bottom': [0, 0.5, 1, 1]},
-            'pants': {'legs': [0, 0, 1, 1]}
-        }
-    },
-    'hats': {
-        'max_triangles': 2000,
-        'size_limits': {'x': 500, 'y': 500, 'z': 500},
-        'attachments': ['HeadAttachment'],
-        'needs_rigging': False
-    },
-    'shoes': {
-        'max_triangles': 1500,
-        'size_limits': {'x': 200, 'y': 200, 'z': 200},
-        'attachments': ['LeftFootAttachment', 'RightFootAttachment'],
-        'needs_rigging': True,
-        'bones': ['LeftFoot', 'RightFoot']
-    }
+MPX_CONFIG = {
+    'max_concurrent_jobs': int(os.getenv('MPX_MAX_CONCURRENT_JOBS', '4'))  # Jobs submitted and polled at once
 }
 
-def process_fbx_for_roblox(fbx_path, outfit_type):
-    """Process downloaded FBX file according to Roblox requirements using Blender."""
+_mpx_slots = threading.BoundedSemaphore(MPX_CONFIG['max_concurrent_jobs'])
+
+def get_texture_size(outfit_type):
+    """Maximum embedded texture size for an outfit type, falling back to the Roblox style default."""
+    return ROBLOX_CONFIG.get(outfit_type, {}).get('texture_size', ROBLOX_STYLE_CONFIG['texture_size'])
+
+def detect_symmetry(image_path):
+    """'symmetric' or 'asymmetric' from the OpenCV analysis of the image, None when it cannot run."""
+    try:
+        from analyze_image import analyze_image
+        return analyze_image(image_path)['shape']['symmetry']
+    except Exception as e:
+        logger.error(f"Symmetry detection failed, not mirroring: {str(e)}")
+        return None
+
+def process_fbx_for_roblox(fbx_path, outfit_type, symmetric=False):
+    """
+    Process downloaded FBX file according to Roblox requirements using Blender.
+
+    Returns the processed path, or None when processing failed; the
+    unprocessed MPX FBX is never passed off as the Roblox variant.
+    """
     try:
         logger.info(f"Starting Roblox FBX processing for {outfit_type}")
         logger.info(f"Source FBX: {fbx_path}")
@@ -97,11 +110,14 @@ def process_fbx_for_roblox(fbx_path, outfit_type):
         
         # Run Blender process
         logger.info("Executing Blender process")
+        # Symmetric items are processed as one half and mirrored (see mirror_symmetry.py)
+        env = dict(os.environ, MIRROR_SYMMETRY='1') if symmetric else None
         result = subprocess.run(
             cmd,
             capture_output=True,
             text=True,
-            check=True
+            check=True,
+            env=env
         )
         
         # Parse the JSON output from the script
@@ -132,16 +148,32 @@ def process_fbx_for_roblox(fbx_path, outfit_type):
                 logger.info(f"  - Vertices: {stats['processing_summary']['geometry_change']['vertices_delta']:+d}")
                 logger.info(f"  - Triangles: {stats['processing_summary']['geometry_change']['triangles_delta']:+d}")
                 logger.info(f"Applied Modifications: {', '.join(stats['processing_summary']['modifications_applied'])}")
+                for mesh_name, cache_stats in stats.get('vertex_cache', {}).items():
+                    logger.info(f"Vertex cache ACMR ({mesh_name}): {cache_stats['acmr_before']} -> {cache_stats['acmr_after']}")
+                for mesh_name, bake_stats in stats.get('normal_bake', {}).items():
+                    logger.info(f"Normal map baked ({mesh_name}): {bake_stats['output']} in {bake_stats['bake_time_s']}s")
+                for mesh_name, hull_stats in stats.get('collision', {}).items():
+                    logger.info(f"Collision hull ({mesh_name}): {hull_stats['parts']} parts, {hull_stats['vertices']} vertices")
+                for mesh_name, atlas_stats in stats.get('material_atlas', {}).items():
+                    logger.info(f"Material atlas ({mesh_name}): {atlas_stats['draw_calls_before']} -> "
+                                f"{atlas_stats['draw_calls_after']} draw calls, fill {atlas_stats['fill_ratio']}, "
+                                f"texture memory {atlas_stats['texture_memory_before']} -> {atlas_stats['texture_memory_after']} bytes")
+                for mesh_name, plane in stats.get('mirror_symmetry', {}).items():
+                    logger.info(f"Mirror symmetry ({mesh_name}): match {plane['match_ratio']}, "
+                                f"{plane['half_triangles']} -> {plane['triangles']} triangles")
+                if 'export' in stats:
+                    logger.info(f"FBX export: {stats['export']['fbx_bytes']} bytes in {stats['export']['fbx_export_time_s']}s")
                 
-                # Log any warnings or errors
-                if stats['roblox_validation']['warnings']:
+                # Log any warnings or errors; the Roblox rules themselves are checked by verify_model_for_roblox
+                validation = stats.get('roblox_validation', {})
+                if validation.get('warnings'):
                     logger.warning("Validation Warnings:")
-                    for warning in stats['roblox_validation']['warnings']:
+                    for warning in validation['warnings']:
                         logger.warning(f"  - {warning}")
                 
-                if stats['roblox_validation']['errors']:
+                if validation.get('errors'):
                     logger.error("Validation Errors:")
-                    for error in stats['roblox_validation']['errors']:
+                    for error in validation['errors']:
                         logger.error(f"  - {error}")
             
             logger.info("FBX processing completed successfully")
@@ -150,16 +182,16 @@ def process_fbx_for_roblox(fbx_path, outfit_type):
         except json.JSONDecodeError:
             logger.error("Failed to parse Blender output")
             logger.error(f"Raw output: {result.stdout}")
-            return fbx_path
+            return None
             
     except subprocess.CalledProcessError as e:
         logger.error("Blender process failed")
         logger.error(f"Exit code: {e.returncode}")
         logger.error(f"Error output: {e.stderr}")
-        return fbx_path
+        return None
     except Exception as e:
         logger.error(f"Unexpected error in FBX processing: {str(e)}")
-        return fbx_path
+        return None
 
 def verify_model_for_roblox(mesh_path, outfit_type):
     """Verify and log model statistics for Roblox requirements using Blender."""
@@ -183,11 +215,14 @@ def get_mesh_stats():
         'materials': 0,
         'uvs': 0,
         'vertex_groups': 0,
-        'armature': None
+        'armature': None,
+        'collision_meshes': 0
     }
     
     for obj in bpy.data.objects:
-        if obj.type == 'MESH':
+        if obj.type == 'MESH' and obj.name.endswith('%s'):
+            stats['collision_meshes'] += 1
+        elif obj.type == 'MESH':
             mesh = obj.data
             stats['vertices'] += len(mesh.vertices)
             stats['faces'] += len(mesh.polygons)
@@ -231,7 +266,8 @@ result = {
     'geometry': {
         'vertices': stats['vertices'],
         'triangles': stats['faces'],
-        'edges': stats['edges']
+        'edges': stats['edges'],
+        'collision_meshes': stats['collision_meshes']
     },
     'materials': {
         'count': stats['materials'],
@@ -252,7 +288,7 @@ result = {
 print("STATS_START")
 print(json.dumps(result))
 print("STATS_END")
-''' % mesh_path
+''' % (COLLISION_SUFFIX, mesh_path)
         ]
         
         # Run Blender process
@@ -270,41 +306,8 @@ print("STATS_END")
         stats = json.loads(stats_json)
         
         # Add validation results
-        config = ROBLOX_CONFIG.get(outfit_type, {})
-        validation = {
-            'warnings': [],
-            'errors': []
-        }
-        
-        # Check triangle count
-        max_triangles = config.get('max_triangles', 8000)
-        if stats['geometry']['triangles'] > max_triangles:
-            validation['errors'].append(
-                f"Triangle count ({stats['geometry']['triangles']}) exceeds limit ({max_triangles})"
-            )
-            
-        # Check dimensions
-        if 'size_limits' in config:
-            for axis, limit in config['size_limits'].items():
-                if stats['dimensions'][axis] > limit:
-                    validation['warnings'].append(
-                        f"{axis.upper()} dimension ({stats['dimensions'][axis]:.2f}) exceeds recommended limit ({limit})"
-                    )
-                    
-        # Check rigging requirements
-        if config.get('needs_rigging', False):
-            if not stats['rigging']['armature']:
-                validation['errors'].append("Missing required armature")
-            else:
-                required_bones = config.get('bones', [])
-                missing_bones = [bone for bone in required_bones 
-                               if bone not in stats['rigging']['armature']['bone_names']]
-                if missing_bones:
-                    validation['errors'].append(f"Missing required bones: {', '.join(missing_bones)}")
-                    
-        # Check UV maps
-        if stats['materials']['uv_layers'] == 0:
-            validation['errors'].append("No UV maps found")
+        stats['outfit_type'] = outfit_type
+        validation = validate_model_stats(stats, outfit_type)
             
         stats['validation'] = validation
         return stats
@@ -330,6 +333,7 @@ def download_file(url, output_path):
         return False
 
 def create_3d_model(params, input_path, output_path):
+    slot_held = False
     try:
         # Log input information
         logger.info("=== Starting 3D Model Creation ===")
@@ -350,11 +354,75 @@ def create_3d_model(params, input_path, output_path):
         )
         logger.info("SDK initialized successfully")
 
+        # Bring the upload within the MPX input limits so it is neither rejected nor oversized
+        try:
+            submit_path, normalize_report = normalize_image(input_path)
+        except Exception as e:
+            logger.error(f"Image normalization failed, submitting the original: {str(e)}")
+            submit_path, normalize_report = input_path, {'error': str(e)}
+
+        # Optional background removal on the pooled segmentation sessions
+        remove_bg = params.get('removeBackground')
+        if remove_bg is None:
+            remove_bg = BACKGROUND_CONFIG['enabled']
+        background_report = None
+        if remove_bg:
+            try:
+                # The upload digest is the source hash when normalization kept the original
+                upload_hash = (params.get('upload') or {}).get('sha256') if submit_path == input_path else None
+                submit_path, background_report = remove_background(submit_path, image_hash=upload_hash)
+                logger.info(f"Background removed: {json.dumps(background_report)}")
+            except Exception as e:
+                logger.error(f"Background removal failed, submitting without it: {str(e)}")
+                background_report = {'error': str(e)}
+
+        # Optional crop to the subject, so MPX gets a smaller upload that the subject fills
+        crop = params.get('cropSubject')
+        if crop is None:
+            crop = CROP_CONFIG['enabled']
+        crop_report = None
+        if crop:
+            try:
+                upload_hash = (params.get('upload') or {}).get('sha256') if submit_path == input_path else None
+                submit_path, crop_report = crop_subject(submit_path, image_hash=upload_hash)
+            except Exception as e:
+                logger.error(f"Subject crop failed, submitting uncropped: {str(e)}")
+                crop_report = {'error': str(e)}
+
+        # Mirror hint for outfit items not always mirrored; clients may send it, otherwise it is detected here
+        symmetry = params.get('symmetry')
+        symmetry_report = None
+        if is_outfit and outfit_type and outfit_type not in SYMMETRY_CONFIG['outfit_types']:
+            source = 'request' if symmetry else 'analysis'
+            if not symmetry:
+                symmetry = detect_symmetry(submit_path)
+            symmetry_report = {'value': symmetry, 'source': source}
+            logger.info(f"Symmetry: {json.dumps(symmetry_report)}")
+        symmetric = symmetry == 'symmetric'
+
+        # Reject images likely to fail generation before paying for an MPX job
+        try:
+            upload_hash = (params.get('upload') or {}).get('sha256') if submit_path == input_path else None
+            allowed, quality_report = preflight(submit_path, image_hash=upload_hash)
+        except Exception as e:
+            logger.error(f"Quality gate failed, submitting unchecked: {str(e)}")
+            allowed, quality_report = True, {'error': str(e)}
+        if not allowed:
+            return {
+                'success': False,
+                'error': f"Image rejected by quality check: {'; '.join(quality_report['reasons'])}",
+                'quality': quality_report
+            }
+        quality_hash = quality_report.get('source_hash')
+
         # Construct the URL for the uploaded image
-        image_url = f"http://40.81.21.27/uploads/{os.path.basename(input_path)}"
+        image_url = f"http://40.81.21.27/uploads/{os.path.basename(submit_path)}"
         logger.info(f"Using image URL: {image_url}")
 
         # Start 3D conversion with Masterpiece (matching debug.py parameters)
+        # Sheet items and concurrent requests share the MPX job slots
+        _mpx_slots.acquire()
+        slot_held = True
         logger.info("Starting Masterpiece 2D to 3D conversion...")
         response = client.functions.imageto3d(
             image_url=image_url,
@@ -373,6 +441,9 @@ def create_3d_model(params, input_path, output_path):
 
             if status_response.status == "complete":
                 logger.info("Masterpiece conversion complete!")
+                record_outcome(quality_hash, request_id, 'complete')
+                _mpx_slots.release()
+                slot_held = False
                 logger.info(f"Processing time: {status_response.processing_time_s}s")
                 
                 if hasattr(status_response, 'outputs'):
@@ -388,19 +459,78 @@ def create_3d_model(params, input_path, output_path):
                         'thumbnail': f"{base_name}_{timestamp}_thumb.png"
                     }
 
-                    # Download all available output files
+                    # Download the formats the processing needs; the rest are fetched on first request
                     downloaded_files = {}
                     output_dir = os.path.dirname(output_path)
+                    eager_types = {'glb', 'fbx'} if is_outfit and outfit_type else {'glb'}
+                    texture_size = get_texture_size(outfit_type)
                     
                     for file_type, filename in output_files.items():
                         if hasattr(outputs, file_type) and getattr(outputs, file_type):
                             url = getattr(outputs, file_type)
                             file_path = os.path.join(output_dir, filename)
+                            if file_type not in eager_types:
+                                register_remote(output_dir, filename, url, file_type, texture_size)
+                                downloaded_files[file_type] = filename
+                                logger.info(f"Deferred {file_type} download until first request")
+                                continue
                             logger.info(f"Downloading {file_type} file from: {url}")
                             
                             if download_file(url, file_path):
                                 downloaded_files[file_type] = filename
                     
+                    # Enforce the texture size on the embedded GLB/FBX images
+                    processing_stats = {}
+                    if params.get('upload'):
+                        processing_stats['upload'] = params['upload']
+                    if params.get('parentJob'):
+                        processing_stats['parent_job'] = params['parentJob']
+                    processing_stats['normalize'] = normalize_report
+                    if background_report:
+                        processing_stats['background_removal'] = background_report
+                    if crop_report:
+                        processing_stats['crop'] = crop_report
+                    processing_stats['quality'] = quality_report
+                    if symmetry_report:
+                        processing_stats['symmetry'] = symmetry_report
+                    texture_artifacts = [
+                        os.path.join(output_dir, downloaded_files[file_type])
+                        for file_type in ('glb', 'fbx') if file_type in downloaded_files and file_type in eager_types
+                    ]
+                    if texture_artifacts:
+                        logger.info(f"=== Optimizing Textures ({texture_size}px) ===")
+                        processing_stats['textures'] = {
+                            os.path.basename(path): report
+                            for path, report in optimize_artifacts(texture_artifacts, texture_size).items()
+                        }
+
+                    # Reorder the GLB index buffer for vertex cache locality
+                    if 'glb' in downloaded_files:
+                        try:
+                            processing_stats['vertex_cache'] = optimize_glb(
+                                os.path.join(output_dir, downloaded_files['glb'])
+                            )
+                        except Exception as e:
+                            logger.error(f"Vertex cache optimization failed: {str(e)}")
+
+                    # Build the progressive LOD chain for the web viewer
+                    if 'glb' in downloaded_files:
+                        logger.info("=== Generating LOD Chain ===")
+                        manifest_path = ensure_lod_chain(os.path.join(output_dir, downloaded_files['glb']))
+                        if manifest_path:
+                            downloaded_files['lods'] = os.path.basename(manifest_path)
+
+                        # Write the quantized, meshopt-compressed variant
+                        try:
+                            compressed_glb, compression_report = compress_glb(
+                                os.path.join(output_dir, downloaded_files['glb'])
+                            )
+                            if compressed_glb:
+                                downloaded_files['glb_meshopt'] = os.path.basename(compressed_glb)
+                            logger.info(f"Compressed GLB ratio: {compression_report['ratio']}")
+                        except Exception as e:
+                            logger.error(f"GLB compression failed: {str(e)}")
+                    
                     # After downloading all files, process FBX for Roblox if needed
                     if is_outfit and outfit_type and 'fbx' in downloaded_files:
                         logger.info("=== Starting Roblox FBX Processing ===")
@@ -412,10 +542,11 @@ def create_3d_model(params, input_path, output_path):
                             logger.error(f"Original FBX file not found at: {fbx_path}")
                             raise FileNotFoundError(f"FBX file not found: {fbx_path}")
                         
-                        processed_path = process_fbx_for_roblox(fbx_path, outfit_type)
+                        processed_path = process_fbx_for_roblox(fbx_path, outfit_type, symmetric)
                         logger.info(f"Processed FBX path: {processed_path}")
                         
                         if processed_path and os.path.exists(processed_path):
+                            fbx_stats_path = processed_path.replace('.fbx', '_stats.json')
                             # Add processed file to downloads
                             roblox_filename = f"{base_name}_{timestamp}_roblox.fbx"
                             target_path = os.path.join(output_dir, roblox_filename)
@@ -424,6 +555,22 @@ def create_3d_model(params, input_path, output_path):
                             downloaded_files['fbx_roblox'] = roblox_filename
                             logger.info(f"Successfully added Roblox FBX: {roblox_filename}")
                             
+                            # Compact binary mesh written straight from the FBX arrays, no Blender pass
+                            try:
+                                mesh_path, mesh_report = export_roblox_mesh(
+                                    target_path, scale=ROBLOX_STYLE_CONFIG['scale_factor']
+                                )
+                                downloaded_files['roblox_mesh'] = os.path.basename(mesh_path)
+                                if os.path.exists(fbx_stats_path):
+                                    with open(fbx_stats_path) as f:
+                                        mesh_report['fbx_export_time_s'] = json.load(f).get('export', {}).get('fbx_export_time_s')
+                                processing_stats['roblox_mesh'] = mesh_report
+                                logger.info(f"Roblox mesh: {mesh_report['bytes']} bytes vs {mesh_report['fbx_bytes']} bytes FBX "
+                                            f"(ratio {mesh_report['size_ratio']}), written in {mesh_report['write_time_s']}s "
+                                            f"vs FBX export {mesh_report.get('fbx_export_time_s')}s")
+                            except Exception as e:
+                                logger.error(f"Roblox mesh export failed: {str(e)}")
+                            
                             # Verify and log Roblox-specific metrics
                             logger.info("=== Starting Roblox Validation ===")
                             roblox_stats = verify_model_for_roblox(target_path, outfit_type)
@@ -436,7 +583,9 @@ def create_3d_model(params, input_path, output_path):
                                 downloaded_files['validation_stats'] = stats_filename
                                 logger.info("Validation stats saved successfully")
                         else:
+                            # Report the failure instead of delivering the unprocessed FBX as the Roblox variant
                             logger.error("FBX processing failed - no processed file generated")
+                            processing_stats['roblox_fbx'] = {'error': 'FBX processing failed - no processed file generated'}
                     else:
                         logger.info("Skipping Roblox FBX processing - not an outfit or no FBX file available")
                         if not is_outfit:
@@ -446,17 +595,32 @@ def create_3d_model(params, input_path, output_path):
                         elif 'fbx' not in downloaded_files:
                             logger.info("Reason: No FBX file in downloaded files")
 
+                    # Turntable sprites for the web viewer and the processed Roblox variant
+                    preview_keys = [key for key in ('glb', 'fbx_roblox') if key in downloaded_files]
+                    if preview_keys:
+                        logger.info("=== Rendering Turntable Previews ===")
+                        preview_paths = {key: os.path.join(output_dir, downloaded_files[key]) for key in preview_keys}
+                        preview_reports = render_previews(list(preview_paths.values()))
+                        processing_stats['previews'] = {}
+                        for key, path in preview_paths.items():
+                            report = preview_reports[path]
+                            processing_stats['previews'][key] = report
+                            if 'sprite' in report:
+                                downloaded_files[f"{key}_turntable"] = report['sprite']
+
                     logger.info("=== Conversion Summary ===")
                     logger.info(f"Downloaded files: {json.dumps(downloaded_files, indent=2)}")
                     
                     return {
                         'success': True,
                         'files': downloaded_files,
+                        'stats': processing_stats,
                         'requestId': request_id
                     }
                 break
             elif status_response.status == "failed":
                 error_msg = status_response.error if hasattr(status_response, 'error') else "Unknown error"
+                record_outcome(quality_hash, request_id, 'failed', str(error_msg))
                 raise Exception(f"Conversion failed: {error_msg}")
                 
             time.sleep(10)
@@ -468,6 +632,63 @@ def create_3d_model(params, input_path, output_path):
             'success': False,
             'error': str(e)
         }
+    finally:
+        if slot_held:
+            _mpx_slots.release()
+
+def create_sheet_models(params, input_path, output_path):
+    """
+    Convert every item of a multi-item sheet as its own MPX job.
+
+    Items run in parallel within the MPX job slots and each goes through
+    the normal create_3d_model pipeline. The results are grouped under one
+    parent id, with item artifacts merged into 'files' as item<N>_<type>.
+    A sheet with a single item is converted as a plain upload.
+    """
+    upload_hash = (params.get('upload') or {}).get('sha256')
+    try:
+        item_paths, split_report = split_sheet(input_path, image_hash=upload_hash)
+    except Exception as e:
+        logger.error(f"Sheet splitting failed, converting the whole image: {str(e)}")
+        item_paths, split_report = [], {'error': str(e)}
+
+    if len(item_paths) < 2:
+        result = create_3d_model(params, input_path, output_path)
+        result['split'] = split_report
+        return result
+
+    parent_id = f"sheet_{split_report['source_hash'][:12]}_{time.strftime('%Y%m%d%H%M%S')}"
+    logger.info(f"Converting {len(item_paths)} items of {os.path.basename(input_path)} as {parent_id}")
+    item_params = {key: value for key, value in params.items() if key != 'upload'}
+    item_params['parentJob'] = parent_id
+    output_dir = os.path.dirname(output_path)
+
+    with ThreadPoolExecutor(max_workers=MPX_CONFIG['max_concurrent_jobs']) as executor:
+        futures = [
+            executor.submit(create_3d_model, item_params, item_path,
+                            os.path.join(output_dir, f"{os.path.splitext(os.path.basename(item_path))[0]}.glb"))
+            for item_path in item_paths
+        ]
+        results = [future.result() for future in futures]
+
+    items, files = [], {}
+    for index, (item_path, result) in enumerate(zip(item_paths, results), 1):
+        items.append(dict(result, index=index, image=os.path.basename(item_path)))
+        for file_type, filename in result.get('files', {}).items():
+            files[f"item{index}_{file_type}"] = filename
+
+    succeeded = sum(1 for result in results if result['success'])
+    logger.info(f"Sheet {parent_id}: {succeeded}/{len(items)} items converted")
+    result = {
+        'success': succeeded > 0,
+        'parentId': parent_id,
+        'items': items,
+        'files': files,
+        'split': split_report
+    }
+    if not succeeded:
+        result['error'] = '; '.join(f"item {item['index']}: {item.get('error')}" for item in items)
+    return result
 
 def main():
     parser = argparse.ArgumentParser(description='Convert 2D image to 3D model')
@@ -475,6 +696,8 @@ def main():
     parser.add_argument('-o', '--output', required=True, help='Output GLB path')
     parser.add_argument('--is-outfit', action='store_true', help='Process as Roblox outfit')
     parser.add_argument('--outfit-type', choices=['clothes', 'hats', 'shoes'], help='Type of outfit')
+    parser.add_argument('--symmetry', choices=['symmetric', 'asymmetric'],
+                        help='Mirror hint for the outfit; detected from the image when omitted')
     args = parser.parse_args()
 
     # Verify input file exists
@@ -488,7 +711,8 @@ def main():
     # Run conversion
     params = {
         'isOutfit': args.is_outfit,
-        'outfitType': args.outfit_type
+        'outfitType': args.outfit_type,
+        'symmetry': args.symmetry
     }
     result = create_3d_model(params, args.input, args.output)
     
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import shutil
+import logging
+import argparse
+import cv2
+import numpy as np
+from PIL import Image
+
+from analyze_image import find_subject_contour
+from normalize_image import NORMALIZE_CONFIG
+from remove_background import file_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CROP_CONFIG = {
+    'enabled': os.getenv('CROP_SUBJECT', '0') == '1',  # Default for requests without an explicit choice
+    'margin': float(os.getenv('CROP_MARGIN', '0.08')),  # Fraction of the subject's longer side kept around it
+    'alpha_threshold': 16,        # Alpha above this counts as subject
+    'min_part_ratio': 0.05,       # Contours this fraction of the main one are kept as parts of the subject
+    'min_gain': 0.9,              # Skip crops that would keep more than this fraction of the pixels
+    'cache_dir': '.crop_cache',
+    'suffix': '_cropped'
+}
+
+def _settings_key():
+    """Short digest of the settings a cached crop depends on, so changing any of them misses the cache."""
+    settings = {key: CROP_CONFIG[key] for key in ('margin', 'alpha_threshold', 'min_part_ratio', 'min_gain')}
+    settings.update(min_size=NORMALIZE_CONFIG['min_size'], jpeg_quality=NORMALIZE_CONFIG['jpeg_quality'])
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+def _alpha_bounds(alpha):
+    mask = alpha > CROP_CONFIG['alpha_threshold']
+    rows, cols = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+    if not len(rows):
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)
+
+def _contour_bounds(rgb):
+    """Bounds of the analyze_image main contour, plus any sizeable separate parts such as a pair of shoes."""
+    main_contour, contours, _ = find_subject_contour(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+    if main_contour is None:
+        return None
+    min_area = cv2.contourArea(main_contour) * CROP_CONFIG['min_part_ratio']
+    parts = [c for c in contours if cv2.contourArea(c) >= min_area] or [main_contour]
+    return cv2.boundingRect(np.vstack(parts))
+
+def crop_box(bounds, image_size, min_size=None):
+    """Expand subject bounds by the margin and to the MPX minimum side, clamped to the image."""
+    x, y, w, h = bounds
+    width, height = image_size
+    margin = round(max(w, h) * CROP_CONFIG['margin'])
+    min_size = NORMALIZE_CONFIG['min_size'] if min_size is None else min_size
+    box = []
+    for start, length, limit in ((x, w, width), (y, h, height)):
+        size = min(max(length + 2 * margin, min_size), limit)
+        low = min(max(start + length // 2 - size // 2, 0), limit - size)
+        box.append((low, low + size))
+    return box[0][0], box[1][0], box[0][1], box[1][1]
+
+def cropped_path(image_path, image_format):
+    base = os.path.splitext(image_path)[0]
+    return f"{base}{CROP_CONFIG['suffix']}.{'png' if image_format == 'PNG' else 'jpg'}"
+
+def crop_subject(image_path, output_path=None, image_hash=None):
+    """
+    Crop an image to its subject plus a margin.
+
+    The subject comes from the alpha channel when the image has real
+    transparency (a background-removed upload) and from the analyze_image
+    main contour otherwise. Decisions and crops are cached by source hash
+    and crop settings; a caller that already hashed the file can pass image_hash. Returns the
+    path to submit and a report; the original is returned when the subject
+    already fills the frame.
+    """
+    start_time = time.time()
+    image_hash = image_hash or file_hash(image_path)
+    cache_dir = os.path.join(os.path.dirname(image_path), CROP_CONFIG['cache_dir'])
+    cache_key = f"{image_hash}_{_settings_key()}"
+    record_path = os.path.join(cache_dir, f"{cache_key}.json")
+
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        record = None
+
+    if record is None:
+        with Image.open(image_path) as img:
+            transparent = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            img = img.convert('RGBA' if transparent else 'RGB')
+            pixels = np.asarray(img)
+            bounds, method = None, 'contour'
+            if transparent:
+                bounds, method = _alpha_bounds(pixels[..., 3]), 'alpha'
+            if bounds is None or (method == 'alpha' and bounds[2] * bounds[3] == img.width * img.height):
+                bounds, method = _contour_bounds(np.ascontiguousarray(pixels[..., :3])), 'contour'
+
+            record = {'size_before': list(img.size), 'method': method, 'subject': None, 'box': None,
+                      'format': 'PNG' if transparent else 'JPEG'}
+            if bounds is not None:
+                record['subject'] = list(bounds)
+                box = crop_box(bounds, img.size)
+                if (box[2] - box[0]) * (box[3] - box[1]) <= CROP_CONFIG['min_gain'] * img.width * img.height:
+                    record['box'] = list(box)
+                    cached = os.path.join(cache_dir, f"{cache_key}.{'png' if transparent else 'jpg'}")
+                    os.makedirs(cache_dir, exist_ok=True)
+                    temp_path = f"{cached}.{os.getpid()}.tmp"
+                    if transparent:
+                        img.crop(box).save(temp_path, format='PNG')
+                    else:
+                        img.crop(box).save(temp_path, format='JPEG', quality=NORMALIZE_CONFIG['jpeg_quality'],
+                                           optimize=True)
+                    os.replace(temp_path, cached)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(f"{record_path}.{os.getpid()}.tmp", 'w') as f:
+            json.dump(record, f)
+        os.replace(f"{record_path}.{os.getpid()}.tmp", record_path)
+        cache_hit = False
+    else:
+        cache_hit = True
+
+    report = dict(record, source_hash=image_hash, cached=cache_hit)
+    if record['box'] is None:
+        output_path = image_path
+        report['size_after'] = record['size_before']
+    else:
+        output_path = output_path or cropped_path(image_path, record['format'])
+        shutil.copyfile(os.path.join(cache_dir, f"{cache_key}.{'png' if record['format'] == 'PNG' else 'jpg'}"),
+                        output_path)
+        x0, y0, x1, y1 = record['box']
+        report['size_after'] = [x1 - x0, y1 - y0]
+
+    report.update(file=os.path.basename(output_path), bytes_before=os.path.getsize(image_path),
+                  bytes_after=os.path.getsize(output_path), crop_time_s=round(time.time() - start_time, 4))
+    logger.info(f"Cropped {os.path.basename(image_path)}: {report['size_before']} -> {report['size_after']} "
+                f"({report['method']}{', cached' if cache_hit else ''})")
+    return output_path, report
+
+def main():
+    parser = argparse.ArgumentParser(description='Crop images to their subject')
+    parser.add_argument('inputs', nargs='+', help='Image files')
+    args = parser.parse_args()
+
+    failed = False
+    for image_path in args.inputs:
+        try:
+            _, report = crop_subject(image_path)
+            print(json.dumps(report))
+        except Exception as e:
+            print(f"{image_path}: failed - {str(e)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import struct
+import zlib
+import numpy as np
+
+# Binary FBX container constants (as written by Blender and the FBX SDK)
+FBX_MAGIC = b'Kaydara FBX Binary  \x00\x1a\x00'
+FOOT_ID = b'\xfa\xbc\xab\x09\xd0\xc8\xd4\x66\xb1\x76\xfb\x83\x1c\xf7\x26\x7e'
+FOOT_MAGIC = b'\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b'
+
+SCALAR_FORMATS = {'Y': '<h', 'C': '<?', 'I': '<i', 'F': '<f', 'D': '<d', 'L': '<q'}
+ARRAY_DTYPES = {'f': np.float32, 'd': np.float64, 'l': np.int64, 'i': np.int32, 'b': np.bool_}
+
+def _header_format(version):
+    """Node record header layout: 64-bit offsets from FBX 7.5 on."""
+    return '<QQQ' if version >= 7500 else '<III'
+
+def _read_property(data, offset):
+    code = chr(data[offset])
+    offset += 1
+    if code in SCALAR_FORMATS:
+        fmt = SCALAR_FORMATS[code]
+        return (code, struct.unpack_from(fmt, data, offset)[0]), offset + struct.calcsize(fmt)
+    if code in ARRAY_DTYPES:
+        length, encoding, compressed_length = struct.unpack_from('<III', data, offset)
+        offset += 12
+        raw = bytes(data[offset:offset + compressed_length])
+        return (code, {'length': length, 'encoding': encoding, 'data': raw}), offset + compressed_length
+    if code in ('S', 'R'):
+        length = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        return (code, bytes(data[offset:offset + length])), offset + length
+    raise ValueError(f"Unknown FBX property type: {code!r}")
+
+def _read_node(data, offset, version):
+    header = _header_format(version)
+    header_size = struct.calcsize(header)
+    end_offset, num_props, _ = struct.unpack_from(header, data, offset)
+    if end_offset == 0:
+        return None, offset + header_size + 1
+
+    name_length = data[offset + header_size]
+    offset += header_size + 1
+    node = {
+        'name': data[offset:offset + name_length].decode('utf-8', errors='replace'),
+        'props': [],
+        'children': [],
+        'sentinel': False
+    }
+    offset += name_length
+
+    for _ in range(num_props):
+        prop, offset = _read_property(data, offset)
+        node['props'].append(prop)
+
+    if offset < end_offset:
+        node['sentinel'] = True
+        while offset < end_offset:
+            child, offset = _read_node(data, offset, version)
+            if child is None:
+                break
+            node['children'].append(child)
+    return node, end_offset
+
+def parse_fbx(data):
+    """Parse binary FBX bytes into (version, list of top-level nodes)."""
+    if not data.startswith(FBX_MAGIC):
+        raise ValueError("Not a binary FBX file")
+    version = struct.unpack_from('<I', data, len(FBX_MAGIC))[0]
+    offset = len(FBX_MAGIC) + 4
+    nodes = []
+    while offset < len(data):
+        node, offset = _read_node(data, offset, version)
+        if node is None:
+            break
+        nodes.append(node)
+    return version, nodes
+
+def read_fbx(path):
+    """Read a binary FBX file and return (version, top-level nodes)."""
+    with open(path, 'rb') as f:
+        return parse_fbx(f.read())
+
+def _write_property(out, prop):
+    code, value = prop
+    out += code.encode('ascii')
+    if code in SCALAR_FORMATS:
+        out += struct.pack(SCALAR_FORMATS[code], value)
+    elif code in ARRAY_DTYPES:
+        out += struct.pack('<III', value['length'], value['encoding'], len(value['data']))
+        out += value['data']
+    else:
+        out += struct.pack('<I', len(value)) + value
+
+def _write_node(out, node, version):
+    header = _header_format(version)
+    header_size = struct.calcsize(header)
+    start = len(out)
+    out += bytes(header_size)
+    name = node['name'].encode('utf-8')
+    out += bytes([len(name)]) + name
+
+    props_start = len(out)
+    for prop in node['props']:
+        _write_property(out, prop)
+    props_length = len(out) - props_start
+
+    if node['children'] or node['sentinel']:
+        for child in node['children']:
+            _write_node(out, child, version)
+        out += bytes(header_size + 1)
+    struct.pack_into(header, out, start, len(out), len(node['props']), props_length)
+
+def encode_fbx(version, nodes):
+    """Serialize nodes back into binary FBX bytes with a standard footer."""
+    out = bytearray(FBX_MAGIC)
+    out += struct.pack('<I', version)
+    for node in nodes:
+        _write_node(out, node, version)
+    out += bytes(struct.calcsize(_header_format(version)) + 1)
+
+    out += FOOT_ID + bytes(4)
+    padding = ((len(out) + 15) & ~15) - len(out)
+    out += bytes(padding or 16)
+    out += struct.pack('<I', version) + bytes(120) + FOOT_MAGIC
+    return bytes(out)
+
+def write_fbx(path, version, nodes):
+    """Write nodes to a binary FBX file and return the number of bytes written."""
+    data = encode_fbx(version, nodes)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def find_child(node, name):
+    """First direct child with the given name, or None."""
+    return next((child for child in node['children'] if child['name'] == name), None)
+
+def find_children(node, name):
+    """All direct children with the given name."""
+    return [child for child in node['children'] if child['name'] == name]
+
+def find_node(nodes, name):
+    """First top-level node with the given name, or None."""
+    return next((node for node in nodes if node['name'] == name), None)
+
+def array_value(prop):
+    """Decode an array property into a NumPy array."""
+    code, value = prop
+    raw = zlib.decompress(value['data']) if value['encoding'] == 1 else value['data']
+    return np.frombuffer(raw, dtype=ARRAY_DTYPES[code], count=value['length'])
+
+def make_array(code, array, compress=True):
+    """Build an array property, zlib-compressing it as the FBX SDK does for large arrays."""
+    raw = np.ascontiguousarray(array, dtype=ARRAY_DTYPES[code]).tobytes()
+    encoding = 1 if compress else 0
+    return (code, {'length': len(array), 'encoding': encoding, 'data': zlib.compress(raw) if compress else raw})
+
+def string_value(prop):
+    """Decode a string property, dropping the FBX name/class separator."""
+    return prop[1].split(b'\x00\x01')[0].decode('utf-8', errors='replace')
+
+def properties70(node):
+    """Map Properties70 entries of an object node to their value lists."""
+    block = find_child(node, 'Properties70')
+    if block is None:
+        return {}
+    return {
+        p['props'][0][1].decode('utf-8', errors='replace'): [value for _, value in p['props'][4:]]
+        for p in block['children'] if p['name'] == 'P'
+    }
+
+def _euler_matrix(degrees):
+    """Rotation for FBX eEulerXYZ order (X applied first)."""
+    x, y, z = np.radians(degrees)
+    rx = np.array([[1, 0, 0], [0, np.cos(x), -np.sin(x)], [0, np.sin(x), np.cos(x)]])
+    ry = np.array([[np.cos(y), 0, np.sin(y)], [0, 1, 0], [-np.sin(y), 0, np.cos(y)]])
+    rz = np.array([[np.cos(z), -np.sin(z), 0], [np.sin(z), np.cos(z), 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+def model_matrix(model):
+    """Local 4x4 transform of a Model node (translation, pre-rotation, rotation, scaling)."""
+    props = properties70(model)
+    matrix = np.eye(4)
+    matrix[:3, :3] = (_euler_matrix(props.get('PreRotation', [0, 0, 0]))
+                      @ _euler_matrix(props.get('Lcl Rotation', [0, 0, 0]))
+                      @ np.diag(props.get('Lcl Scaling', [1, 1, 1])))
+    matrix[:3, 3] = props.get('Lcl Translation', [0, 0, 0])
+    return matrix
+
+def _layer_values(geometry, layer_name, data_name, index_name, polygon_vertices, polygon_index, width):
+    """Expand a layer element to one value per polygon corner."""
+    layer = find_child(geometry, layer_name)
+    if layer is None or find_child(layer, data_name) is None:
+        return None
+    values = array_value(find_child(layer, data_name)['props'][0]).reshape(-1, width)
+    mapping = string_value(find_child(layer, 'MappingInformationType')['props'][0])
+    reference = string_value(find_child(layer, 'ReferenceInformationType')['props'][0])
+
+    if mapping == 'ByPolygonVertex':
+        index = np.arange(len(polygon_vertices))
+    elif mapping in ('ByVertice', 'ByVertex'):
+        index = polygon_vertices
+    elif mapping == 'ByPolygon':
+        index = polygon_index
+    else:
+        index = np.zeros(len(polygon_vertices), dtype=np.int64)
+
+    if reference == 'IndexToDirect' and find_child(layer, index_name) is not None:
+        index = array_value(find_child(layer, index_name)['props'][0])[index]
+    return values[index]
+
+def object_graph(nodes):
+    """
+    Index the objects of a parsed FBX by id and follow its object-object
+    connections. Returns (objects by id, first parent id per child, child ids
+    per parent).
+    """
+    objects = find_node(nodes, 'Objects')
+    connections = find_node(nodes, 'Connections')
+    by_id = {child['props'][0][1]: child for child in objects['children'] if child['props']} if objects else {}
+    parents, children = {}, {}
+    for connection in connections['children'] if connections else []:
+        if string_value(connection['props'][0]) == 'OO':
+            child_id, parent_id = connection['props'][1][1], connection['props'][2][1]
+            parents.setdefault(child_id, parent_id)
+            children.setdefault(parent_id, []).append(child_id)
+    return by_id, parents, children
+
+def load_fbx_meshes(path):
+    """
+    Read every mesh of a binary FBX into world-space arrays without Blender.
+
+    Polygons are fan-triangulated and corners split where normals or UVs
+    differ. Returns a list of {'name', 'positions', 'normals', 'uvs', 'faces'}
+    plus the source 'model_id' and its 'control_points', 'polygons' and
+    'edges' counts.
+    """
+    _, nodes = read_fbx(path)
+    objects = find_node(nodes, 'Objects')
+    if objects is None:
+        return []
+    by_id, parents, _ = object_graph(nodes)
+
+    def world_matrix(object_id):
+        matrix = np.eye(4)
+        while object_id in by_id and by_id[object_id]['name'] == 'Model':
+            matrix = model_matrix(by_id[object_id]) @ matrix
+            object_id = parents.get(object_id, 0)
+        return matrix
+
+    meshes = []
+    for geometry in find_children(objects, 'Geometry'):
+        if find_child(geometry, 'Vertices') is None or find_child(geometry, 'PolygonVertexIndex') is None:
+            continue
+        model_id = parents.get(geometry['props'][0][1])
+        model = by_id.get(model_id)
+        matrix = world_matrix(model_id)
+
+        vertices = array_value(find_child(geometry, 'Vertices')['props'][0]).reshape(-1, 3)
+        polygon_vertices = array_value(find_child(geometry, 'PolygonVertexIndex')['props'][0]).astype(np.int64)
+        polygon_end = polygon_vertices < 0
+        polygon_vertices = np.where(polygon_end, ~polygon_vertices, polygon_vertices)
+        polygon_index = np.concatenate([[0], np.cumsum(polygon_end)[:-1]])
+
+        normals = _layer_values(geometry, 'LayerElementNormal', 'Normals', 'NormalsIndex',
+                                polygon_vertices, polygon_index, 3)
+        uvs = _layer_values(geometry, 'LayerElementUV', 'UV', 'UVIndex',
+                            polygon_vertices, polygon_index, 2)
+
+        # Fan triangulation: corner k of a polygon forms (first, k - 1, k) for k >= 2
+        starts = np.flatnonzero(np.concatenate([[True], polygon_end[:-1]]))
+        corner = np.arange(len(polygon_vertices)) - np.repeat(starts, np.diff(np.append(starts, len(polygon_vertices))))
+        fan = np.flatnonzero(corner >= 2)
+        triangles = np.stack([np.repeat(starts, np.diff(np.append(starts, len(polygon_vertices))))[fan],
+                              fan - 1, fan], axis=1)
+
+        # Polygon edges join each corner to the next, wrapping at the polygon end
+        following = np.arange(1, len(polygon_vertices) + 1)
+        following[polygon_end] = starts
+        edges = np.sort(np.stack([polygon_vertices, polygon_vertices[following]], axis=1), axis=1)
+
+        # Split shared vertices only where a corner attribute value differs
+        keys = [polygon_vertices[:, None]]
+        if normals is not None:
+            keys.append(np.rint(normals * 1e4).astype(np.int64))
+        if uvs is not None:
+            keys.append(np.rint(uvs * 1e6).astype(np.int64))
+        _, first, remap = np.unique(np.hstack(keys), axis=0, return_index=True, return_inverse=True)
+        remap = remap.reshape(-1)
+
+        positions = vertices[polygon_vertices[first]] @ matrix[:3, :3].T + matrix[:3, 3]
+        if normals is not None:
+            normals = normals[first] @ np.linalg.inv(matrix[:3, :3])
+            normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        meshes.append({
+            'name': string_value(model['props'][1]) if model else string_value(geometry['props'][1]),
+            'positions': positions,
+            'normals': normals,
+            'uvs': uvs[first] if uvs is not None else None,
+            'faces': remap[triangles].astype(np.uint32),
+            'model_id': model_id,
+            'control_points': int(len(vertices)),
+            'polygons': int(polygon_end.sum()),
+            'edges': int(len(np.unique(edges, axis=0)))
+        })
+    return meshes
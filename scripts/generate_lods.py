@@ -0,0 +1,230 @@
+import os
+import sys
+import io
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from glb_io import load_glb_mesh, save_glb_mesh
+from optimize_vertex_cache import optimize_mesh_order
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Levels of detail generated for every GLB, coarsest first. A level without a
+# triangle budget is the original file itself.
+LOD_CONFIG = {
+    'levels': [
+        {'name': 'lod0', 'max_triangles': 500, 'texture_size': 256},
+        {'name': 'lod1', 'max_triangles': 2000, 'texture_size': 512},
+        {'name': 'full', 'max_triangles': None, 'texture_size': None}
+    ],
+    'max_workers': int(os.getenv('LOD_MAX_WORKERS', '2')),
+    'timeout_s': 120
+}
+
+_executor = None
+
+def lod_paths(glb_path):
+    """Return the manifest path and per-level file paths for a GLB."""
+    base = os.path.splitext(glb_path)[0]
+    return f"{base}_lods.json", {
+        level['name']: f"{base}_{level['name']}.glb" if level['max_triangles'] else glb_path
+        for level in LOD_CONFIG['levels']
+    }
+
+def cluster_vertices(mesh, resolution):
+    """
+    Vertex-clustering simplification on a uniform grid.
+
+    Vertices sharing a position cell (and a UV cell, so texture seams survive)
+    collapse onto the member closest to the cell centroid.
+    Returns the new faces expressed in original vertex indices.
+    """
+    positions = mesh['positions']
+    lower = positions.min(axis=0)
+    extent = max(float((positions.max(axis=0) - lower).max()), 1e-9)
+    cells = np.floor((positions - lower) / extent * resolution).astype(np.int64)
+    cells = np.minimum(cells, resolution - 1)
+    keys = [cells]
+
+    if mesh.get('uvs') is not None:
+        uv_cells = np.floor(np.clip(mesh['uvs'], 0.0, 1.0) * resolution).astype(np.int64)
+        keys.append(np.minimum(uv_cells, resolution - 1))
+
+    _, labels = np.unique(np.hstack(keys), axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    cluster_count = labels.max() + 1
+
+    # Pick the vertex nearest to its cluster centroid as the representative
+    sums = np.zeros((cluster_count, 3))
+    np.add.at(sums, labels, positions)
+    centroids = sums / np.bincount(labels, minlength=cluster_count)[:, None]
+    distance = np.linalg.norm(positions - centroids[labels], axis=1)
+    order = np.lexsort((distance, labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    representative = np.empty(cluster_count, dtype=np.int64)
+    representative[labels[order][first]] = order[first]
+
+    faces = representative[labels[mesh['faces']]]
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[keep]
+
+    # Drop duplicate triangles regardless of winding start
+    _, unique_index = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return faces[np.sort(unique_index)]
+
+def compact_mesh(mesh, faces):
+    """Return a copy of the mesh containing only the vertices used by faces."""
+    used, remapped = np.unique(faces, return_inverse=True)
+    compacted = dict(mesh)
+    compacted['positions'] = mesh['positions'][used]
+    compacted['normals'] = mesh['normals'][used] if mesh.get('normals') is not None else None
+    compacted['uvs'] = mesh['uvs'][used] if mesh.get('uvs') is not None else None
+    compacted['faces'] = remapped.reshape(-1, 3).astype(np.uint32)
+    return compacted
+
+def simplify_mesh(mesh, max_triangles):
+    """Binary-search the grid resolution giving the most triangles within budget."""
+    if len(mesh['faces']) <= max_triangles:
+        return mesh
+
+    best = None
+    low, high = 2, 1024
+    while low <= high:
+        resolution = (low + high) // 2
+        faces = cluster_vertices(mesh, resolution)
+        if len(faces) <= max_triangles:
+            best = faces
+            low = resolution + 1
+        else:
+            high = resolution - 1
+
+    if best is None:
+        best = cluster_vertices(mesh, 2)
+    return compact_mesh(mesh, best)
+
+def resize_texture(texture, size):
+    """Downscale an embedded texture so its longest side is at most size."""
+    if texture is None or not size:
+        return texture
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow not available, keeping full-size LOD texture")
+        return texture
+
+    with Image.open(io.BytesIO(texture['data'])) as img:
+        if max(img.size) <= size:
+            return texture
+        img.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if texture['mimeType'] == 'image/jpeg':
+            img.convert('RGB').save(buffer, format='JPEG', quality=85, optimize=True)
+        else:
+            img.save(buffer, format='PNG', optimize=True)
+
+    resized = dict(texture)
+    resized['data'] = buffer.getvalue()
+    return resized
+
+def manifest_is_current(manifest_path, glb_path):
+    """Check whether a cached manifest was generated from the current GLB."""
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        stat = os.stat(glb_path)
+        if manifest['source_size'] != stat.st_size or manifest['source_mtime'] != stat.st_mtime:
+            return False
+        directory = os.path.dirname(manifest_path)
+        return all(os.path.exists(os.path.join(directory, level['file'])) for level in manifest['levels'])
+    except (OSError, ValueError, KeyError):
+        return False
+
+def generate_lod_chain(glb_path):
+    """Write the LOD GLBs and manifest for a GLB, reusing a current cache."""
+    manifest_path, level_paths = lod_paths(glb_path)
+    if manifest_is_current(manifest_path, glb_path):
+        logger.info(f"LOD chain up to date: {manifest_path}")
+        return manifest_path
+
+    start_time = time.time()
+    mesh = load_glb_mesh(glb_path)
+    stat = os.stat(glb_path)
+    levels = []
+
+    for level in LOD_CONFIG['levels']:
+        level_path = level_paths[level['name']]
+        if level['max_triangles'] is None:
+            level_mesh = mesh
+            size = stat.st_size
+        else:
+            level_mesh, _ = optimize_mesh_order(simplify_mesh(mesh, level['max_triangles']))
+            level_mesh['texture'] = resize_texture(mesh['texture'], level['texture_size'])
+            size = save_glb_mesh(level_path, level_mesh)
+        levels.append({
+            'name': level['name'],
+            'file': os.path.basename(level_path),
+            'triangles': int(len(level_mesh['faces'])),
+            'vertices': int(len(level_mesh['positions'])),
+            'bytes': size
+        })
+        logger.info(f"LOD {level['name']}: {levels[-1]['triangles']} triangles, {size} bytes")
+
+    manifest = {
+        'source': os.path.basename(glb_path),
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+        'levels': levels,
+        'generation_time_s': round(time.time() - start_time, 3)
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"LOD manifest written to {manifest_path}")
+    return manifest_path
+
+def get_executor():
+    """Return the shared worker pool used for LOD generation."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=LOD_CONFIG['max_workers'])
+    return _executor
+
+def ensure_lod_chain(glb_path):
+    """Generate the LOD chain for a GLB in a worker process and return the manifest path."""
+    manifest_path, _ = lod_paths(glb_path)
+    if manifest_is_current(manifest_path, glb_path):
+        return manifest_path
+    try:
+        future = get_executor().submit(generate_lod_chain, glb_path)
+        return future.result(timeout=LOD_CONFIG['timeout_s'])
+    except Exception as e:
+        logger.error(f"LOD generation failed for {glb_path}: {str(e)}")
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate progressive LOD GLBs with a manifest')
+    parser.add_argument('inputs', nargs='+', help='GLB files to process')
+    args = parser.parse_args()
+
+    failed = False
+    with ProcessPoolExecutor(max_workers=LOD_CONFIG['max_workers']) as executor:
+        futures = {glb_path: executor.submit(generate_lod_chain, glb_path) for glb_path in args.inputs}
+        for glb_path, future in futures.items():
+            try:
+                print(f"{glb_path}: {future.result()}")
+            except Exception as e:
+                print(f"{glb_path}: failed - {str(e)}", file=sys.stderr)
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
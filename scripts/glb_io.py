@@ -0,0 +1,268 @@
+import json
+import struct
+import numpy as np
+
+# Binary glTF container constants
+GLB_MAGIC = 0x46546C67  # 'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32
+}
+DTYPE_COMPONENTS = {np.dtype(v): k for k, v in COMPONENT_DTYPES.items()}
+TYPE_SIZES = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4, 'MAT4': 16}
+SIZE_TYPES = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4'}
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+def _pad(data, fill=b'\x00'):
+    """Pad a byte string to a 4-byte boundary as required by the GLB spec."""
+    remainder = len(data) % 4
+    return data if remainder == 0 else data + fill * (4 - remainder)
+
+def read_glb(path):
+    """Read a GLB file and return its JSON document and binary chunk."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return parse_glb(data)
+
+def parse_glb(data):
+    """Split GLB bytes into the parsed JSON document and the BIN chunk."""
+    magic, version, length = struct.unpack_from('<III', data, 0)
+    if magic != GLB_MAGIC:
+        raise ValueError("Not a binary glTF file")
+    if version != GLB_VERSION:
+        raise ValueError(f"Unsupported glTF version: {version}")
+
+    gltf = None
+    bin_data = b''
+    offset = 12
+    while offset < length:
+        chunk_length, chunk_type = struct.unpack_from('<II', data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(chunk.decode('utf-8'))
+        elif chunk_type == CHUNK_BIN:
+            bin_data = bytes(chunk)
+        offset += 8 + chunk_length
+
+    if gltf is None:
+        raise ValueError("GLB file has no JSON chunk")
+    return gltf, bin_data
+
+def encode_glb(gltf, bin_data):
+    """Serialize a glTF document and binary buffer into GLB bytes."""
+    json_chunk = _pad(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
+    chunks = struct.pack('<II', len(json_chunk), CHUNK_JSON) + json_chunk
+    if bin_data:
+        bin_chunk = _pad(bin_data)
+        chunks += struct.pack('<II', len(bin_chunk), CHUNK_BIN) + bin_chunk
+    return struct.pack('<III', GLB_MAGIC, GLB_VERSION, 12 + len(chunks)) + chunks
+
+def write_glb(path, gltf, bin_data):
+    """Write a GLB file and return the number of bytes written."""
+    data = encode_glb(gltf, bin_data)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def read_buffer_view(gltf, bin_data, index):
+    """Return the raw bytes referenced by a buffer view."""
+    view = gltf['bufferViews'][index]
+    start = view.get('byteOffset', 0)
+    return bin_data[start:start + view['byteLength']]
+
+def read_accessor(gltf, bin_data, index):
+    """Decode an accessor into a NumPy array of shape (count, components)."""
+    accessor = gltf['accessors'][index]
+    dtype = np.dtype(COMPONENT_DTYPES[accessor['componentType']])
+    components = TYPE_SIZES[accessor['type']]
+    count = accessor['count']
+
+    view = gltf['bufferViews'][accessor['bufferView']]
+    offset = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+    element_size = dtype.itemsize * components
+    stride = view.get('byteStride', element_size)
+
+    if stride == element_size:
+        array = np.frombuffer(bin_data, dtype=dtype, count=count * components, offset=offset)
+        array = array.reshape(count, components)
+    else:
+        rows = np.frombuffer(bin_data, dtype=np.uint8, count=stride * (count - 1) + element_size, offset=offset)
+        array = np.lib.stride_tricks.as_strided(rows, shape=(count, element_size), strides=(stride, 1))
+        array = np.ascontiguousarray(array).view(dtype).reshape(count, components)
+
+    if accessor.get('normalized', False):
+        array = array.astype(np.float32) / float(np.iinfo(dtype).max)
+    return array
+
+def load_glb_mesh(path):
+    """
+    Load every triangle primitive of a GLB into a single mesh dictionary.
+
+    Primitives are merged in document order and the first textured material is
+    kept, which matches the single-material layout of Masterpiece X outputs.
+    """
+    gltf, bin_data = read_glb(path)
+
+    positions, normals, uvs, faces = [], [], [], []
+    material = None
+    vertex_offset = 0
+
+    for gltf_mesh in gltf.get('meshes', []):
+        for primitive in gltf_mesh['primitives']:
+            if primitive.get('mode', 4) != 4:
+                continue
+            attributes = primitive['attributes']
+            primitive_positions = read_accessor(gltf, bin_data, attributes['POSITION']).astype(np.float32)
+            count = len(primitive_positions)
+            positions.append(primitive_positions)
+
+            if 'NORMAL' in attributes:
+                normals.append(read_accessor(gltf, bin_data, attributes['NORMAL']).astype(np.float32))
+            else:
+                normals.append(None)
+            if 'TEXCOORD_0' in attributes:
+                uvs.append(read_accessor(gltf, bin_data, attributes['TEXCOORD_0']).astype(np.float32))
+            else:
+                uvs.append(None)
+
+            if 'indices' in primitive:
+                indices = read_accessor(gltf, bin_data, primitive['indices']).reshape(-1).astype(np.uint32)
+            else:
+                indices = np.arange(count, dtype=np.uint32)
+            faces.append(indices.reshape(-1, 3) + vertex_offset)
+            vertex_offset += count
+
+            if material is None and 'material' in primitive:
+                material = gltf['materials'][primitive['material']]
+
+    if not positions:
+        raise ValueError(f"No triangle primitives found in {path}")
+
+    mesh = {
+        'positions': np.concatenate(positions),
+        'normals': np.concatenate(normals) if all(n is not None for n in normals) else None,
+        'uvs': np.concatenate(uvs) if all(u is not None for u in uvs) else None,
+        'faces': np.concatenate(faces).astype(np.uint32),
+        'material': None,
+        'texture': None
+    }
+
+    if material is not None:
+        material = json.loads(json.dumps(material))
+        pbr = material.get('pbrMetallicRoughness', {})
+        texture_info = pbr.pop('baseColorTexture', None)
+        for key in ('normalTexture', 'occlusionTexture', 'emissiveTexture'):
+            material.pop(key, None)
+        mesh['material'] = material
+
+        if texture_info is not None:
+            texture = gltf['textures'][texture_info['index']]
+            image = gltf['images'][texture['source']]
+            if 'bufferView' in image:
+                mesh['texture'] = {
+                    'data': read_buffer_view(gltf, bin_data, image['bufferView']),
+                    'mimeType': image.get('mimeType', 'image/png'),
+                    'sampler': gltf['samplers'][texture['sampler']] if 'sampler' in texture else None
+                }
+
+    return mesh
+
+class _BufferBuilder:
+    """Accumulates buffer views and accessors for a single-buffer GLB."""
+
+    def __init__(self, gltf):
+        self.gltf = gltf
+        self.data = bytearray()
+        gltf.setdefault('bufferViews', [])
+        gltf.setdefault('accessors', [])
+
+    def add_view(self, payload, target=None, byte_stride=None):
+        while len(self.data) % 4:
+            self.data.append(0)
+        view = {'buffer': 0, 'byteOffset': len(self.data), 'byteLength': len(payload)}
+        if target is not None:
+            view['target'] = target
+        if byte_stride is not None:
+            view['byteStride'] = byte_stride
+        self.data.extend(payload)
+        self.gltf['bufferViews'].append(view)
+        return len(self.gltf['bufferViews']) - 1
+
+    def add_accessor(self, array, target=None, normalized=False, bounds=False, byte_stride=None):
+        array = np.ascontiguousarray(array)
+        components = 1 if array.ndim == 1 else array.shape[1]
+        view = self.add_view(array.tobytes(), target, byte_stride)
+        accessor = {
+            'bufferView': view,
+            'componentType': DTYPE_COMPONENTS[array.dtype],
+            'count': int(array.shape[0]),
+            'type': SIZE_TYPES[components]
+        }
+        if normalized:
+            accessor['normalized'] = True
+        if bounds:
+            accessor['min'] = array.reshape(len(array), -1).min(axis=0).tolist()
+            accessor['max'] = array.reshape(len(array), -1).max(axis=0).tolist()
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+def index_dtype(vertex_count):
+    """Smallest unsigned index type able to address the given vertex count."""
+    return np.uint16 if vertex_count < 65536 else np.uint32
+
+def build_glb(mesh, generator='2dto3d pipeline'):
+    """Build a glTF document and binary buffer for a mesh dictionary."""
+    gltf = {
+        'asset': {'version': '2.0', 'generator': generator},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0, 'name': 'geometry_0'}],
+        'buffers': []
+    }
+    builder = _BufferBuilder(gltf)
+
+    attributes = {
+        'POSITION': builder.add_accessor(mesh['positions'].astype(np.float32), ARRAY_BUFFER, bounds=True)
+    }
+    if mesh.get('normals') is not None:
+        attributes['NORMAL'] = builder.add_accessor(mesh['normals'].astype(np.float32), ARRAY_BUFFER)
+    if mesh.get('uvs') is not None:
+        attributes['TEXCOORD_0'] = builder.add_accessor(mesh['uvs'].astype(np.float32), ARRAY_BUFFER)
+
+    indices = mesh['faces'].reshape(-1).astype(index_dtype(len(mesh['positions'])))
+    primitive = {
+        'attributes': attributes,
+        'indices': builder.add_accessor(indices, ELEMENT_ARRAY_BUFFER)
+    }
+
+    material = json.loads(json.dumps(mesh.get('material') or {'name': 'Material_0'}))
+    texture = mesh.get('texture')
+    if texture is not None:
+        image_view = builder.add_view(texture['data'])
+        gltf['images'] = [{'bufferView': image_view, 'mimeType': texture['mimeType']}]
+        gltf['textures'] = [{'source': 0}]
+        if texture.get('sampler'):
+            gltf['samplers'] = [texture['sampler']]
+            gltf['textures'][0]['sampler'] = 0
+        material.setdefault('pbrMetallicRoughness', {})['baseColorTexture'] = {'index': 0}
+    gltf['materials'] = [material]
+    primitive['material'] = 0
+
+    gltf['meshes'] = [{'name': 'geometry_0', 'primitives': [primitive]}]
+    gltf['buffers'] = [{'byteLength': len(builder.data)}]
+    return gltf, bytes(builder.data)
+
+def save_glb_mesh(path, mesh, generator='2dto3d pipeline'):
+    """Write a mesh dictionary to a GLB file and return its size in bytes."""
+    gltf, bin_data = build_glb(mesh, generator)
+    return write_glb(path, gltf, bin_data)
@@ -0,0 +1,98 @@
+import struct
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SOI = b'\xff\xd8\xff'
+
+PNG_COLOR_TYPES = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+JPEG_COMPONENTS = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# Start-of-frame markers carry the image size; C4, C8 and CC are other tables
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD9))
+
+class TruncatedHeader(ValueError):
+    """The data ended before the header fields were complete; more bytes may still parse."""
+
+def sniff_format(head):
+    """Image format from the first bytes of a file ('PNG', 'JPEG'), or None."""
+    if head.startswith(PNG_SIGNATURE):
+        return 'PNG'
+    if head.startswith(JPEG_SOI):
+        return 'JPEG'
+    return None
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise TruncatedHeader("Truncated image header")
+    return data
+
+def _png_header(f):
+    f.seek(len(PNG_SIGNATURE))
+    length, chunk_type = struct.unpack('>I4s', _read_exact(f, 8))
+    if chunk_type != b'IHDR' or length != 13:
+        raise ValueError("PNG is missing its IHDR chunk")
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', _read_exact(f, 13))
+    f.seek(4, 1)
+
+    # Palette and grey/RGB images carry transparency in a tRNS chunk ahead of the pixel data
+    has_alpha = color_type in (4, 6)
+    while not has_alpha:
+        length, chunk_type = struct.unpack('>I4s', _read_exact(f, 8))
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        has_alpha = chunk_type == b'tRNS'
+        f.seek(length + 4, 1)
+
+    return {
+        'format': 'PNG',
+        'width': width,
+        'height': height,
+        'mode': PNG_COLOR_TYPES.get(color_type, 'unknown'),
+        'bit_depth': bit_depth,
+        'has_alpha': has_alpha,
+        'interlaced': bool(interlace)
+    }
+
+def _jpeg_header(f):
+    f.seek(2)
+    while True:
+        byte = _read_exact(f, 1)
+        if byte != b'\xff':
+            raise ValueError("Corrupt JPEG marker stream")
+        marker = _read_exact(f, 1)[0]
+        while marker == 0xFF:  # Fill bytes before a marker
+            marker = _read_exact(f, 1)[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9 or marker == 0xDA:
+            raise ValueError("JPEG has no frame header")
+        length = struct.unpack('>H', _read_exact(f, 2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            bit_depth, height, width, components = struct.unpack('>BHHB', _read_exact(f, 6))
+            return {
+                'format': 'JPEG',
+                'width': width,
+                'height': height,
+                'mode': JPEG_COMPONENTS.get(components, 'unknown'),
+                'bit_depth': bit_depth,
+                'has_alpha': False,
+                'progressive': marker in (0xC2, 0xC6, 0xCA, 0xCE)
+            }
+        f.seek(length - 2, 1)
+
+def read_image_header(f):
+    """
+    Parse format, size and color layout of a PNG or JPEG file object.
+
+    Only the signature and the header chunks or segments are read, seeking
+    past everything else; pixel data is never touched. Raises ValueError
+    for other formats and malformed headers.
+    """
+    f.seek(0)
+    image_format = sniff_format(f.read(len(PNG_SIGNATURE)))
+    if image_format == 'PNG':
+        return _png_header(f)
+    if image_format == 'JPEG':
+        return _jpeg_header(f)
+    raise ValueError("Unsupported image format")
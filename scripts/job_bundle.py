@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import zlib
+import struct
+import hashlib
+
+BUNDLE_CONFIG = {
+    'jobs_dir': '.jobs',
+    'chunk_size': 64 * 1024,
+    'compress_level': 6,
+    # Entries whose payload is already compressed (images, zlib FBX arrays, zip-based USDZ) are stored as-is
+    'stored_extensions': {'.png', '.jpg', '.jpeg', '.fbx', '.glb', '.usdz', '.zip'}
+}
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+UTF8_FLAG = 0x0800
+ZIP_VERSION = 20
+
+def _manifest_path(output_dir, job_id):
+    return os.path.join(output_dir, BUNDLE_CONFIG['jobs_dir'], f"{job_id}.json")
+
+def _write_manifest(output_dir, job_id, manifest):
+    path = _manifest_path(output_dir, job_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, path)
+
+def save_job(output_dir, job_id, files):
+    """Record the artifact files of a job so they can be bundled later."""
+    _write_manifest(output_dir, job_id, {'job_id': job_id, 'created': time.time(), 'files': files, 'entries': {}})
+
+def load_job(output_dir, job_id):
+    """Job manifest, or None when the job is unknown."""
+    try:
+        with open(_manifest_path(output_dir, job_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = (max(t.tm_year - 1980, 0) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+def _read_chunks(path, skip=0):
+    with open(path, 'rb') as f:
+        f.seek(skip)
+        for block in iter(lambda: f.read(BUNDLE_CONFIG['chunk_size']), b''):
+            yield block
+
+def _payload_chunks(path, method):
+    """File contents as they appear in the archive; raw deflate is deterministic, so resumes can replay it."""
+    if method == 0:
+        yield from _read_chunks(path)
+        return
+    compressor = zlib.compressobj(BUNDLE_CONFIG['compress_level'], zlib.DEFLATED, -15)
+    for block in _read_chunks(path):
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _scan_entry(path, method):
+    """CRC-32 and archived size of a file, streamed without keeping the payload."""
+    crc = 0
+    for block in _read_chunks(path):
+        crc = zlib.crc32(block, crc)
+    compressed_size = sum(len(data) for data in _payload_chunks(path, method)) if method else os.path.getsize(path)
+    return crc, compressed_size
+
+def bundle_layout(output_dir, job_id, selected=None):
+    """
+    Byte layout of a job's ZIP bundle.
+
+    Entry CRCs and compressed sizes are scanned once and cached in the job
+    manifest by file size and mtime, so the archive length is known up front
+    and a range can be served without producing the bytes before it.
+    Returns (segments, total_size, etag) or None for an unknown job.
+    """
+    manifest = load_job(output_dir, job_id)
+    if manifest is None:
+        return None
+
+    cache = manifest.setdefault('entries', {})
+    updated = False
+    segments, central, offset = [], [], 0
+    for file_type, filename in manifest['files'].items():
+        if selected and file_type not in selected:
+            continue
+        path = os.path.join(output_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        method = 0 if os.path.splitext(filename)[1].lower() in BUNDLE_CONFIG['stored_extensions'] else 8
+        entry = cache.get(filename)
+        if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime or entry['method'] != method:
+            crc, compressed_size = _scan_entry(path, method)
+            entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'method': method,
+                     'crc': crc, 'compressed_size': compressed_size}
+            cache[filename] = entry
+            updated = True
+
+        name = filename.encode('utf-8')
+        dos_time, dos_date = _dos_datetime(entry['mtime'])
+        header = LOCAL_HEADER.pack(0x04034B50, ZIP_VERSION, UTF8_FLAG, method, dos_time, dos_date,
+                                   entry['crc'], entry['compressed_size'], entry['size'], len(name), 0) + name
+        central.append(CENTRAL_HEADER.pack(0x02014B50, ZIP_VERSION, ZIP_VERSION, UTF8_FLAG, method, dos_time, dos_date,
+                                           entry['crc'], entry['compressed_size'], entry['size'], len(name),
+                                           0, 0, 0, 0, 0, offset) + name)
+        segments.append(('bytes', header))
+        segments.append(('file', path, method, entry['compressed_size']))
+        offset += len(header) + entry['compressed_size']
+
+    directory = b''.join(central)
+    if offset + len(directory) > 0xFFFFFFFF or len(central) > 0xFFFF:
+        raise ValueError("Bundle exceeds the ZIP32 limits")
+    segments.append(('bytes', directory + END_RECORD.pack(0x06054B50, 0, 0, len(central), len(central),
+                                                          len(directory), offset, 0)))
+    total_size = offset + len(segments[-1][1])
+
+    if updated:
+        _write_manifest(output_dir, job_id, manifest)
+    etag = hashlib.sha256(b''.join(s[1] for s in segments if s[0] == 'bytes')).hexdigest()[:32]
+    return segments, total_size, etag
+
+def stream_bundle(segments, start=0, end=None):
+    """Yield archive bytes start..end (inclusive) from the layout, reading one chunk at a time."""
+    position = 0
+    for segment in segments:
+        length = len(segment[1]) if segment[0] == 'bytes' else segment[3]
+        if end is not None and position > end:
+            return
+        if position + length <= start:
+            position += length
+            continue
+        if segment[0] == 'bytes':
+            chunks = [segment[1]]
+        elif segment[2] == 0:
+            # Stored entries can seek straight to the resume point
+            skip = max(start - position, 0)
+            position += skip
+            chunks = _read_chunks(segment[1], skip)
+        else:
+            chunks = _payload_chunks(segment[1], segment[2])
+        for data in chunks:
+            chunk_start, chunk_end = position, position + len(data)
+            position = chunk_end
+            if chunk_end <= start:
+                continue
+            if end is not None and chunk_start > end:
+                return
+            lo = max(start - chunk_start, 0)
+            hi = len(data) if end is None else min(end + 1 - chunk_start, len(data))
+            yield data[lo:hi]
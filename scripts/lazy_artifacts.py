@@ -0,0 +1,103 @@
+import os
+import json
+import fcntl
+import logging
+import threading
+import requests
+
+from optimize_textures import optimize_artifacts
+
+logger = logging.getLogger(__name__)
+
+# Output formats only fetched from Masterpiece X the first time they are requested
+LAZY_CONFIG = {
+    'registry_dir': '.remote',
+    'chunk_size': 64 * 1024,
+    'timeout_s': 120,
+    'texture_types': ('glb', 'fbx')  # Formats with embedded textures, size-enforced like eager downloads
+}
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _entry_path(output_dir, filename):
+    return os.path.join(output_dir, LAZY_CONFIG['registry_dir'], f"{filename}.json")
+
+def register_remote(output_dir, filename, url, file_type, texture_size=None):
+    """Record where an output file can be fetched from, and its texture size limit, without downloading it."""
+    path = _entry_path(output_dir, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'file_type': file_type, 'url': url, 'texture_size': texture_size}, f)
+
+def remote_entry(output_dir, filename):
+    try:
+        with open(_entry_path(output_dir, filename)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _fetch(output_dir, filename, entry):
+    """
+    Stream a remote file to disk; a lock file keeps other worker processes
+    from fetching it twice. Embedded textures are resized before the file
+    becomes visible, as for the formats downloaded with the job.
+    """
+    target = os.path.join(output_dir, filename)
+    with open(_entry_path(output_dir, filename) + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(target):
+            return True
+        # Keep the extension last, the texture stage picks the format from it
+        root, extension = os.path.splitext(target)
+        temp_path = f"{root}.{os.getpid()}.part{extension}"
+        url = entry['url']
+        try:
+            with requests.get(url, stream=True, timeout=LAZY_CONFIG['timeout_s']) as response:
+                if response.status_code != 200:
+                    logger.error(f"Failed to fetch {filename}: {response.status_code}")
+                    return False
+                with open(temp_path, 'wb') as f:
+                    for block in response.iter_content(LAZY_CONFIG['chunk_size']):
+                        f.write(block)
+            if entry.get('file_type') in LAZY_CONFIG['texture_types']:
+                optimize_artifacts([temp_path], entry.get('texture_size'))
+            os.replace(temp_path, target)
+            logger.info(f"Fetched {filename} on demand")
+            return True
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+def ensure_artifact(output_dir, filename):
+    """
+    Make sure an output file is on disk, fetching it on first use.
+
+    Concurrent requests for the same file share one download: the first
+    caller fetches, the others wait for it. Returns False when the file is
+    neither local nor registered, or the fetch failed.
+    """
+    if os.path.exists(os.path.join(output_dir, filename)):
+        return True
+    entry = remote_entry(output_dir, filename)
+    if entry is None:
+        return False
+
+    with _inflight_lock:
+        event = _inflight.get(filename)
+        owner = event is None
+        if owner:
+            event = _inflight[filename] = threading.Event()
+    if not owner:
+        event.wait(LAZY_CONFIG['timeout_s'])
+        return os.path.exists(os.path.join(output_dir, filename))
+
+    try:
+        return _fetch(output_dir, filename, entry)
+    except Exception as e:
+        logger.error(f"Error fetching {filename}: {str(e)}")
+        return False
+    finally:
+        with _inflight_lock:
+            _inflight.pop(filename, None)
+        event.set()
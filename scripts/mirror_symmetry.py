@@ -0,0 +1,99 @@
+import numpy as np
+
+SYMMETRY_CONFIG = {
+    'outfit_types': ['shoes'],  # Always tried for these; other items need an explicit symmetric hint
+    'tolerance': 0.02,          # Match distance as a fraction of the bounding box diagonal
+    'min_match_ratio': 0.9,     # Share of mirrored vertices that must land near a vertex
+    'sample_size': 20000,       # Vertices tested per candidate plane
+    'lateral_axis': [1.0, 0.0, 0.0],  # MPX items face the camera, so left/right is X
+    'max_axis_angle': 30.0      # Principal axes within this angle of X are also tried
+}
+
+_NEIGHBOR_CELLS = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij'), axis=-1).reshape(-1, 3)
+
+def _cell_keys(cells):
+    """Pack integer grid cells into sortable scalar keys."""
+    cells = cells + (1 << 20)
+    return (cells[:, 0] << 42) | (cells[:, 1] << 21) | cells[:, 2]
+
+def match_ratio(positions, queries, tolerance):
+    """
+    Fraction of query points lying within tolerance of some position.
+
+    Positions are hashed into a grid of tolerance-sized cells; each query
+    only compares against the 27 cells around it, all as sorted-key lookups.
+    """
+    cells = np.floor(positions / tolerance).astype(np.int64)
+    keys = _cell_keys(cells)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    query_cells = np.floor(queries / tolerance).astype(np.int64)
+    matched = np.zeros(len(queries), dtype=bool)
+    for offset in _NEIGHBOR_CELLS:
+        neighbor_keys = _cell_keys(query_cells + offset)
+        lo = np.searchsorted(sorted_keys, neighbor_keys, side='left')
+        hi = np.searchsorted(sorted_keys, neighbor_keys, side='right')
+        # Cells hold few points at this scale; walk them in lockstep
+        for step in range(int((hi - lo).max(initial=0))):
+            active = (lo + step < hi) & ~matched
+            if not active.any():
+                break
+            candidates = positions[order[lo[active] + step]]
+            close = np.linalg.norm(candidates - queries[active], axis=1) <= tolerance
+            matched[np.flatnonzero(active)[close]] = True
+    return float(matched.mean()) if len(queries) else 0.0
+
+def reflect(points, normal, origin):
+    """Mirror points across the plane through origin with the given unit normal."""
+    distance = (points - origin) @ normal
+    return points - 2.0 * distance[:, None] * normal[None, :]
+
+def candidate_planes(positions):
+    """
+    Left/right mirror planes through the centroid: the lateral axis itself
+    and any principal axis close to it, which absorbs a slightly rotated item.
+
+    Other axes are never tried. A thin shell also matches itself across its
+    thickness, and mirroring that would copy the front onto the back.
+    """
+    centroid = positions.mean(axis=0)
+    _, _, principal = np.linalg.svd(positions - centroid, full_matrices=False)
+    lateral = np.asarray(SYMMETRY_CONFIG['lateral_axis'], dtype=np.float64)
+    normals = [lateral / np.linalg.norm(lateral)]
+    min_cos = np.cos(np.radians(SYMMETRY_CONFIG['max_axis_angle']))
+    for normal in principal:
+        normal = normal * np.sign(normal @ normals[0] or 1.0)
+        if min_cos <= normal @ normals[0] < 0.999:
+            normals.append(normal)
+    return centroid, normals
+
+def detect_mirror_plane(positions):
+    """
+    Find the best mirror plane of a vertex set.
+
+    Returns {'normal', 'origin', 'match_ratio'} for the best scoring plane, or
+    None when no plane reaches the configured match ratio.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if len(positions) < 4:
+        return None
+    diagonal = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)))
+    tolerance = max(SYMMETRY_CONFIG['tolerance'] * diagonal, 1e-9)
+
+    sample = positions
+    if len(positions) > SYMMETRY_CONFIG['sample_size']:
+        rng = np.random.default_rng(0)
+        sample = positions[rng.choice(len(positions), SYMMETRY_CONFIG['sample_size'], replace=False)]
+
+    centroid, normals = candidate_planes(positions)
+    best = None
+    for normal in normals:
+        ratio = match_ratio(positions, reflect(sample, normal, centroid), tolerance)
+        if best is None or ratio > best['match_ratio']:
+            best = {'normal': normal.tolist(), 'origin': centroid.tolist(), 'match_ratio': round(ratio, 4)}
+
+    if best['match_ratio'] < SYMMETRY_CONFIG['min_match_ratio']:
+        return None
+    best['tolerance'] = tolerance
+    return best
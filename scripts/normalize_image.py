@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from PIL import Image, ImageOps
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Masterpiece X accepts 512-4096px JPEG/PNG up to 10MB; inputs are brought into range instead of rejected
+NORMALIZE_CONFIG = {
+    'min_size': 512,
+    'max_size': int(os.getenv('NORMALIZE_MAX_SIZE', '2048')),  # MPX textures are 1024px, 2x headroom
+    'small_mode': os.getenv('NORMALIZE_SMALL_MODE', 'upscale'),  # 'upscale' or 'pad'
+    'reducing_gap': 3.0,     # Integer box reduce first, LANCZOS for the last 3x
+    'jpeg_quality': 90,
+    'png_compress_level': 9,
+    'suffix': '_normalized'
+}
+
+def _has_transparency(img):
+    if img.mode in ('RGBA', 'LA'):
+        return img.getchannel('A').getextrema()[0] < 255
+    return img.mode == 'P' and 'transparency' in img.info
+
+def _pad_color(img):
+    """Mean border color, so padding blends with a plain studio background."""
+    pixels = np.asarray(img)
+    border = np.concatenate([pixels[0], pixels[-1], pixels[:, 0], pixels[:, -1]])
+    return tuple(int(v) for v in border.mean(axis=0))
+
+def normalized_path(image_path, image_format):
+    base = os.path.splitext(image_path)[0]
+    return f"{base}{NORMALIZE_CONFIG['suffix']}.{'png' if image_format == 'PNG' else 'jpg'}"
+
+def normalize_image(image_path, output_path=None):
+    """
+    Bring an image within the Masterpiece X input limits.
+
+    Oversized images are scaled down using JPEG DCT draft decoding and
+    integer reduce before the final LANCZOS pass. Images under the minimum
+    are upscaled, or padded when upscaling would overshoot the maximum or
+    padding is configured, and so are elongated images whose short side
+    falls under the minimum after the downscale. EXIF orientation is applied and all metadata is
+    dropped; images with real transparency stay PNG, everything else is
+    written as JPEG. Returns the path to submit and a report; the original
+    is returned untouched when it is already compliant and re-encoding
+    would not make it smaller.
+    """
+    start_time = time.time()
+    min_size, max_size = NORMALIZE_CONFIG['min_size'], NORMALIZE_CONFIG['max_size']
+    bytes_before = os.path.getsize(image_path)
+
+    with Image.open(image_path) as img:
+        source_format = img.format
+        original_size = img.size
+        has_metadata = bool(img.info.get('exif') or img.info.get('icc_profile') or
+                            set(img.info) - {'dpi', 'jfif', 'jfif_version', 'jfif_unit', 'jfif_density',
+                                             'gamma', 'transparency', 'progressive', 'progression'})
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers the target
+        scale = min(max_size / max(original_size), 1.0)
+        img.draft('RGB', (int(original_size[0] * scale) + 1, int(original_size[1] * scale) + 1))
+        img = ImageOps.exif_transpose(img)
+        transparent = _has_transparency(img)
+        img = img.convert('RGBA' if transparent else 'RGB')
+
+        operations = []
+        width, height = img.size
+        if max(width, height) > max_size:
+            scale = max_size / max(width, height)
+            img = img.resize((max(round(width * scale), 1), max(round(height * scale), 1)), Image.LANCZOS,
+                             reducing_gap=NORMALIZE_CONFIG['reducing_gap'])
+            operations.append('downscale')
+            width, height = img.size
+        # Very elongated images can still be short after the downscale; those get padded
+        if min(width, height) < min_size:
+            scale = min_size / min(width, height)
+            if NORMALIZE_CONFIG['small_mode'] == 'upscale' and max(width, height) * scale <= max_size:
+                img = img.resize((max(round(width * scale), min_size), max(round(height * scale), min_size)),
+                                 Image.LANCZOS)
+                operations.append('upscale')
+            else:
+                canvas_size = (max(width, min_size), max(height, min_size))
+                color = (0, 0, 0, 0) if transparent else _pad_color(img)
+                canvas = Image.new(img.mode, canvas_size, color)
+                canvas.paste(img, ((canvas_size[0] - width) // 2, (canvas_size[1] - height) // 2))
+                img = canvas
+                operations.append('pad')
+
+        image_format = 'PNG' if transparent else 'JPEG'
+        output_path = output_path or normalized_path(image_path, image_format)
+        if image_format == 'PNG':
+            img.save(output_path, format='PNG', optimize=True, compress_level=NORMALIZE_CONFIG['png_compress_level'])
+        else:
+            img.save(output_path, format='JPEG', quality=NORMALIZE_CONFIG['jpeg_quality'],
+                     optimize=True, progressive=True)
+        final_size = img.size
+
+    bytes_after = os.path.getsize(output_path)
+    compliant = source_format in ('JPEG', 'PNG') and not operations and not has_metadata
+    if compliant and bytes_after >= bytes_before:
+        os.remove(output_path)
+        output_path, bytes_after = image_path, bytes_before
+    elif has_metadata:
+        operations.append('strip_metadata')
+    if output_path != image_path:
+        # Written anew even when nothing else changed, e.g. a PNG without real transparency saved as JPEG
+        operations.append('reencode')
+
+    report = {
+        'file': os.path.basename(output_path),
+        'format_before': source_format,
+        'format_after': image_format if output_path != image_path else source_format,
+        'size_before': list(original_size),
+        'size_after': list(final_size),
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'operations': operations,
+        'normalize_time_s': round(time.time() - start_time, 4)
+    }
+    logger.info(f"Normalized {os.path.basename(image_path)}: {original_size} -> {final_size}, "
+                f"{bytes_before} -> {bytes_after} bytes ({', '.join(operations) or 'unchanged'})")
+    return output_path, report
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize images to the Masterpiece X input limits')
+    parser.add_argument('inputs', nargs='+', help='Image files')
+    args = parser.parse_args()
+
+    failed = False
+    for image_path in args.inputs:
+        try:
+            _, report = normalize_image(image_path)
+            print(json.dumps(report))
+        except Exception as e:
+            print(f"{image_path}: failed - {str(e)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
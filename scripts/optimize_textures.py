@@ -0,0 +1,166 @@
+import os
+import io
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+from glb_io import read_glb, write_glb
+from fbx_io import read_fbx, write_fbx, find_node, find_child, find_children, string_value
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEXTURE_CONFIG = {
+    'default_size': 512,     # Matches ROBLOX_STYLE_CONFIG['texture_size']
+    'source_size': 1024,     # Resolution requested from MPX, 2x headroom for a clean downscale
+    'reducing_gap': 3.0,     # Integer box reduce first, LANCZOS for the last 3x
+    'jpeg_quality': 85,
+    'png_compress_level': 9,
+    'max_workers': int(os.getenv('TEXTURE_MAX_WORKERS', '2'))
+}
+
+def recompress_image(data, max_size):
+    """
+    Downscale encoded image bytes so the longest side is at most max_size and
+    re-encode them in the same format with optimized settings.
+
+    Returns the new bytes and a per-texture report. The original bytes are
+    kept when re-encoding an already small image would make it larger.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        image_format = img.format
+        original_size = img.size
+        img.thumbnail((max_size, max_size), Image.LANCZOS, reducing_gap=TEXTURE_CONFIG['reducing_gap'])
+        if img.mode == 'RGBA' and img.getchannel('A').getextrema() == (255, 255):
+            img = img.convert('RGB')
+
+        buffer = io.BytesIO()
+        if image_format == 'JPEG':
+            img.convert('RGB').save(buffer, format='JPEG', quality=TEXTURE_CONFIG['jpeg_quality'],
+                                    optimize=True, progressive=True)
+        else:
+            image_format = 'PNG'
+            img.save(buffer, format='PNG', optimize=True,
+                     compress_level=TEXTURE_CONFIG['png_compress_level'])
+        resized_size = img.size
+
+    encoded = buffer.getvalue()
+    if resized_size == original_size and len(encoded) >= len(data):
+        encoded = data
+
+    return encoded, {
+        'format': image_format,
+        'size_before': list(original_size),
+        'size_after': list(resized_size),
+        'bytes_before': len(data),
+        'bytes_after': len(encoded)
+    }
+
+def optimize_glb_textures(glb_path, max_size, output_path=None):
+    """Recompress every image stored in the GLB binary chunk and repack the buffer."""
+    gltf, bin_data = read_glb(glb_path)
+    views = gltf.get('bufferViews', [])
+    replacements = {}
+    textures = []
+
+    for index, image in enumerate(gltf.get('images', [])):
+        if 'bufferView' not in image:
+            continue
+        view = views[image['bufferView']]
+        start = view.get('byteOffset', 0)
+        encoded, report = recompress_image(bin_data[start:start + view['byteLength']], max_size)
+        replacements[image['bufferView']] = encoded
+        textures.append({'name': image.get('name', f"image_{index}"), **report})
+
+    if replacements:
+        # Repack buffer 0 in original order so the views stay 4-byte aligned
+        packed = bytearray()
+        in_bin = [i for i, view in enumerate(views) if view.get('buffer', 0) == 0]
+        for i in sorted(in_bin, key=lambda i: views[i].get('byteOffset', 0)):
+            view = views[i]
+            start = view.get('byteOffset', 0)
+            chunk = replacements.get(i, bin_data[start:start + view['byteLength']])
+            packed += bytes(-len(packed) % 4)
+            view['byteOffset'] = len(packed)
+            view['byteLength'] = len(chunk)
+            packed += chunk
+        bin_data = bytes(packed)
+        gltf['buffers'][0]['byteLength'] = len(bin_data)
+
+    write_glb(output_path or glb_path, gltf, bin_data)
+    return textures
+
+def optimize_fbx_textures(fbx_path, max_size, output_path=None):
+    """Recompress the embedded Video content of a binary FBX."""
+    version, nodes = read_fbx(fbx_path)
+    objects = find_node(nodes, 'Objects')
+    textures = []
+
+    for video in find_children(objects, 'Video') if objects else []:
+        content = find_child(video, 'Content')
+        if content is None or not content['props'] or not content['props'][0][1]:
+            continue
+        encoded, report = recompress_image(content['props'][0][1], max_size)
+        content['props'][0] = ('R', encoded)
+        textures.append({'name': string_value(video['props'][1]), **report})
+
+    write_fbx(output_path or fbx_path, version, nodes)
+    return textures
+
+def optimize_artifact(path, max_size=None):
+    """Enforce the texture size on one GLB or FBX in place and report bytes saved."""
+    max_size = max_size or TEXTURE_CONFIG['default_size']
+    start_time = time.time()
+    bytes_before = os.path.getsize(path)
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.glb':
+        textures = optimize_glb_textures(path, max_size)
+    elif extension == '.fbx':
+        textures = optimize_fbx_textures(path, max_size)
+    else:
+        raise ValueError(f"Unsupported artifact type: {extension}")
+
+    bytes_after = os.path.getsize(path)
+    return {
+        'file': os.path.basename(path),
+        'max_size': max_size,
+        'textures': textures,
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'bytes_saved': bytes_before - bytes_after,
+        'time_s': round(time.time() - start_time, 3)
+    }
+
+def optimize_artifacts(paths, max_size=None):
+    """Run the texture stage over several artifacts in a process pool."""
+    reports = {}
+    with ProcessPoolExecutor(max_workers=TEXTURE_CONFIG['max_workers']) as executor:
+        futures = {path: executor.submit(optimize_artifact, path, max_size) for path in paths}
+        for path, future in futures.items():
+            try:
+                reports[path] = future.result()
+                logger.info(f"Textures in {os.path.basename(path)}: "
+                            f"saved {reports[path]['bytes_saved']} bytes")
+            except Exception as e:
+                logger.error(f"Texture optimization failed for {path}: {str(e)}")
+                reports[path] = {'file': os.path.basename(path), 'error': str(e)}
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description='Downscale and recompress textures embedded in GLB/FBX files')
+    parser.add_argument('inputs', nargs='+', help='GLB or FBX files to optimize in place')
+    parser.add_argument('--size', type=int, default=TEXTURE_CONFIG['default_size'],
+                        help='Maximum texture side length in pixels')
+    args = parser.parse_args()
+
+    reports = optimize_artifacts(args.inputs, args.size)
+    print(json.dumps(list(reports.values()), indent=2))
+    sys.exit(1 if any('error' in report for report in reports.values()) else 0)
+
+if __name__ == "__main__":
+    main()
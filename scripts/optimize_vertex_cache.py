@@ -0,0 +1,291 @@
+import os
+import json
+import logging
+import argparse
+import numpy as np
+
+from glb_io import read_glb, write_glb, read_accessor, COMPONENT_DTYPES, TYPE_SIZES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VERTEX_CACHE_CONFIG = {
+    'cache_size': 16,        # Tipsify target cache size
+    'acmr_cache_size': 32    # FIFO size used when reporting ACMR
+}
+
+def compute_acmr(faces, cache_size=None):
+    """Average cache miss ratio (misses per triangle) for a FIFO post-transform cache."""
+    cache_size = cache_size or VERTEX_CACHE_CONFIG['acmr_cache_size']
+    if len(faces) == 0:
+        return 0.0
+    indices = np.asarray(faces).reshape(-1).tolist()
+    timestamps = {}
+    clock = 0
+    misses = 0
+    for index in indices:
+        # A FIFO entry is still resident while fewer than cache_size misses happened since
+        stamp = timestamps.get(index)
+        if stamp is None or clock - stamp >= cache_size:
+            timestamps[index] = clock
+            clock += 1
+            misses += 1
+    return misses / len(faces)
+
+def _vertex_adjacency(faces, vertex_count):
+    """CSR vertex -> triangle adjacency."""
+    flat = faces.reshape(-1)
+    counts = np.bincount(flat, minlength=vertex_count)
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    triangles = np.argsort(flat, kind='stable') // 3
+    return offsets, triangles, counts
+
+def tipsify(faces, vertex_count, cache_size=None):
+    """
+    Reorder triangles for post-transform cache locality (Sander et al., Tipsify).
+
+    Returns the new triangle order and the start offsets of the clusters that
+    begin after a dead end, which are the hard cache boundaries used for the
+    overdraw sort.
+    """
+    cache_size = cache_size or VERTEX_CACHE_CONFIG['cache_size']
+    faces = np.asarray(faces, dtype=np.int64)
+    offsets, adjacency, live = _vertex_adjacency(faces, vertex_count)
+    offsets = offsets.tolist()
+    adjacency = adjacency.tolist()
+    live = live.tolist()
+    face_list = faces.tolist()
+
+    cache_time = [0] * vertex_count
+    emitted = [False] * len(face_list)
+    dead_end = []
+    order = []
+    clusters = [0]
+    clock = cache_size + 1
+    cursor = 0
+    fan = 0 if vertex_count else -1
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            order.append(t)
+            emitted[t] = True
+            for v in face_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if clock - cache_time[v] > cache_size:
+                    cache_time[v] = clock
+                    clock += 1
+
+        # Prefer a candidate that stays in cache while its remaining fan is emitted
+        best = -1
+        best_priority = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if clock - cache_time[v] + 2 * live[v] <= cache_size:
+                    priority = clock - cache_time[v]
+                if priority > best_priority:
+                    best_priority = priority
+                    best = v
+
+        if best == -1:
+            # Dead end: fall back to recently used vertices, then scan forward
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    best = v
+                    break
+            while best == -1 and cursor < vertex_count:
+                if live[cursor] > 0:
+                    best = cursor
+                cursor += 1
+            if best != -1 and len(order) < len(face_list):
+                clusters.append(len(order))
+
+        fan = best
+
+    return np.asarray(order, dtype=np.int64), clusters
+
+def sort_clusters_for_overdraw(positions, faces, order, clusters):
+    """
+    Sort Tipsify clusters so outward-facing clusters are drawn first.
+
+    Clusters are ranked by how far their centroid lies along their average
+    normal relative to the mesh centroid, a view-independent overdraw heuristic.
+    """
+    if len(clusters) < 2:
+        return order
+    ordered_faces = faces[order]
+    triangles = positions[ordered_faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    centers = triangles.mean(axis=1)
+    areas = np.linalg.norm(normals, axis=1)
+    mesh_center = np.average(centers, axis=0, weights=areas) if areas.sum() > 0 else centers.mean(axis=0)
+
+    bounds = list(clusters) + [len(order)]
+    scores = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        weight = areas[start:end].sum()
+        if weight > 0:
+            center = np.average(centers[start:end], axis=0, weights=areas[start:end])
+        else:
+            center = centers[start:end].mean(axis=0)
+        normal = normals[start:end].sum(axis=0)
+        length = np.linalg.norm(normal)
+        scores.append(float(np.dot(center - mesh_center, normal / length)) if length > 0 else 0.0)
+
+    ranked = np.argsort(scores)[::-1]
+    return np.concatenate([order[bounds[c]:bounds[c + 1]] for c in ranked])
+
+def optimize_vertex_fetch(faces, vertex_count):
+    """Renumber vertices in order of first use; unused vertices move to the end."""
+    flat = faces.reshape(-1)
+    _, first_use = np.unique(flat, return_index=True)
+    used = flat[np.sort(first_use)]
+    unused = np.setdiff1d(np.arange(vertex_count), used, assume_unique=True)
+    remap_order = np.concatenate([used, unused])
+    remap = np.empty(vertex_count, dtype=np.int64)
+    remap[remap_order] = np.arange(vertex_count)
+    return remap[faces], remap_order
+
+def optimize_index_order(positions, faces):
+    """
+    Reorder triangles for vertex cache and overdraw, then vertices for fetch.
+
+    Returns the new faces, the triangle order and vertex permutation
+    (both new -> old) and ACMR stats.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    vertex_count = len(positions)
+    acmr_before = compute_acmr(faces)
+
+    order, clusters = tipsify(faces, vertex_count)
+    order = sort_clusters_for_overdraw(np.asarray(positions, dtype=np.float64), faces, order, clusters)
+    new_faces, vertex_order = optimize_vertex_fetch(faces[order], vertex_count)
+
+    stats = {
+        'triangles': int(len(faces)),
+        'acmr_before': round(acmr_before, 4),
+        'acmr_after': round(compute_acmr(new_faces), 4),
+        'clusters': len(clusters),
+        'cache_size': VERTEX_CACHE_CONFIG['acmr_cache_size']
+    }
+    return new_faces, order, vertex_order, stats
+
+def optimize_mesh_order(mesh):
+    """Apply the index and vertex reordering to a glb_io mesh dictionary."""
+    faces, _, vertex_order, stats = optimize_index_order(mesh['positions'], mesh['faces'])
+    optimized = dict(mesh)
+    for key in ('positions', 'normals', 'uvs'):
+        if mesh.get(key) is not None:
+            optimized[key] = mesh[key][vertex_order]
+    optimized['faces'] = faces.astype(np.uint32)
+    return optimized, stats
+
+def _accessor_rows(gltf, bin_array, index):
+    """Byte positions of every element of an accessor in the GLB binary chunk, shape (count, element_size)."""
+    accessor = gltf['accessors'][index]
+    view = gltf['bufferViews'][accessor['bufferView']]
+    element_size = np.dtype(COMPONENT_DTYPES[accessor['componentType']]).itemsize * TYPE_SIZES[accessor['type']]
+    stride = view.get('byteStride', element_size)
+    start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+    return start + np.arange(accessor['count'])[:, None] * stride + np.arange(element_size)
+
+def _reorderable(gltf, primitive, uses):
+    """
+    Whether a primitive's buffers can be permuted in place: indexed triangles
+    whose accessors are plain, in the binary chunk, and not shared with
+    another primitive (which would see its vertices move).
+    """
+    if primitive.get('mode', 4) != 4 or 'indices' not in primitive or 'POSITION' not in primitive['attributes']:
+        return False
+    accessors = [primitive['indices'], *primitive['attributes'].values(),
+                 *(index for target in primitive.get('targets', []) for index in target.values())]
+    count = gltf['accessors'][primitive['attributes']['POSITION']]['count']
+    for index in accessors:
+        accessor = gltf['accessors'][index]
+        if uses[index] > 1 or 'sparse' in accessor or 'bufferView' not in accessor:
+            return False
+        view = gltf['bufferViews'][accessor['bufferView']]
+        if view.get('buffer', 0) != 0 or 'extensions' in view:
+            return False
+        if index != primitive['indices'] and accessor['count'] != count:
+            return False
+    return True
+
+def optimize_glb(glb_path, output_path=None):
+    """
+    Reorder the index and vertex buffers of every GLB triangle primitive
+    for the vertex cache and vertex fetch.
+
+    Only buffer contents are permuted inside the original glTF JSON, so
+    nodes, materials, extras and every texture stay as they were.
+    Primitives whose accessors cannot be permuted safely are left alone.
+    The result is written to a sibling file and swapped in.
+    """
+    gltf, bin_data = read_glb(glb_path)
+    bin_array = np.frombuffer(bytearray(bin_data), dtype=np.uint8)
+    uses = {}
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh['primitives']:
+            for index in [primitive.get('indices'), *primitive.get('attributes', {}).values(),
+                          *(i for target in primitive.get('targets', []) for i in target.values())]:
+                if index is not None:
+                    uses[index] = uses.get(index, 0) + 1
+
+    stats = {'triangles': 0, 'acmr_before': 0.0, 'acmr_after': 0.0, 'clusters': 0,
+             'cache_size': VERTEX_CACHE_CONFIG['acmr_cache_size'], 'primitives': 0, 'skipped_primitives': 0}
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh['primitives']:
+            if not _reorderable(gltf, primitive, uses):
+                stats['skipped_primitives'] += 1
+                continue
+            positions = read_accessor(gltf, bin_data, primitive['attributes']['POSITION'])
+            faces = read_accessor(gltf, bin_data, primitive['indices']).reshape(-1, 3)
+            new_faces, _, vertex_order, primitive_stats = optimize_index_order(positions, faces)
+
+            for index in [*primitive['attributes'].values(),
+                          *(i for target in primitive.get('targets', []) for i in target.values())]:
+                rows = _accessor_rows(gltf, bin_array, index)
+                bin_array[rows] = bin_array[rows[vertex_order]]
+            index_accessor = gltf['accessors'][primitive['indices']]
+            dtype = np.dtype(COMPONENT_DTYPES[index_accessor['componentType']])
+            rows = _accessor_rows(gltf, bin_array, primitive['indices'])
+            bin_array[rows] = new_faces.reshape(-1, 1).astype(dtype).view(np.uint8)
+            if 'min' in index_accessor:
+                index_accessor['min'], index_accessor['max'] = [int(new_faces.min())], [int(new_faces.max())]
+
+            # Triangle-weighted ACMR over the primitives that were reordered
+            weight = primitive_stats['triangles']
+            for key in ('acmr_before', 'acmr_after'):
+                stats[key] += primitive_stats[key] * weight
+            stats['triangles'] += weight
+            stats['clusters'] += primitive_stats['clusters']
+            stats['primitives'] += 1
+
+    for key in ('acmr_before', 'acmr_after'):
+        stats[key] = round(stats[key] / stats['triangles'], 4) if stats['triangles'] else 0.0
+    output_path = output_path or glb_path
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    write_glb(temp_path, gltf, bin_array.tobytes())
+    os.replace(temp_path, output_path)
+    logger.info(f"Vertex cache ACMR for {os.path.basename(glb_path)}: "
+                f"{stats['acmr_before']} -> {stats['acmr_after']} "
+                f"({stats['primitives']} primitives, {stats['skipped_primitives']} skipped)")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Optimize GLB index buffers for vertex cache locality')
+    parser.add_argument('inputs', nargs='+', help='GLB files to optimize in place')
+    args = parser.parse_args()
+
+    for glb_path in args.inputs:
+        print(json.dumps({'file': glb_path, **optimize_glb(glb_path)}))
+
+if __name__ == "__main__":
+    main()
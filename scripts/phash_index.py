@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import argparse
+import itertools
+import threading
+import numpy as np
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PHASH_CONFIG = {
+    'check_uploads': os.getenv('DUPLICATE_CHECK', '1') == '1',  # Offer prior results before converting near-duplicates
+    'index_file': '.phash_index.jsonl',
+    'radius': int(os.getenv('PHASH_RADIUS', '6')),   # Max dHash Hamming distance for a near-duplicate
+    'phash_radius': 16,     # pHash must agree too; looser, as it flips near-zero terms on symmetric images
+    'color_grid': 4,        # Color signature cells per side; both hashes are grayscale and blind to colorways
+    'color_radius': 12.0,   # Max Lab chroma distance (a*, b*) of any cell for a near-duplicate
+    'chunks': 4,            # Multi-index tables of 16 bits each
+    'max_radius': 7         # Each table is probed within radius // chunks, kept at one bit flip per table
+}
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+_DCT = np.cos(np.pi * (2 * np.arange(32)[None, :] + 1) * np.arange(32)[:, None] / 64)
+_RGB_TO_XYZ = np.array([[0.4124, 0.3576, 0.1805], [0.2126, 0.7152, 0.0722], [0.0193, 0.1192, 0.9505]]) / \
+    np.array([[0.9505], [1.0], [1.089]])  # Rows scaled by the D65 white point
+
+def _bits_to_int(bits):
+    return int(np.packbits(bits.ravel()).view('>u8')[0])
+
+def _color_signature(img):
+    """Mean Lab chroma (a*, b*) per grid cell, transparency composited on white."""
+    grid = PHASH_CONFIG['color_grid']
+    rgba = np.asarray(img.convert('RGBA').resize((grid * 4, grid * 4), Image.BILINEAR, reducing_gap=2.0),
+                      dtype=np.float64) / 255.0
+    rgb = rgba[..., :3] * rgba[..., 3:] + (1.0 - rgba[..., 3:])
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ _RGB_TO_XYZ.T
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    chroma = np.stack([500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+    cells = chroma.reshape(grid, 4, grid, 4, 2).mean(axis=(1, 3))
+    return [int(round(value)) for value in cells.ravel()]
+
+def image_hashes(image_path):
+    """
+    64-bit perceptual hashes of an image: pHash (signs of the low DCT
+    frequencies against their median) and dHash (horizontal gradient
+    signs). Both survive re-compression, resizing and renaming, but are
+    computed on grayscale, so a coarse color signature is kept alongside
+    to tell colorways of one product apart.
+    """
+    with Image.open(image_path) as img:
+        img.draft('RGB', (64, 64))
+        gray = img.convert('L')
+        phash_pixels = np.asarray(gray.resize((32, 32), Image.BILINEAR, reducing_gap=2.0), dtype=np.float64)
+        dhash_pixels = np.asarray(gray.resize((9, 8), Image.BILINEAR, reducing_gap=2.0), dtype=np.int16)
+        color = _color_signature(img)
+
+    low = (_DCT @ phash_pixels @ _DCT.T)[:8, :8]
+    # The DC term is the mean brightness, not structure; keep it out of the median
+    phash = low > np.median(low.ravel()[1:])
+    dhash = dhash_pixels[:, 1:] > dhash_pixels[:, :-1]
+    return {'phash': f"{_bits_to_int(phash):016x}", 'dhash': f"{_bits_to_int(dhash):016x}", 'color': color}
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+def color_distance(a, b):
+    """Largest per-cell chroma distance between two color signatures; infinite when one is missing."""
+    if not a or not b or len(a) != len(b):
+        return float('inf')
+    return float(np.sqrt((np.subtract(a, b, dtype=np.float64).reshape(-1, 2) ** 2).sum(axis=1)).max())
+
+def _distances(values, query):
+    """Hamming distances from query to an array of uint64 hashes."""
+    return _POPCOUNT[(values ^ np.uint64(query)).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+class PerceptualIndex:
+    """
+    Near-duplicate index over the perceptual hashes of converted uploads.
+
+    Entries live in an append-only JSON lines file shared by all worker
+    processes; each process keeps them in memory and reads only the lines
+    appended since its last lookup. dHashes are split into four 16-bit
+    chunks with one hash table per chunk. Two hashes within radius r have
+    at least one chunk within r // 4 of each other, so a lookup probes each
+    table with the query chunk and its one-bit flips and only verifies
+    those few candidates instead of scanning the whole index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self._phashes = np.zeros(1024, dtype=np.uint64)
+        self._dhashes = np.zeros(1024, dtype=np.uint64)
+        self._tables = [{} for _ in range(PHASH_CONFIG['chunks'])]
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _insert(self, entry):
+        index = len(self.entries)
+        if index == len(self._phashes):
+            self._phashes = np.concatenate([self._phashes, np.zeros_like(self._phashes)])
+            self._dhashes = np.concatenate([self._dhashes, np.zeros_like(self._dhashes)])
+        dhash = int(entry['dhash'], 16)
+        self._phashes[index] = int(entry['phash'], 16)
+        self._dhashes[index] = dhash
+        for chunk, table in enumerate(self._tables):
+            table.setdefault((dhash >> (16 * chunk)) & 0xFFFF, []).append(index)
+        self.entries.append(entry)
+
+    def _refresh(self):
+        """Load the lines other processes appended since the last call."""
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+        except OSError:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written line; picked up next time
+                self._offset += len(line)
+                try:
+                    self._insert(json.loads(line))
+                except (ValueError, KeyError):
+                    logger.warning(f"Skipping malformed index line in {self.path}")
+
+    def add(self, entry):
+        """Append an entry with 'phash' and 'dhash' plus any reference fields (job id, file, sha256)."""
+        entry = dict(entry, added=time.time())
+        line = (json.dumps(entry) + '\n').encode()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.write(line)
+            self._refresh()
+
+    def search(self, hashes, radius=None):
+        """
+        Entries within the Hamming radius of an image's hashes and within the
+        color radius of its color signature, closest first, with their
+        distances. Entries indexed without a color signature never match.
+        """
+        radius = PHASH_CONFIG['radius'] if radius is None else radius
+        if radius > PHASH_CONFIG['max_radius']:
+            raise ValueError(f"Radius {radius} is above the supported {PHASH_CONFIG['max_radius']}")
+        phash, dhash = int(hashes['phash'], 16), int(hashes['dhash'], 16)
+        flips = [sum(1 << bit for bit in bits)
+                 for count in range(radius // PHASH_CONFIG['chunks'] + 1)
+                 for bits in itertools.combinations(range(16), count)]
+        with self._lock:
+            self._refresh()
+            candidates = []
+            for chunk, table in enumerate(self._tables):
+                value = (dhash >> (16 * chunk)) & 0xFFFF
+                for flip in flips:
+                    candidates.extend(table.get(value ^ flip, ()))
+            if not candidates:
+                return []
+            ids = np.unique(np.array(candidates, dtype=np.int64))
+            dhash_distances = _distances(self._dhashes[ids], dhash)
+            phash_distances = _distances(self._phashes[ids], phash)
+            found = np.flatnonzero((dhash_distances <= radius) & (phash_distances <= PHASH_CONFIG['phash_radius']))
+            found = found[np.argsort(dhash_distances[found], kind='stable')]
+            matches = []
+            for i in found:
+                entry = self.entries[ids[i]]
+                distance = color_distance(hashes.get('color'), entry.get('color'))
+                if distance <= PHASH_CONFIG['color_radius']:
+                    matches.append(dict(entry, distance=int(dhash_distances[i]), phash_distance=int(phash_distances[i]),
+                                        color_distance=round(distance, 2)))
+            return matches
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self.entries)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(directory):
+    """The process-wide index stored in a directory."""
+    path = os.path.join(directory, PHASH_CONFIG['index_file'])
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = PerceptualIndex(path)
+        return _indexes[path]
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate images in a perceptual hash index')
+    parser.add_argument('index_dir', help='Directory holding the index')
+    parser.add_argument('inputs', nargs='+', help='Image files to look up')
+    parser.add_argument('--radius', type=int, default=PHASH_CONFIG['radius'], help='Max dHash Hamming distance')
+    args = parser.parse_args()
+
+    index = get_index(args.index_dir)
+    for image_path in args.inputs:
+        hashes = image_hashes(image_path)
+        start_time = time.time()
+        matches = index.search(hashes, args.radius)
+        print(json.dumps({'file': image_path, **hashes, 'entries': len(index),
+                          'lookup_ms': round((time.time() - start_time) * 1000, 3), 'matches': matches}))
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,22 @@ import sys
 import os
 import math
 import bmesh
-from mathutils import Vector
+import subprocess
+import tempfile
+import time
+import numpy as np
+from mathutils import Vector, Matrix
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from optimize_vertex_cache import optimize_index_order
+from collision_hull import collision_point_sets, COLLISION_SUFFIX
+from texture_atlas import build_atlas, remap_uvs, texture_memory
+from mirror_symmetry import detect_mirror_plane, SYMMETRY_CONFIG
+from roblox_rules import ROBLOX_CONFIG
+
+# Interpreter used for the normal bake worker pool (Blender's Python has no Pillow)
+BAKE_PYTHON = os.getenv('BAKE_PYTHON', 'python3')
+BAKE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bake_normals.py')
 
 def setup_scene():
     """Clear existing scene and set up for FBX processing."""
@@ -47,6 +62,307 @@ def optimize_mesh(obj, max_triangles):
     bpy.context.view_layer.objects.active = obj
     bpy.ops.object.modifier_apply(modifier=decimate.name)
 
+def capture_high_poly(obj):
+    """Snapshot the mesh before decimation as arrays for normal baking."""
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    faces = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int64)
+    mesh.loop_triangles.foreach_get('vertices', faces)
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', positions)
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('normal', normals)
+    return {
+        'positions': positions.reshape(-1, 3),
+        'faces': faces.reshape(-1, 3),
+        'normals': normals.reshape(-1, 3)
+    }
+
+def bake_detail_normals(obj, high_poly, output_path):
+    """Bake the pre-decimation detail into a tangent-space normal map and hook it into the materials."""
+    mesh = obj.data
+    if len(mesh.uv_layers) == 0:
+        print(f"Skipping normal bake for {obj.name}: no UV map")
+        return None
+
+    mesh.calc_loop_triangles()
+    mesh.calc_tangents()
+    loop_count = len(mesh.loops)
+    triangle_loops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int64)
+    mesh.loop_triangles.foreach_get('loops', triangle_loops)
+
+    loop_vertices = np.empty(loop_count, dtype=np.int64)
+    mesh.loops.foreach_get('vertex_index', loop_vertices)
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', positions)
+    loop_normals = np.empty(loop_count * 3, dtype=np.float64)
+    mesh.loops.foreach_get('normal', loop_normals)
+    loop_tangents = np.empty(loop_count * 3, dtype=np.float64)
+    mesh.loops.foreach_get('tangent', loop_tangents)
+    loop_signs = np.empty(loop_count, dtype=np.float64)
+    mesh.loops.foreach_get('bitangent_sign', loop_signs)
+    loop_uvs = np.empty(loop_count * 2, dtype=np.float64)
+    mesh.uv_layers.active.data.foreach_get('uv', loop_uvs)
+
+    corners = triangle_loops.reshape(-1, 3)
+    low_poly = {
+        'positions': positions.reshape(-1, 3)[loop_vertices][corners],
+        'normals': loop_normals.reshape(-1, 3)[corners],
+        'tangents': loop_tangents.reshape(-1, 3)[corners],
+        'bitangent_signs': loop_signs[corners],
+        'uvs': loop_uvs.reshape(-1, 2)[corners]
+    }
+
+    # Ray casting runs in a process pool outside Blender
+    map_path = f"{os.path.splitext(output_path)[0]}_{bpy.path.clean_name(obj.name)}_normal.png"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        arrays_path = os.path.join(temp_dir, 'bake_input.npz')
+        np.savez(arrays_path,
+                 **{f'high_{k}': v for k, v in high_poly.items()},
+                 **{f'low_{k}': v for k, v in low_poly.items()})
+        result = subprocess.run([BAKE_PYTHON, BAKE_SCRIPT, arrays_path, map_path],
+                                capture_output=True, text=True)
+
+    output_lines = [line for line in result.stdout.split('\n') if line.strip()]
+    bake = json.loads(output_lines[-1]) if output_lines else {'success': False, 'error': result.stderr}
+    if not bake['success']:
+        raise RuntimeError(f"Normal bake failed: {bake.get('error')}")
+
+    image = bpy.data.images.load(map_path)
+    image.colorspace_settings.name = 'Non-Color'
+    uv_name = mesh.uv_layers.active.name
+
+    for slot in obj.material_slots:
+        if not slot.material or not slot.material.use_nodes:
+            continue
+        nodes = slot.material.node_tree.nodes
+        links = slot.material.node_tree.links
+        principled = next((node for node in nodes if node.type == 'BSDF_PRINCIPLED'), None)
+        if principled is None:
+            continue
+        texture = nodes.new('ShaderNodeTexImage')
+        texture.image = image
+        normal_map = nodes.new('ShaderNodeNormalMap')
+        normal_map.uv_map = uv_name
+        links.new(texture.outputs['Color'], normal_map.inputs['Color'])
+        links.new(normal_map.outputs['Normal'], principled.inputs['Normal'])
+
+    return dict(bake['stats'], map_file=map_path)
+
+def create_collision_mesh(obj, outfit_type):
+    """Add a simplified convex collision object alongside the render mesh."""
+    mesh = obj.data
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', positions)
+    point_sets = collision_point_sets(positions.reshape(-1, 3), outfit_type)
+    if not point_sets:
+        return None
+
+    bm = bmesh.new()
+    for points in point_sets:
+        verts = [bm.verts.new(Vector(point)) for point in points]
+        hull = bmesh.ops.convex_hull(bm, input=verts)
+        leftovers = [elem for elem in hull['geom_interior'] + hull['geom_unused']
+                     if isinstance(elem, bmesh.types.BMVert)]
+        if leftovers:
+            bmesh.ops.delete(bm, geom=leftovers, context='VERTS')
+    bmesh.ops.triangulate(bm, faces=bm.faces[:])
+
+    collision_data = bpy.data.meshes.new(f"{obj.name}{COLLISION_SUFFIX}")
+    bm.to_mesh(collision_data)
+    bm.free()
+
+    collision = bpy.data.objects.new(f"{obj.name}{COLLISION_SUFFIX}", collision_data)
+    for collection in obj.users_collection:
+        collection.objects.link(collision)
+    collision.parent = obj.parent
+    collision.matrix_world = obj.matrix_world.copy()
+    collision.hide_render = True
+    collision['collision'] = True
+
+    return {
+        'object': collision.name,
+        'parts': len(point_sets),
+        'vertices': len(collision_data.vertices),
+        'triangles': len(collision_data.polygons)
+    }
+
+def keep_mirror_half(obj):
+    """Detect a mirror plane and cut the mesh down to the half on its positive side."""
+    start_time = time.time()
+    mesh = obj.data
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', positions)
+    plane = detect_mirror_plane(positions.reshape(-1, 3))
+    if plane is None:
+        return None
+
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bmesh.ops.bisect_plane(bm, geom=bm.verts[:] + bm.edges[:] + bm.faces[:], dist=1e-6,
+                           plane_co=plane['origin'], plane_no=plane['normal'], clear_inner=True)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+
+    plane['detect_time_s'] = round(time.time() - start_time, 4)
+    return plane
+
+def apply_mirror(obj, plane):
+    """Mirror the processed half back across its plane and weld the seam."""
+    # The Mirror modifier reflects across its mirror object's local YZ plane
+    rotation = Vector(plane['normal']).to_track_quat('X', 'Z').to_matrix().to_4x4()
+    pivot = bpy.data.objects.new(f"{obj.name}_mirror_plane", None)
+    bpy.context.scene.collection.objects.link(pivot)
+    pivot.matrix_world = obj.matrix_world @ Matrix.Translation(Vector(plane['origin'])) @ rotation
+
+    mirror = obj.modifiers.new(name="Mirror", type='MIRROR')
+    mirror.mirror_object = pivot
+    mirror.use_axis = (True, False, False)
+    mirror.use_clip = True
+    mirror.use_mirror_merge = True
+    mirror.merge_threshold = plane['tolerance'] * 0.1
+
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.modifier_apply(modifier=mirror.name)
+    bpy.data.objects.remove(pivot, do_unlink=True)
+
+def optimize_vertex_order(obj):
+    """Reorder faces for vertex cache locality and vertices for fetch locality."""
+    if obj.type != 'MESH':
+        return None
+
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    triangle_count = len(mesh.loop_triangles)
+    if triangle_count == 0:
+        return None
+
+    triangles = np.empty(triangle_count * 3, dtype=np.int64)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+    polygons = np.empty(triangle_count, dtype=np.int64)
+    mesh.loop_triangles.foreach_get('polygon_index', polygons)
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', positions)
+
+    _, triangle_order, vertex_order, stats = optimize_index_order(
+        positions.reshape(-1, 3), triangles.reshape(-1, 3)
+    )
+
+    # A polygon is placed where its first triangle lands in the optimized order
+    ordered_polygons = polygons[triangle_order]
+    _, first_use = np.unique(ordered_polygons, return_index=True)
+    face_rank = np.empty(len(mesh.polygons), dtype=np.int64)
+    face_rank[ordered_polygons[np.sort(first_use)]] = np.arange(len(first_use))
+    vertex_rank = np.empty(len(mesh.vertices), dtype=np.int64)
+    vertex_rank[vertex_order] = np.arange(len(vertex_order))
+
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bm.faces.index_update()
+    bm.verts.index_update()
+    bm.faces.sort(key=lambda face: face_rank[face.index])
+    bm.verts.sort(key=lambda vert: vertex_rank[vert.index])
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+
+    return stats
+
+def base_color_source(material):
+    """Return the image feeding a material's base color (or None) and its fallback color."""
+    if material is None:
+        return None, (1.0, 1.0, 1.0, 1.0)
+    if not material.use_nodes:
+        return None, tuple(material.diffuse_color)
+    principled = next((node for node in material.node_tree.nodes if node.type == 'BSDF_PRINCIPLED'), None)
+    if principled is None:
+        return None, tuple(material.diffuse_color)
+    socket = principled.inputs['Base Color']
+    for link in socket.links:
+        if link.from_node.type == 'TEX_IMAGE' and link.from_node.image:
+            return link.from_node.image, tuple(socket.default_value)
+    return None, tuple(socket.default_value)
+
+def merge_material_atlas(obj, output_path, max_size=None):
+    """
+    Pack the base color textures of all used materials into one atlas of at
+    most max_size pixels a side and collapse to a single material. Skipped
+    when the atlas would take more texture memory than the textures it replaces.
+    """
+    mesh = obj.data
+    if len(obj.material_slots) < 2 or len(mesh.uv_layers) == 0:
+        return None
+
+    polygon_count = len(mesh.polygons)
+    polygon_materials = np.empty(polygon_count, dtype=np.int64)
+    mesh.polygons.foreach_get('material_index', polygon_materials)
+    loop_starts = np.empty(polygon_count, dtype=np.int64)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    loop_totals = np.empty(polygon_count, dtype=np.int64)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    order = np.argsort(loop_starts)
+    loop_materials = np.repeat(polygon_materials[order], loop_totals[order])
+
+    uv_layer = mesh.uv_layers.active
+    uvs = np.empty(len(mesh.loops) * 2, dtype=np.float64)
+    uv_layer.data.foreach_get('uv', uvs)
+    uvs = uvs.reshape(-1, 2)
+
+    used = np.unique(loop_materials)
+    if len(used) < 2:
+        return None
+
+    entries = []
+    image_sizes = {}
+    for index in used:
+        image, color = base_color_source(obj.material_slots[int(index)].material)
+        entry = {'uvs': uvs[loop_materials == index], 'color': color}
+        if image is not None and image.size[0] > 0:
+            width, height = image.size
+            pixels = np.empty(width * height * 4, dtype=np.float32)
+            image.pixels.foreach_get(pixels)
+            entry['image'] = pixels.reshape(height, width, 4)
+            image_sizes[image.name] = (width, height)
+        entries.append(entry)
+
+    atlas, transforms, atlas_stats = build_atlas(entries, max_size)
+    atlas_height, atlas_width = atlas.shape[:2]
+    if image_sizes and texture_memory([(atlas_width, atlas_height)]) > texture_memory(image_sizes.values()):
+        print(f"Skipping material atlas for {obj.name}: {atlas_width}x{atlas_height} uses more memory than its inputs")
+        return None
+    entry_index = np.zeros(int(used.max()) + 1, dtype=np.int64)
+    entry_index[used] = np.arange(len(used))
+    uv_layer.data.foreach_set('uv', remap_uvs(uvs, entry_index[loop_materials], transforms).ravel())
+
+    atlas_image = bpy.data.images.new(f"{obj.name}_atlas", atlas_width, atlas_height, alpha=True)
+    atlas_image.pixels.foreach_set(atlas.ravel())
+    atlas_image.filepath_raw = f"{os.path.splitext(output_path)[0]}_{bpy.path.clean_name(obj.name)}_atlas.png"
+    atlas_image.file_format = 'PNG'
+    atlas_image.save()
+
+    material = bpy.data.materials.new(name=f"{obj.name}_atlas")
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    principled = next(node for node in nodes if node.type == 'BSDF_PRINCIPLED')
+    texture = nodes.new('ShaderNodeTexImage')
+    texture.image = atlas_image
+    material.node_tree.links.new(texture.outputs['Color'], principled.inputs['Base Color'])
+
+    mesh.materials.clear()
+    mesh.materials.append(material)
+    mesh.polygons.foreach_set('material_index', np.zeros(polygon_count, dtype=np.int64))
+    mesh.update()
+
+    return {
+        'draw_calls_before': int(len(used)),
+        'draw_calls_after': 1,
+        'texture_memory_before': texture_memory(image_sizes.values()),
+        'texture_memory_after': texture_memory([(atlas_width, atlas_height)]),
+        'atlas_file': atlas_image.filepath_raw,
+        **atlas_stats
+    }
+
 def setup_materials(obj):
     """Set up proper materials for Roblox compatibility."""
     if obj.type != 'MESH':
@@ -62,6 +378,7 @@ def setup_materials(obj):
     for slot in obj.material_slots:
         if slot.material:
             mat = slot.material
+            image, _ = base_color_source(mat)
             mat.use_nodes = True
             nodes = mat.node_tree.nodes
             
@@ -80,6 +397,12 @@ def setup_materials(obj):
             principled.inputs['Roughness'].default_value = 0.5
             principled.inputs['Specular'].default_value = 0.5
 
+            # Keep the base color texture (or atlas) across the rebuild
+            if image is not None:
+                texture = nodes.new('ShaderNodeTexImage')
+                texture.image = image
+                mat.node_tree.links.new(texture.outputs['Color'], principled.inputs['Base Color'])
+
 def verify_uv_maps(obj):
     """Ensure proper UV mapping."""
     if obj.type != 'MESH' and len(obj.data.uv_layers) == 0:
@@ -132,7 +455,7 @@ def get_mesh_stats():
     }
     
     for obj in bpy.context.scene.objects:
-        if obj.type == 'MESH':
+        if obj.type == 'MESH' and not obj.get('collision'):
             mesh = obj.data
             stats['final']['vertices'] += len(mesh.vertices)
             stats['final']['triangles'] += len(mesh.polygons)
@@ -165,12 +488,37 @@ def main():
         
         # Process each object
         modifications = []
-        for obj in bpy.context.scene.objects:
+        vertex_cache_stats = {}
+        normal_bake_stats = {}
+        collision_stats = {}
+        atlas_stats = {}
+        symmetry_stats = {}
+        texture_files = []  # Written next to the output and embedded in it on export
+        render_meshes = []
+        use_symmetry = (outfit_type in SYMMETRY_CONFIG['outfit_types']
+                        or os.getenv('MIRROR_SYMMETRY') == '1')
+        for obj in list(bpy.context.scene.objects):
             if obj.type == 'MESH':
-                # Optimize mesh
-                optimize_mesh(obj, 8000)  # Default triangle limit
+                # Symmetric items are processed as one half and mirrored at the end
+                high_poly = capture_high_poly(obj)
+                plane = keep_mirror_half(obj) if use_symmetry else None
+                triangle_budget = 8000  # Default triangle limit
+                if plane:
+                    triangle_budget //= 2
+                    modifications.append('mirror_half')
+                
+                # Optimize mesh, keeping the original surface for the normal bake
+                optimize_mesh(obj, triangle_budget)
                 modifications.append('mesh_optimization')
                 
+                # Merge material slots into one atlas so the mesh is a single draw call
+                merge_stats = merge_material_atlas(obj, output_path,
+                                                   ROBLOX_CONFIG.get(outfit_type, {}).get('texture_size'))
+                if merge_stats:
+                    texture_files.append(merge_stats.pop('atlas_file'))
+                    atlas_stats[obj.name] = merge_stats
+                    modifications.append('material_atlas')
+                
                 # Setup materials
                 setup_materials(obj)
                 modifications.append('material_setup')
@@ -178,16 +526,53 @@ def main():
                 # Verify UV maps
                 verify_uv_maps(obj)
                 modifications.append('uv_verification')
+                render_meshes.append(obj)
+                
+                # Recover the detail lost to decimation as a normal map
+                obj.data.calc_loop_triangles()
+                if len(obj.data.loop_triangles) < len(high_poly['faces']):
+                    try:
+                        bake_stats = bake_detail_normals(obj, high_poly, output_path)
+                        if bake_stats:
+                            texture_files.append(bake_stats.pop('map_file'))
+                            normal_bake_stats[obj.name] = bake_stats
+                            modifications.append('normal_bake')
+                    except Exception as e:
+                        print(f"Warning: normal bake failed for {obj.name}: {str(e)}", file=sys.stderr)
+                
+                # Mirror the processed half so both sides are identical
+                if plane:
+                    obj.data.calc_loop_triangles()
+                    plane['half_triangles'] = len(obj.data.loop_triangles)
+                    apply_mirror(obj, plane)
+                    obj.data.calc_loop_triangles()
+                    plane['triangles'] = len(obj.data.loop_triangles)
+                    symmetry_stats[obj.name] = plane
+                    modifications.append('mirror_symmetry')
+                
+                # Reorder the final triangles for the GPU vertex cache
+                cache_stats = optimize_vertex_order(obj)
+                if cache_stats:
+                    vertex_cache_stats[obj.name] = cache_stats
+                    modifications.append('vertex_cache_optimization')
                 
             elif obj.type == 'ARMATURE':
                 # Process armature
                 process_armature(obj, outfit_type)
                 modifications.append('armature_processing')
         
+        # Precompute compact collision hulls so Roblox physics cost stays predictable
+        for obj in render_meshes:
+            hull_stats = create_collision_mesh(obj, outfit_type)
+            if hull_stats:
+                collision_stats[obj.name] = hull_stats
+                modifications.append('collision_hull')
+        
         # Get final stats
         final_stats = get_mesh_stats()
         
         # Export processed FBX
+        export_start = time.time()
         bpy.ops.export_scene.fbx(
             filepath=output_path,
             use_selection=False,
@@ -207,8 +592,14 @@ def main():
             secondary_bone_axis='X',
             use_armature_deform_only=True,
             armature_nodetype='NULL',
-            path_mode='COPY'
+            path_mode='COPY',
+            embed_textures=True
         )
+        export_time = time.time() - export_start
+        # The textures travel inside the FBX; the loose copies are not job artifacts
+        for texture_file in texture_files:
+            if os.path.exists(texture_file):
+                os.remove(texture_file)
         
         # Prepare and return processing summary
         result = {
@@ -223,6 +614,16 @@ def main():
                         'triangles_delta': final_stats['final']['triangles'] - initial_stats['initial']['triangles']
                     },
                     'modifications_applied': list(set(modifications))
+                },
+                'vertex_cache': vertex_cache_stats,
+                'normal_bake': normal_bake_stats,
+                'collision': collision_stats,
+                'material_atlas': atlas_stats,
+                'mirror_symmetry': symmetry_stats,
+                'export': {
+                    'fbx_bytes': os.path.getsize(output_path),
+                    'embedded_textures': [os.path.basename(path) for path in texture_files],
+                    'fbx_export_time_s': round(export_time, 4)
                 }
             }
         }
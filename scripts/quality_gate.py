@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import cv2
+import numpy as np
+from PIL import Image
+
+from analyze_image import find_subject_contour
+from remove_background import file_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Metrics are measured on a copy downscaled to analysis_size, so thresholds are independent of upload size.
+# Sharpness, contrast and subject_area fail below their limits, clutter above them.
+QUALITY_CONFIG = {
+    'mode': os.getenv('QUALITY_GATE', 'enforce'),  # 'enforce', 'warn' (never reject) or 'off'
+    'analysis_size': 512,
+    'alpha_threshold': 16,
+    'thresholds': {
+        'sharpness': {'reject': 15.0, 'warn': 60.0},       # Laplacian variance
+        'contrast': {'reject': 0.03, 'warn': 0.08},        # RMS contrast, 0-1
+        'subject_area': {'reject': 0.01, 'warn': 0.05},    # Fraction of the frame covered by the subject
+        'clutter': {'reject': 0.1, 'warn': 0.03}           # Edge pixel fraction outside the subject bounds
+    },
+    'thresholds_file': os.getenv('QUALITY_THRESHOLDS'),  # Optional JSON overriding thresholds per metric
+    'decision_log': os.getenv('QUALITY_DECISION_LOG',
+                              os.path.join(os.path.dirname(__file__), '..', 'logs', 'quality_gate.jsonl'))
+}
+
+HIGHER_IS_WORSE = {'clutter'}
+
+def get_thresholds():
+    thresholds = {metric: dict(limits) for metric, limits in QUALITY_CONFIG['thresholds'].items()}
+    if QUALITY_CONFIG['thresholds_file']:
+        with open(QUALITY_CONFIG['thresholds_file']) as f:
+            for metric, limits in json.load(f).items():
+                thresholds.setdefault(metric, {}).update(limits)
+    return thresholds
+
+def _load_analysis_copy(image_path):
+    """Grayscale copy at analysis size, composited on white, and the alpha mask when there is one."""
+    size = QUALITY_CONFIG['analysis_size']
+    with Image.open(image_path) as img:
+        img.draft('RGB', (size, size))
+        transparent = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if transparent else 'RGB')
+        img.thumbnail((size, size), Image.BILINEAR, reducing_gap=2.0)
+        pixels = np.asarray(img, dtype=np.float32)
+
+    rgb = pixels[..., :3]
+    alpha = None
+    if transparent:
+        alpha = pixels[..., 3:] / 255.0
+        rgb = rgb * alpha + 255.0 * (1.0 - alpha)
+        alpha = alpha[..., 0] * 255.0 > QUALITY_CONFIG['alpha_threshold']
+    gray = (rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)).astype(np.uint8)
+    return gray, alpha
+
+def image_metrics(image_path):
+    """Sharpness, contrast, subject-area ratio and clutter of an image, measured on a downscaled copy."""
+    gray, alpha = _load_analysis_copy(image_path)
+    height, width = gray.shape
+
+    if alpha is not None and alpha.any():
+        subject_area = float(alpha.mean())
+        rows, cols = np.flatnonzero(alpha.any(axis=1)), np.flatnonzero(alpha.any(axis=0))
+        x, y, w, h = cols[0], rows[0], cols[-1] - cols[0] + 1, rows[-1] - rows[0] + 1
+    else:
+        main_contour, _, _ = find_subject_contour(gray)
+        if main_contour is None:
+            subject_area, (x, y, w, h) = 0.0, (0, 0, width, height)
+        else:
+            subject_area = cv2.contourArea(main_contour) / (width * height)
+            x, y, w, h = cv2.boundingRect(main_contour)
+
+    # Sharpness over the subject only, so a deliberately soft backdrop does not count against it
+    laplacian = cv2.Laplacian(gray[y:y + h, x:x + w], cv2.CV_32F)
+
+    edges = cv2.Canny(gray, 50, 150) > 0
+    outside = np.ones_like(edges)
+    outside[y:y + h, x:x + w] = False
+    clutter = float(edges[outside].mean()) if outside.any() else 0.0
+
+    return {
+        'sharpness': round(float(laplacian.var()), 2),
+        'contrast': round(float(gray.std()) / 255.0, 4),
+        'subject_area': round(float(subject_area), 4),
+        'clutter': round(clutter, 4),
+        'analysis_size': [width, height]
+    }
+
+def check_quality(metrics, thresholds=None):
+    """Decision ('accept', 'warn' or 'reject') and the reasons behind it."""
+    thresholds = thresholds or get_thresholds()
+    decision, reasons = 'accept', []
+    for metric, limits in thresholds.items():
+        value = metrics.get(metric)
+        if value is None:
+            continue
+        for level in ('reject', 'warn'):
+            limit = limits.get(level)
+            if limit is None:
+                continue
+            failed = value > limit if metric in HIGHER_IS_WORSE else value < limit
+            if failed:
+                reasons.append(f"{metric} {value} {'above' if metric in HIGHER_IS_WORSE else 'below'} "
+                               f"{level} threshold {limit}")
+                if level == 'reject' or decision == 'accept':
+                    decision = level
+                break
+    return decision, reasons
+
+def log_decision(entry):
+    """Append a decision or outcome as one JSON line, so thresholds can be tuned against results."""
+    path = QUALITY_CONFIG['decision_log']
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(dict(entry, time=time.strftime('%Y-%m-%dT%H:%M:%S'))) + '\n')
+    except OSError as e:
+        logger.error(f"Could not write quality gate log: {str(e)}")
+
+def record_outcome(image_hash, request_id, status, error=None):
+    """Log how a submitted image fared, keyed by the same hash as its gate decision."""
+    log_decision({'event': 'outcome', 'source_hash': image_hash, 'request_id': request_id,
+                  'status': status, 'error': error})
+
+def preflight(image_path, image_hash=None):
+    """
+    Check an image before it is submitted to Masterpiece X.
+
+    Returns whether it may be submitted and a report with the metrics,
+    decision and reasons. In 'warn' mode rejections are reported but
+    allowed through. Every decision is logged with the image hash.
+    """
+    if QUALITY_CONFIG['mode'] == 'off':
+        return True, {'decision': 'skipped'}
+
+    start_time = time.time()
+    thresholds = get_thresholds()
+    metrics = image_metrics(image_path)
+    decision, reasons = check_quality(metrics, thresholds)
+    allowed = decision != 'reject' or QUALITY_CONFIG['mode'] == 'warn'
+
+    report = {
+        'file': os.path.basename(image_path),
+        'source_hash': image_hash or file_hash(image_path),
+        'metrics': metrics,
+        'decision': decision,
+        'reasons': reasons,
+        'allowed': allowed,
+        'gate_time_s': round(time.time() - start_time, 4)
+    }
+    log_decision(dict(report, event='decision', mode=QUALITY_CONFIG['mode'], thresholds=thresholds))
+    log = logger.info if decision == 'accept' else logger.warning
+    log(f"Quality gate {decision} for {report['file']}: {json.dumps(metrics)}"
+        f"{' - ' + '; '.join(reasons) if reasons else ''}")
+    return allowed, report
+
+def main():
+    parser = argparse.ArgumentParser(description='Check images against the pre-flight quality gate')
+    parser.add_argument('inputs', nargs='+', help='Image files')
+    args = parser.parse_args()
+
+    failed = False
+    for image_path in args.inputs:
+        try:
+            allowed, report = preflight(image_path)
+            print(json.dumps(report))
+            failed = failed or not allowed
+        except Exception as e:
+            print(f"{image_path}: failed - {str(e)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+try:
+    from rembg import new_session, remove
+except ImportError:
+    new_session = remove = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKGROUND_CONFIG = {
+    'enabled': os.getenv('REMOVE_BACKGROUND', '0') == '1',  # Default for requests without an explicit choice
+    'model': os.getenv('REMBG_MODEL', 'u2net'),
+    'pool_size': int(os.getenv('REMBG_POOL_SIZE', '2')),       # Pre-loaded ONNX sessions
+    'threads_per_session': int(os.getenv('REMBG_THREADS', '2')),
+    'cache_dir': '.rembg_cache',
+    'suffix': '_nobg'
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _create_session():
+    # rembg sizes the ONNX Runtime intra/inter-op thread pools from OMP_NUM_THREADS
+    previous = os.environ.get('OMP_NUM_THREADS')
+    os.environ['OMP_NUM_THREADS'] = str(BACKGROUND_CONFIG['threads_per_session'])
+    try:
+        return new_session(BACKGROUND_CONFIG['model'])
+    finally:
+        if previous is None:
+            os.environ.pop('OMP_NUM_THREADS', None)
+        else:
+            os.environ['OMP_NUM_THREADS'] = previous
+
+def get_session_pool():
+    """Load the configured number of segmentation sessions once per process."""
+    global _pool
+    if new_session is None:
+        raise RuntimeError("rembg is not installed")
+    with _pool_lock:
+        if _pool is None:
+            start_time = time.time()
+            pool = queue.Queue()
+            for _ in range(BACKGROUND_CONFIG['pool_size']):
+                pool.put(_create_session())
+            _pool = pool
+            logger.info(f"Loaded {BACKGROUND_CONFIG['pool_size']} {BACKGROUND_CONFIG['model']} sessions "
+                        f"in {time.time() - start_time:.2f}s")
+    return _pool
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def background_removed_path(image_path):
+    return f"{os.path.splitext(image_path)[0]}{BACKGROUND_CONFIG['suffix']}.png"
+
+def remove_background(image_path, output_path=None, image_hash=None):
+    """
+    Cut the subject out of an image with a pooled rembg session.
+
+    Results are cached by source hash and model next to the image, so a
+    repeated image skips inference. A caller that already hashed the file
+    can pass image_hash. Returns the RGBA PNG path and a report.
+    """
+    start_time = time.time()
+    output_path = output_path or background_removed_path(image_path)
+    image_hash = image_hash or file_hash(image_path)
+    cache_dir = os.path.join(os.path.dirname(image_path), BACKGROUND_CONFIG['cache_dir'])
+    cached = os.path.join(cache_dir, f"{image_hash}_{BACKGROUND_CONFIG['model']}.png")
+
+    report = {'file': os.path.basename(output_path), 'source_hash': image_hash, 'model': BACKGROUND_CONFIG['model']}
+    if os.path.exists(cached):
+        shutil.copyfile(cached, output_path)
+        return output_path, dict(report, cached=True, time_s=round(time.time() - start_time, 4))
+
+    pool = get_session_pool()
+    wait_start = time.time()
+    session = pool.get()
+    try:
+        inference_start = time.time()
+        with Image.open(image_path) as img:
+            result = remove(img.convert('RGB'), session=session)
+        inference_time = time.time() - inference_start
+    finally:
+        pool.put(session)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+    result.save(temp_path, format='PNG')
+    os.replace(temp_path, cached)
+    shutil.copyfile(cached, output_path)
+
+    return output_path, dict(report, cached=False,
+                             queue_wait_s=round(inference_start - wait_start, 4),
+                             inference_s=round(inference_time, 4),
+                             time_s=round(time.time() - start_time, 4))
+
+def remove_backgrounds(paths):
+    """Run a batch back to back on the session pool, one thread per session."""
+    reports = {}
+    get_session_pool()
+    with ThreadPoolExecutor(max_workers=BACKGROUND_CONFIG['pool_size']) as executor:
+        futures = {path: executor.submit(remove_background, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                reports[path] = future.result()[1]
+            except Exception as e:
+                logger.error(f"Background removal failed for {path}: {str(e)}")
+                reports[path] = {'file': os.path.basename(path), 'error': str(e)}
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove image backgrounds with pooled rembg sessions')
+    parser.add_argument('inputs', nargs='+', help='Image files')
+    args = parser.parse_args()
+
+    reports = remove_backgrounds(args.inputs)
+    print(json.dumps(list(reports.values()), indent=2))
+    sys.exit(1 if any('error' in report for report in reports.values()) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+
+from fbx_io import read_fbx, find_node, find_child, find_children, load_fbx_meshes
+from collision_hull import COLLISION_SUFFIX
+from cage_fitting import INNER_CAGE_SUFFIX, OUTER_CAGE_SUFFIX
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Turntable sprites: one row of frames rotating the asset about its up axis
+PREVIEW_CONFIG = {
+    'angles': int(os.getenv('PREVIEW_ANGLES', '8')),
+    'resolution': int(os.getenv('PREVIEW_RESOLUTION', '256')),
+    'max_workers': int(os.getenv('PREVIEW_MAX_WORKERS', '2')),
+    'platform': os.getenv('PYOPENGL_PLATFORM', 'osmesa'),  # CPU offscreen; 'egl' where a device is available
+    'cache_dir': '.preview_cache',
+    'suffix': '_turntable.png',
+    'yfov': np.pi / 4.0,
+    'timeout_s': 300
+}
+
+_executor = None
+_renderer = None
+_pyrender = None
+
+def _init_worker(resolution):
+    """Create the offscreen renderer once per worker process."""
+    global _renderer, _pyrender
+    os.environ['PYOPENGL_PLATFORM'] = PREVIEW_CONFIG['platform']
+    import pyrender
+    _pyrender = pyrender
+    _renderer = pyrender.OffscreenRenderer(resolution, resolution)
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PREVIEW_CONFIG['max_workers'],
+            initializer=_init_worker,
+            initargs=(PREVIEW_CONFIG['resolution'],)
+        )
+    return _executor
+
+def reset_executor(broken):
+    """Drop a pool whose worker died (e.g. a crashed GL context) so the next get_executor() builds a new one."""
+    global _executor
+    if _executor is broken:
+        _executor = None
+        broken.shutdown(wait=False)
+
+def submit_render(path, cached):
+    """Submit a render, rebuilding the pool once if it is already broken. Returns the pool and the future."""
+    executor = get_executor()
+    try:
+        return executor, executor.submit(render_turntable, path, cached)
+    except BrokenProcessPool:
+        logger.warning("Preview pool was broken; starting a new one")
+        reset_executor(executor)
+        executor = get_executor()
+        return executor, executor.submit(render_turntable, path, cached)
+
+def asset_hash(path):
+    """SHA-256 of the asset bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def preview_path(asset_path):
+    return os.path.splitext(asset_path)[0] + PREVIEW_CONFIG['suffix']
+
+def cached_sprite_path(asset_path, digest):
+    cache_dir = os.path.join(os.path.dirname(asset_path), PREVIEW_CONFIG['cache_dir'])
+    return os.path.join(cache_dir, f"{digest}_{PREVIEW_CONFIG['angles']}x{PREVIEW_CONFIG['resolution']}.png")
+
+def _fbx_texture(path):
+    """First embedded texture of an FBX as a PIL image, or None."""
+    _, nodes = read_fbx(path)
+    objects = find_node(nodes, 'Objects')
+    for video in find_children(objects, 'Video') if objects else []:
+        content = find_child(video, 'Content')
+        if content is not None and content['props'] and isinstance(content['props'][0][1], bytes) and content['props'][0][1]:
+            return Image.open(io.BytesIO(content['props'][0][1])).convert('RGBA')
+    return None
+
+def load_preview_meshes(path):
+    """Render meshes of a GLB or binary FBX as trimesh objects; helper geometry is left out."""
+    import trimesh
+    if path.lower().endswith('.fbx'):
+        texture = _fbx_texture(path)
+        meshes = []
+        helper_suffixes = (COLLISION_SUFFIX, INNER_CAGE_SUFFIX, OUTER_CAGE_SUFFIX)
+        for mesh in load_fbx_meshes(path):
+            if mesh['name'].endswith(helper_suffixes):
+                continue
+            visual = None
+            if texture is not None and mesh['uvs'] is not None:
+                visual = trimesh.visual.TextureVisuals(uv=mesh['uvs'], image=texture)
+            meshes.append(trimesh.Trimesh(vertices=mesh['positions'], faces=mesh['faces'],
+                                          vertex_normals=mesh['normals'], visual=visual, process=False))
+        return meshes
+    scene = trimesh.load(path, force='scene')
+    return [geometry for geometry in scene.dump() if isinstance(geometry, trimesh.Trimesh)]
+
+def _orbit_pose(center, angle, distance):
+    """Camera pose circling the center about +Y, looking at it."""
+    c, s = np.cos(angle), np.sin(angle)
+    pose = np.eye(4)
+    pose[:3, :3] = [[c, 0.0, s], [0.0, 1.0, 0.0], [-s, 0.0, c]]
+    pose[:3, 3] = center + np.array([s, 0.0, c]) * distance
+    return pose
+
+def render_turntable(path, output_path):
+    """Render the asset from evenly spaced angles into a one-row sprite sheet."""
+    start_time = time.time()
+    pyrender = _pyrender
+    meshes = load_preview_meshes(path)
+    if not meshes:
+        raise ValueError(f"No renderable meshes in {path}")
+
+    vertices = np.concatenate([mesh.vertices for mesh in meshes])
+    lower, upper = vertices.min(axis=0), vertices.max(axis=0)
+    center = (lower + upper) / 2.0
+    radius = max(float(np.linalg.norm(upper - lower)) / 2.0, 1e-6)
+    distance = radius / np.sin(PREVIEW_CONFIG['yfov'] / 2.0) * 1.05
+
+    scene = pyrender.Scene(bg_color=[0.0, 0.0, 0.0, 0.0], ambient_light=[0.35, 0.35, 0.35])
+    for mesh in meshes:
+        scene.add(pyrender.Mesh.from_trimesh(mesh, smooth=False))
+    camera = scene.add(pyrender.PerspectiveCamera(yfov=PREVIEW_CONFIG['yfov'], znear=distance * 0.01,
+                                                  zfar=distance + radius * 2.0))
+    light = scene.add(pyrender.DirectionalLight(color=np.ones(3), intensity=3.0))
+
+    frames = []
+    for step in range(PREVIEW_CONFIG['angles']):
+        pose = _orbit_pose(center, 2.0 * np.pi * step / PREVIEW_CONFIG['angles'], distance)
+        scene.set_pose(camera, pose)
+        scene.set_pose(light, pose)
+        color, _ = _renderer.render(scene, flags=pyrender.RenderFlags.RGBA)
+        frames.append(color)
+
+    Image.fromarray(np.hstack(frames)).save(output_path, optimize=True)
+    return {
+        'frames': len(frames),
+        'resolution': PREVIEW_CONFIG['resolution'],
+        'render_time_s': round(time.time() - start_time, 4)
+    }
+
+def render_previews(paths):
+    """
+    Render turntable sprites for a batch of assets on the preview workers.
+
+    Sprites are cached by asset hash, angle count and resolution, so an
+    unchanged asset is only copied next to itself. Returns a report per path.
+    """
+    reports, futures = {}, {}
+    for path in paths:
+        try:
+            digest = asset_hash(path)
+            cached = cached_sprite_path(path, digest)
+            if os.path.exists(cached):
+                shutil.copyfile(cached, preview_path(path))
+                reports[path] = {'file': os.path.basename(path), 'sprite': os.path.basename(preview_path(path)),
+                                 'asset_hash': digest, 'cached': True}
+                continue
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            futures[path] = (digest, *submit_render(path, cached))
+        except Exception as e:
+            logger.error(f"Preview rendering failed for {path}: {str(e)}")
+            reports[path] = {'file': os.path.basename(path), 'error': str(e)}
+
+    for path, (digest, executor, future) in futures.items():
+        try:
+            try:
+                report = future.result(timeout=PREVIEW_CONFIG['timeout_s'])
+            except BrokenProcessPool:
+                # A worker died mid-batch; every pending render on that pool fails with it, so retry each once
+                logger.warning(f"Preview pool broke while rendering {os.path.basename(path)}; retrying once")
+                reset_executor(executor)
+                _, future = submit_render(path, cached_sprite_path(path, digest))
+                report = future.result(timeout=PREVIEW_CONFIG['timeout_s'])
+            shutil.copyfile(cached_sprite_path(path, digest), preview_path(path))
+            reports[path] = dict(report, file=os.path.basename(path), sprite=os.path.basename(preview_path(path)),
+                                 asset_hash=digest, cached=False)
+            logger.info(f"Turntable for {os.path.basename(path)}: {report['frames']} frames in {report['render_time_s']}s")
+        except Exception as e:
+            logger.error(f"Preview rendering failed for {path}: {str(e)}")
+            reports[path] = {'file': os.path.basename(path), 'error': str(e)}
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description='Render turntable preview sprites for GLB/FBX assets')
+    parser.add_argument('inputs', nargs='+', help='GLB or binary FBX files')
+    args = parser.parse_args()
+
+    reports = render_previews(args.inputs)
+    print(json.dumps(list(reports.values()), indent=2))
+    sys.exit(1 if any('error' in report for report in reports.values()) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import struct
+import logging
+import argparse
+import numpy as np
+
+from fbx_io import load_fbx_meshes
+from collision_hull import COLLISION_SUFFIX
+from cage_fitting import INNER_CAGE_SUFFIX, OUTER_CAGE_SUFFIX
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROBLOX_MESH_CONFIG = {
+    'version': b'version 2.00\n',
+    'suffix': '.mesh',
+    'scale': 0.01    # FBX centimeters to meters, as ROBLOX_STYLE_CONFIG['scale_factor']
+}
+
+# Roblox mesh v2: float position, normal and (u, v) texture coordinate, then a byte tangent
+# (x, y, z, bitangent sign), each stored as (value + 1) * 127
+MESH_HEADER = struct.Struct('<HBBII')
+MESH_VERTEX = np.dtype([('position', '<f4', 3), ('normal', '<f4', 3), ('uv', '<f4', 2), ('tangent', 'u1', 4)])
+MESH_FACE = np.dtype(('<u4', 3))
+NEUTRAL_TANGENT = np.array([1.0, 0.0, 0.0, 1.0])
+
+def vertex_tangents(positions, normals, uvs, faces):
+    """Per-vertex (x, y, z, sign) tangents from the UV layout, neutral where it gives none."""
+    tangents = np.tile(NEUTRAL_TANGENT, (len(positions), 1))
+    if normals is None or uvs is None or not len(faces):
+        return tangents
+    positions, normals, uvs = (np.asarray(a, dtype=np.float64) for a in (positions, normals, uvs))
+    p0, p1, p2 = (positions[faces[:, i]] for i in range(3))
+    t0, t1, t2 = (uvs[faces[:, i]] for i in range(3))
+    e1, e2, d1, d2 = p1 - p0, p2 - p0, t1 - t0, t2 - t0
+    det = d1[:, 0] * d2[:, 1] - d2[:, 0] * d1[:, 1]
+    det = np.where(np.abs(det) > 1e-12, det, np.inf)
+    face_tangents = (e1 * d2[:, 1:2] - e2 * d1[:, 1:2]) / det[:, None]
+    face_bitangents = (e2 * d1[:, 0:1] - e1 * d2[:, 0:1]) / det[:, None]
+
+    tangent_sum = np.zeros_like(positions)
+    bitangent_sum = np.zeros_like(positions)
+    for i in range(3):
+        np.add.at(tangent_sum, faces[:, i], face_tangents)
+        np.add.at(bitangent_sum, faces[:, i], face_bitangents)
+
+    # Orthogonalize against the normal; vertices without a usable UV gradient keep the neutral tangent
+    tangent = tangent_sum - normals * np.sum(normals * tangent_sum, axis=1, keepdims=True)
+    length = np.linalg.norm(tangent, axis=1)
+    valid = length > 1e-8
+    tangents[valid, :3] = tangent[valid] / length[valid, None]
+    handedness = np.sum(np.cross(normals, tangent_sum) * bitangent_sum, axis=1)
+    tangents[valid, 3] = np.where(handedness[valid] < 0.0, -1.0, 1.0)
+    return tangents
+
+def encode_roblox_mesh(mesh, scale=1.0):
+    """Pack a mesh dictionary into Roblox binary mesh (version 2.00) bytes."""
+    vertices = np.zeros(len(mesh['positions']), dtype=MESH_VERTEX)
+    vertices['position'] = np.asarray(mesh['positions']) * scale
+    if mesh.get('normals') is not None:
+        vertices['normal'] = mesh['normals']
+    if mesh.get('uvs') is not None:
+        # Roblox samples textures with a top-left origin
+        vertices['uv'][:, 0] = mesh['uvs'][:, 0]
+        vertices['uv'][:, 1] = 1.0 - mesh['uvs'][:, 1]
+    faces = np.ascontiguousarray(mesh['faces'], dtype=MESH_FACE.base)
+    # Tangents follow the stored (flipped) v axis, which is what Roblox shades with
+    uvs = vertices['uv'] if mesh.get('uvs') is not None else None
+    tangents = vertex_tangents(mesh['positions'], mesh.get('normals'), uvs, faces.astype(np.int64))
+    vertices['tangent'] = np.clip(np.round((tangents + 1.0) * 127.0), 0, 254)
+
+    header = MESH_HEADER.pack(MESH_HEADER.size, MESH_VERTEX.itemsize, MESH_FACE.itemsize,
+                              len(vertices), len(faces))
+    return ROBLOX_MESH_CONFIG['version'] + header + vertices.tobytes() + faces.tobytes()
+
+def decode_roblox_mesh(data):
+    """Parse Roblox binary mesh (version 2.00) bytes back into a mesh dictionary."""
+    version = ROBLOX_MESH_CONFIG['version']
+    if not data.startswith(version):
+        raise ValueError(f"Unsupported mesh version: {data[:13]!r}")
+    offset = len(version)
+    header_size, vertex_size, face_size, vertex_count, face_count = MESH_HEADER.unpack_from(data, offset)
+    if vertex_size != MESH_VERTEX.itemsize or face_size != MESH_FACE.itemsize:
+        raise ValueError(f"Unsupported vertex/face layout: {vertex_size}/{face_size} bytes")
+    offset += header_size
+    vertices = np.frombuffer(data, dtype=MESH_VERTEX, count=vertex_count, offset=offset)
+    offset += vertex_count * vertex_size
+    faces = np.frombuffer(data, dtype=MESH_FACE.base, count=face_count * 3, offset=offset).reshape(-1, 3)
+    uvs = vertices['uv'].copy()
+    uvs[:, 1] = 1.0 - uvs[:, 1]
+    return {
+        'positions': vertices['position'].copy(),
+        'normals': vertices['normal'].copy(),
+        'uvs': uvs,
+        'tangents': vertices['tangent'] / 127.0 - 1.0,
+        'faces': faces.copy()
+    }
+
+def merge_meshes(meshes):
+    """Concatenate mesh dictionaries into one, offsetting face indices."""
+    offsets = np.cumsum([0] + [len(mesh['positions']) for mesh in meshes])
+    merged = {'faces': np.concatenate([mesh['faces'] + offset for mesh, offset in zip(meshes, offsets)])}
+    for key, width in (('positions', 3), ('normals', 3), ('uvs', 2)):
+        merged[key] = np.concatenate([
+            mesh[key] if mesh.get(key) is not None else np.zeros((len(mesh['positions']), width))
+            for mesh in meshes
+        ])
+    return merged
+
+def roblox_mesh_path(fbx_path):
+    return os.path.splitext(fbx_path)[0] + ROBLOX_MESH_CONFIG['suffix']
+
+def export_roblox_mesh(fbx_path, output_path=None, scale=None):
+    """
+    Write the render geometry of an FBX as a Roblox binary mesh.
+
+    Collision hulls and layered clothing cages stay in the FBX only. Returns
+    the output path and a report comparing size against the FBX.
+    """
+    output_path = output_path or roblox_mesh_path(fbx_path)
+    scale = ROBLOX_MESH_CONFIG['scale'] if scale is None else scale
+
+    start_time = time.time()
+    helper_suffixes = (COLLISION_SUFFIX, INNER_CAGE_SUFFIX, OUTER_CAGE_SUFFIX)
+    meshes = [mesh for mesh in load_fbx_meshes(fbx_path) if not mesh['name'].endswith(helper_suffixes)]
+    if not meshes:
+        raise ValueError(f"No render meshes in {fbx_path}")
+    mesh = merge_meshes(meshes)
+    read_time = time.time() - start_time
+
+    write_start = time.time()
+    data = encode_roblox_mesh(mesh, scale)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    write_time = time.time() - write_start
+
+    fbx_size = os.path.getsize(fbx_path)
+    report = {
+        'file': os.path.basename(output_path),
+        'vertices': int(len(mesh['positions'])),
+        'triangles': int(len(mesh['faces'])),
+        'bytes': len(data),
+        'fbx_bytes': fbx_size,
+        'size_ratio': round(len(data) / fbx_size, 4) if fbx_size else None,
+        'fbx_read_time_s': round(read_time, 4),
+        'write_time_s': round(write_time, 4)
+    }
+    logger.info(f"Roblox mesh written to {output_path}: {len(data)} bytes ({fbx_size} bytes FBX)")
+    return output_path, report
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert FBX render meshes to the Roblox binary mesh format')
+    parser.add_argument('inputs', nargs='+', help='Binary FBX files')
+    parser.add_argument('--scale', type=float, default=ROBLOX_MESH_CONFIG['scale'], help='Position scale')
+    args = parser.parse_args()
+
+    failed = False
+    for fbx_path in args.inputs:
+        try:
+            _, report = export_roblox_mesh(fbx_path, scale=args.scale)
+            print(json.dumps(report))
+        except Exception as e:
+            print(f"{fbx_path}: failed - {str(e)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
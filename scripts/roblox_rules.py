@@ -0,0 +1,97 @@
+import json
+import hashlib
+
+# Roblox configuration for different outfit types
+ROBLOX_CONFIG = {
+    'clothes': {
+        'max_triangles': 8000,
+        'texture_size': 512,
+        'skeleton': 'R15',
+        'bones': [
+            'HumanoidRootNode', 'Torso', 'UpperTorso', 'LowerTorso',
+            'RightArm', 'RightForearm', 'LeftArm', 'LeftForearm',
+            'RightLeg', 'RightForeleg', 'LeftLeg', 'LeftForeleg'
+        ],
+        'uv_regions': {
+            'shirt': {'top': [0, 0, 1, 0.5], 'bottom': [0, 0.5, 1, 1]},
+            'pants': {'legs': [0, 0, 1, 1]}
+        }
+    },
+    'hats': {
+        'max_triangles': 2000,
+        'texture_size': 256,
+        'size_limits': {'x': 500, 'y': 500, 'z': 500},
+        'attachments': ['HeadAttachment'],
+        'needs_rigging': False
+    },
+    'shoes': {
+        'max_triangles': 1500,
+        'texture_size': 256,
+        'size_limits': {'x': 200, 'y': 200, 'z': 200},
+        'attachments': ['LeftFootAttachment', 'RightFootAttachment'],
+        'needs_rigging': True,
+        'bones': ['LeftFoot', 'RightFoot']
+    }
+}
+
+def config_hash(outfit_type=None):
+    """Stable digest of the rules an outfit type is validated against."""
+    config = ROBLOX_CONFIG.get(outfit_type, {}) if outfit_type else ROBLOX_CONFIG
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def check_model_stats(stats, outfit_type):
+    """
+    Check model statistics against the Roblox rules of an outfit type.
+
+    Returns one {'rule', 'severity', 'message'} entry per failed check, where
+    severity is 'error' or 'warning'.
+    """
+    config = ROBLOX_CONFIG.get(outfit_type, {})
+    failures = []
+
+    # Check triangle count
+    max_triangles = config.get('max_triangles', 8000)
+    if stats['geometry']['triangles'] > max_triangles:
+        failures.append({
+            'rule': 'max_triangles',
+            'severity': 'error',
+            'message': f"Triangle count ({stats['geometry']['triangles']}) exceeds limit ({max_triangles})"
+        })
+
+    # Check dimensions
+    for axis, limit in config.get('size_limits', {}).items():
+        if stats['dimensions'][axis] > limit:
+            failures.append({
+                'rule': f"size_limits.{axis}",
+                'severity': 'warning',
+                'message': f"{axis.upper()} dimension ({stats['dimensions'][axis]:.2f}) exceeds recommended limit ({limit})"
+            })
+
+    # Check rigging requirements
+    if config.get('needs_rigging', False):
+        if not stats['rigging']['armature']:
+            failures.append({'rule': 'armature', 'severity': 'error', 'message': "Missing required armature"})
+        else:
+            required_bones = config.get('bones', [])
+            missing_bones = [bone for bone in required_bones
+                             if bone not in stats['rigging']['armature']['bone_names']]
+            if missing_bones:
+                failures.append({
+                    'rule': 'bones',
+                    'severity': 'error',
+                    'message': f"Missing required bones: {', '.join(missing_bones)}"
+                })
+
+    # Check UV maps
+    if stats['materials']['uv_layers'] == 0:
+        failures.append({'rule': 'uv_maps', 'severity': 'error', 'message': "No UV maps found"})
+
+    return failures
+
+def validate_model_stats(stats, outfit_type):
+    """Group failed checks into the {'warnings', 'errors'} message lists of a validation report."""
+    failures = check_model_stats(stats, outfit_type)
+    return {
+        'warnings': [f['message'] for f in failures if f['severity'] == 'warning'],
+        'errors': [f['message'] for f in failures if f['severity'] == 'error']
+    }
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+
+SKIN_CONFIG = {
+    'max_influences': 4,
+    'chunk_size': 65536,         # Vertices per vectorized distance block
+    'falloff_power': 2.0,        # Inverse-distance exponent
+    'weight_levels': 256,        # Quantization used to batch vertex group writes
+    'excluded_bones': ['Root']
+}
+
+def _nearest_influences(points, heads, tails):
+    """
+    Exact distances from each point to every bone segment; returns the
+    closest few bone indices and their distances.
+
+    The R15 rig has 15 weighted bones, so testing all of them is cheaper
+    than building a spatial index to prune them.
+    """
+    chunk = SKIN_CONFIG['chunk_size']
+    if len(points) > chunk:
+        parts = [_nearest_influences(points[i:i + chunk], heads, tails) for i in range(0, len(points), chunk)]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    axis = tails - heads
+    offset = points[:, None, :] - heads[None, :, :]
+    t = np.clip((offset * axis).sum(axis=2) / np.maximum((axis ** 2).sum(axis=1), 1e-12), 0.0, 1.0)
+    distances = np.linalg.norm(offset - t[:, :, None] * axis, axis=2)
+
+    influences = min(SKIN_CONFIG['max_influences'], distances.shape[1])
+    nearest = np.argpartition(distances, influences - 1, axis=1)[:, :influences]
+    return nearest, np.take_along_axis(distances, nearest, axis=1)
+
+def compute_skin_weights(positions, bone_names, heads, tails):
+    """
+    Distance-to-segment skin weights for all vertices at once.
+
+    Returns per-vertex bone indices and weights (both (vertices,
+    max_influences), weights summing to one) plus timing stats.
+    """
+    start_time = time.time()
+    positions = np.asarray(positions, dtype=np.float64)
+    active = np.array([name not in SKIN_CONFIG['excluded_bones'] for name in bone_names])
+    bone_ids = np.flatnonzero(active)
+    heads = np.asarray(heads, dtype=np.float64)[active]
+    tails = np.asarray(tails, dtype=np.float64)[active]
+
+    influences = min(SKIN_CONFIG['max_influences'], len(heads))
+    indices, distances = _nearest_influences(positions, heads, tails)
+
+    weights = 1.0 / np.maximum(distances, 1e-6) ** SKIN_CONFIG['falloff_power']
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    stats = {
+        'vertices': int(len(positions)),
+        'bones': int(len(heads)),
+        'max_influences': influences,
+        'weights_time_s': round(time.time() - start_time, 4)
+    }
+    return bone_ids[indices], weights, stats
+
+def weight_batches(indices, weights):
+    """
+    Group (vertex, bone, weight) triples by bone and quantized weight so each
+    group can be written with a single VertexGroup.add call.
+
+    Yields (bone index, weight, vertex indices).
+    """
+    levels = SKIN_CONFIG['weight_levels'] - 1
+    vertices = np.repeat(np.arange(len(indices)), indices.shape[1])
+    bones = indices.reshape(-1)
+    quantized = np.rint(weights.reshape(-1) * levels).astype(np.int64)
+    keep = quantized > 0
+    vertices, bones, quantized = vertices[keep], bones[keep], quantized[keep]
+
+    order = np.lexsort((quantized, bones))
+    keys = np.stack([bones[order], quantized[order]], axis=1)
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+    ends = np.r_[starts[1:], len(order)]
+    for start, end in zip(starts, ends):
+        yield int(keys[start, 0]), keys[start, 1] / levels, vertices[order[start:end]].tolist()
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import cv2
+import numpy as np
+from PIL import Image
+
+from analyze_image import find_subject_contour
+from crop_subject import crop_box
+from normalize_image import NORMALIZE_CONFIG, _pad_color
+from remove_background import file_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SPLIT_CONFIG = {
+    'max_items': int(os.getenv('SPLIT_MAX_ITEMS', '6')),
+    'min_item_ratio': 0.1,     # Items smaller than this fraction of the largest one are treated as noise
+    'merge_gap': 0.02,         # Parts closer than this fraction of the longer side belong to one item (shoe pairs)
+    'alpha_threshold': 16,
+    'cache_dir': '.split_cache',
+    'suffix': '_item'
+}
+
+def _subject_mask(pixels, transparent):
+    if transparent:
+        mask = pixels[..., 3] > SPLIT_CONFIG['alpha_threshold']
+        if not mask.all():
+            return mask.astype(np.uint8)
+    gray = cv2.cvtColor(np.ascontiguousarray(pixels[..., :3]), cv2.COLOR_RGB2GRAY)
+    _, _, mask = find_subject_contour(gray)
+    return (mask > 0).astype(np.uint8)
+
+def find_items(pixels, transparent):
+    """
+    Bounding boxes of the separate items on a sheet, largest first.
+
+    The subject mask is dilated by the merge gap so parts of one product
+    stay together, then split into connected components; components well
+    under the largest one are dropped. Returns the boxes and the component
+    label image.
+    """
+    mask = _subject_mask(pixels, transparent)
+    gap = max(round(max(mask.shape) * SPLIT_CONFIG['merge_gap']), 1)
+    grouped = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * gap + 1, 2 * gap + 1)))
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(grouped, connectivity=8)
+    if count <= 1:
+        return [], labels
+
+    # Area of the undilated subject inside each group, so the dilation does not inflate thin noise
+    areas = np.bincount(labels[mask > 0], minlength=count)
+    areas[0] = 0
+    order = [label for label in np.argsort(areas)[::-1] if areas[label] > 0]
+    keep = [label for label in order if areas[label] >= areas[order[0]] * SPLIT_CONFIG['min_item_ratio']]
+
+    items = []
+    for label in keep[:SPLIT_CONFIG['max_items']]:
+        x, y, w, h = stats[label, :4]
+        # Undo the dilation on the bounds
+        component = (labels[y:y + h, x:x + w] == label) & (mask[y:y + h, x:x + w] > 0)
+        rows, cols = np.flatnonzero(component.any(axis=1)), np.flatnonzero(component.any(axis=0))
+        items.append({'label': int(label),
+                      'bounds': [int(x + cols[0]), int(y + rows[0]),
+                                 int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)],
+                      'area': int(areas[label])})
+    return items, labels
+
+def split_sheet(image_path, image_hash=None):
+    """
+    Cut a multi-item sheet into one image per item.
+
+    Each crop gets the subject crop margin, and pixels of neighbouring
+    items that fall inside it are replaced by the backdrop color (or made
+    transparent), so every job sees a single product. Item boxes and crops
+    are cached by source hash. Returns the crop paths (empty when the
+    sheet holds fewer than two items) and a report.
+    """
+    start_time = time.time()
+    image_hash = image_hash or file_hash(image_path)
+    cache_dir = os.path.join(os.path.dirname(image_path), SPLIT_CONFIG['cache_dir'])
+    record_path = os.path.join(cache_dir, f"{image_hash}.json")
+
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        record = None
+
+    cache_hit = record is not None
+    if not cache_hit:
+        with Image.open(image_path) as img:
+            transparent = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            img = img.convert('RGBA' if transparent else 'RGB')
+            pixels = np.asarray(img)
+
+        items, labels = find_items(pixels, transparent)
+        record = {'size': list(img.size), 'format': 'PNG' if transparent else 'JPEG', 'item_count': len(items),
+                  'items': []}
+        os.makedirs(cache_dir, exist_ok=True)
+        if len(items) > 1:
+            fill = None if transparent else _pad_color(img)
+            for index, item in enumerate(items, 1):
+                x0, y0, x1, y1 = crop_box(item['bounds'], img.size, min_size=1)
+                crop = pixels[y0:y1, x0:x1].copy()
+                region = labels[y0:y1, x0:x1]
+                others = (region != item['label']) & (region != 0)
+                if transparent:
+                    crop[others, 3] = 0
+                else:
+                    crop[others] = fill
+                cached = os.path.join(cache_dir, f"{image_hash}_{index}.{'png' if transparent else 'jpg'}")
+                temp_path = f"{cached}.{os.getpid()}.tmp"
+                if transparent:
+                    Image.fromarray(crop).save(temp_path, format='PNG')
+                else:
+                    Image.fromarray(crop).save(temp_path, format='JPEG', quality=NORMALIZE_CONFIG['jpeg_quality'],
+                                               optimize=True)
+                os.replace(temp_path, cached)
+                record['items'].append({'bounds': item['bounds'], 'area': item['area'], 'box': [x0, y0, x1, y1]})
+
+        with open(f"{record_path}.{os.getpid()}.tmp", 'w') as f:
+            json.dump(record, f)
+        os.replace(f"{record_path}.{os.getpid()}.tmp", record_path)
+
+    paths = []
+    extension = 'png' if record['format'] == 'PNG' else 'jpg'
+    for index in range(1, len(record['items']) + 1):
+        path = f"{os.path.splitext(image_path)[0]}{SPLIT_CONFIG['suffix']}{index}.{extension}"
+        shutil.copyfile(os.path.join(cache_dir, f"{image_hash}_{index}.{extension}"), path)
+        paths.append(path)
+
+    report = dict(record, source_hash=image_hash, cached=cache_hit, files=[os.path.basename(p) for p in paths],
+                  split_time_s=round(time.time() - start_time, 4))
+    logger.info(f"Found {record['item_count']} items in {os.path.basename(image_path)}"
+                f"{' (cached)' if cache_hit else ''}")
+    return paths, report
+
+def main():
+    parser = argparse.ArgumentParser(description='Split multi-item sheets into one image per item')
+    parser.add_argument('inputs', nargs='+', help='Image files')
+    args = parser.parse_args()
+
+    failed = False
+    for image_path in args.inputs:
+        try:
+            _, report = split_sheet(image_path)
+            print(json.dumps(report))
+        except Exception as e:
+            print(f"{image_path}: failed - {str(e)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
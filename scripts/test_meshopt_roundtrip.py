@@ -0,0 +1,125 @@
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from glb_io import read_glb, write_glb, load_glb_mesh
+from compress_glb import (
+    COMPRESSION_CONFIG, build_compressed_glb, compressed_path, quantize_mesh,
+    decode_vertex_buffer, decode_index_sequence
+)
+
+# The reference decoder catches encoder bugs that the repo's own decoder mirrors
+try:
+    import meshoptimizer
+except ImportError:
+    meshoptimizer = None
+
+COMPONENT_TYPES = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16, 5125: np.uint32, 5126: np.float32}
+COMPONENT_COUNTS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4}
+
+def decode_views(gltf, bin_data, reference=False):
+    """Decoded bytes of every meshopt-compressed buffer view, by view index, with the repo or reference decoder."""
+    views = {}
+    for index, view in enumerate(gltf['bufferViews']):
+        extension = view.get('extensions', {}).get('EXT_meshopt_compression')
+        if extension is None:
+            continue
+        payload = bin_data[extension['byteOffset']:extension['byteOffset'] + extension['byteLength']]
+        count, stride = extension['count'], extension['byteStride']
+        if extension['mode'] == 'ATTRIBUTES':
+            if reference:
+                # The wrapper's dtype argument mis-sizes its buffer; decode to float32 rows and compare the bytes
+                decoded = meshoptimizer.decode_vertex_buffer(count, stride, payload)
+                views[index] = np.ascontiguousarray(decoded).view(np.uint8).reshape(count, stride)
+            else:
+                views[index] = decode_vertex_buffer(payload, count, stride)
+        elif reference:
+            # The wrapper always returns a uint32 array; 16-bit indices are packed at its start
+            decoded = meshoptimizer.decode_index_sequence(count, stride, payload)
+            views[index] = (decoded.view(np.uint16)[:count] if stride == 2 else decoded).astype(np.uint32)
+        else:
+            views[index] = decode_index_sequence(payload, count)
+    return views
+
+def read_decoded_accessor(gltf, views, accessor_index):
+    """Accessor values from a decoded view, dequantized the way a glTF loader would."""
+    accessor = gltf['accessors'][accessor_index]
+    decoded = views[accessor['bufferView']]
+    if accessor['type'] == 'SCALAR':
+        return decoded.astype(np.int64)
+    dtype = np.dtype(COMPONENT_TYPES[accessor['componentType']])
+    components = COMPONENT_COUNTS[accessor['type']]
+    values = np.ascontiguousarray(decoded).view(dtype)[:, :components].astype(np.float64)
+    if accessor.get('normalized'):
+        values = np.maximum(values / np.iinfo(dtype).max, -1.0)
+    return values
+
+def test_roundtrip(glb_path):
+    print(f"\nTesting {os.path.basename(glb_path)}")
+    source = load_glb_mesh(glb_path)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        meshopt_path = compressed_path(glb_path)
+        if not os.path.exists(meshopt_path):
+            # Built directly: compress_glb drops variants that are not smaller than the source
+            meshopt_path = os.path.join(temp_dir, os.path.basename(meshopt_path))
+            write_glb(meshopt_path, *build_compressed_glb(source))
+        print(f"Decoding {meshopt_path}")
+        gltf, bin_data = read_glb(meshopt_path)
+
+    views = decode_views(gltf, bin_data)
+    primitive = gltf['meshes'][0]['primitives'][0]
+    quantized = quantize_mesh(source)
+    node = gltf['nodes'][0]
+    passed = True
+
+    def check(name, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'OK  ' if ok else 'FAIL'} {name}: {detail}")
+
+    if meshoptimizer is not None:
+        reference = decode_views(gltf, bin_data, reference=True)
+        check("reference decoder", all(np.array_equal(views[i], reference[i]) for i in views),
+              f"{len(views)} streams match meshoptimizer {getattr(meshoptimizer, '__version__', '')}".rstrip())
+    else:
+        print("  SKIP reference decoder: meshoptimizer is not installed")
+
+    # The decoded streams must be exactly the quantized bytes that were encoded
+    for name, accessor_index in primitive['attributes'].items():
+        decoded = views[gltf['accessors'][accessor_index]['bufferView']]
+        expected = quantized[name].view(np.uint8).reshape(len(decoded), -1)
+        check(f"{name} bytes", np.array_equal(decoded, expected), f"{decoded.shape[0]} vertices x {decoded.shape[1]} bytes")
+    indices = read_decoded_accessor(gltf, views, primitive['indices'])
+    check("indices", np.array_equal(indices, source['faces'].reshape(-1)), f"{len(indices)} indices")
+
+    # And dequantize to within half a quantization step of the source
+    positions = read_decoded_accessor(gltf, views, primitive['attributes']['POSITION'])
+    positions = positions * np.array(node['scale']) + np.array(node['translation'])
+    error = float(np.abs(positions - source['positions']).max())
+    check("positions", error <= node['scale'][0] / 2 + 1e-6, f"max error {error:.3g} (step {node['scale'][0]:.3g})")
+
+    if 'NORMAL' in primitive['attributes']:
+        normals = read_decoded_accessor(gltf, views, primitive['attributes']['NORMAL'])
+        step = 1.0 / ((1 << (COMPRESSION_CONFIG['normal_bits'] - 1)) - 1)
+        error = float(np.abs(normals - np.clip(source['normals'], -1.0, 1.0)).max())
+        check("normals", error <= step / 2 + 1e-6, f"max error {error:.3g}")
+
+    if 'TEXCOORD_0' in primitive['attributes']:
+        uvs = read_decoded_accessor(gltf, views, primitive['attributes']['TEXCOORD_0'])
+        accessor = gltf['accessors'][primitive['attributes']['TEXCOORD_0']]
+        step = 1.0 / ((1 << COMPRESSION_CONFIG['uv_bits']) - 1) if accessor.get('normalized') else 0.0
+        error = float(np.abs(uvs - source['uvs']).max())
+        check("uvs", error <= step / 2 + 1e-6, f"max error {error:.3g}")
+
+    return passed
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python test_meshopt_roundtrip.py <source.glb> [...]")
+        sys.exit(1)
+    results = [test_roundtrip(path) for path in sys.argv[1:]]
+    print(f"\n{sum(results)}/{len(results)} files round-tripped")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,170 @@
+import numpy as np
+
+ATLAS_CONFIG = {
+    'padding': 4,            # Edge-extended gutter around each region, in pixels
+    'solid_size': 4,         # Region size for materials without a texture
+    'max_size': 2048,
+    'scale_steps': 10        # Binary search steps for the region scale when the regions do not fit max_size
+}
+
+def next_power_of_two(value):
+    """Smallest power of two not below value."""
+    return 1 << max(int(np.ceil(np.log2(max(value, 1)))), 0)
+
+def skyline_pack(sizes, width):
+    """
+    Place (w, h) rectangles bottom-left on a skyline of the given width.
+
+    Every rectangle is tested against all x positions at once: a sliding
+    window maximum over the skyline gives the resting height per position.
+    Returns the (x, y) offsets in input order and the used height.
+    """
+    skyline = np.zeros(width, dtype=np.int64)
+    offsets = np.zeros((len(sizes), 2), dtype=np.int64)
+    for i in np.argsort(-sizes[:, 1], kind='stable'):
+        w, h = sizes[i]
+        resting = np.lib.stride_tricks.sliding_window_view(skyline, w).max(axis=1)
+        x = int(np.argmin(resting + h))
+        y = int(resting[x])
+        skyline[x:x + w] = y + h
+        offsets[i] = (x, y)
+    return offsets, int(skyline.max())
+
+def pack_rects(sizes, max_size=None):
+    """
+    Pack rectangles into the smallest power-of-two atlas, preferring square
+    layouts. Widths stop at max_size; the caller checks the height.
+    """
+    max_size = max_size or ATLAS_CONFIG['max_size']
+    sizes = np.asarray(sizes, dtype=np.int64)
+    width = next_power_of_two(max(int(sizes[:, 0].max()), np.sqrt((sizes[:, 0] * sizes[:, 1]).sum())))
+    best = None
+    while True:
+        offsets, height = skyline_pack(sizes, width)
+        atlas_size = (width, next_power_of_two(height))
+        if best is None or atlas_size[0] * atlas_size[1] < best[1][0] * best[1][1]:
+            best = (offsets, atlas_size)
+        if height <= width or width >= max_size:
+            return best
+        width *= 2
+
+def resize_region(pixels, width, height):
+    """Resample an (H, W, 4) float region: box-average by the integer factor, then bilinear for the rest."""
+    source_height, source_width = pixels.shape[:2]
+    if (source_width, source_height) == (width, height):
+        return pixels
+    fy, fx = max(source_height // height, 1), max(source_width // width, 1)
+    if fx > 1 or fy > 1:
+        h, w = source_height // fy * fy, source_width // fx * fx
+        pixels = pixels[:h, :w].reshape(h // fy, fy, w // fx, fx, -1).mean(axis=(1, 3))
+        source_height, source_width = pixels.shape[:2]
+    ys = np.clip((np.arange(height) + 0.5) * source_height / height - 0.5, 0, source_height - 1)
+    xs = np.clip((np.arange(width) + 0.5) * source_width / width - 0.5, 0, source_width - 1)
+    y0, x0 = np.floor(ys).astype(np.int64), np.floor(xs).astype(np.int64)
+    y1, x1 = np.minimum(y0 + 1, source_height - 1), np.minimum(x0 + 1, source_width - 1)
+    wy, wx = (ys - y0)[:, None, None], (xs - x0)[None, :, None]
+    top = pixels[y0][:, x0] * (1 - wx) + pixels[y0][:, x1] * wx
+    bottom = pixels[y1][:, x0] * (1 - wx) + pixels[y1][:, x1] * wx
+    return (top * (1 - wy) + bottom * wy).astype(np.float32)
+
+def uv_region(uvs, image_size):
+    """Pixel rectangle of an image covered by a set of UVs, clamped to the image."""
+    width, height = image_size
+    uv_min = np.clip(uvs.min(axis=0), 0.0, 1.0)
+    uv_max = np.clip(uvs.max(axis=0), 0.0, 1.0)
+    x0, y0 = np.floor(uv_min * (width, height)).astype(np.int64)
+    x1, y1 = np.ceil(uv_max * (width, height)).astype(np.int64)
+    return int(x0), int(y0), max(int(x1), int(x0) + 1), max(int(y1), int(y0) + 1)
+
+def build_atlas(entries, max_size=None):
+    """
+    Blit the used region of every material into one atlas.
+
+    Each entry has 'uvs' (loop UVs of the material's faces) and either an
+    'image' (H, W, 4) float array with row 0 at v = 0, as Blender stores
+    pixels, or a solid 'color'. Textured regions are scaled down uniformly
+    until the atlas fits max_size (capped at ATLAS_CONFIG['max_size']) on
+    both sides. Returns the atlas, one (scale, offset) UV transform per
+    entry and the packing stats.
+    """
+    max_size = min(max_size or ATLAS_CONFIG['max_size'], ATLAS_CONFIG['max_size'])
+    padding = ATLAS_CONFIG['padding']
+    regions = []
+    for entry in entries:
+        if entry.get('image') is not None and len(entry['uvs']):
+            height, width = entry['image'].shape[:2]
+            x0, y0, x1, y1 = uv_region(entry['uvs'], (width, height))
+            pixels = entry['image'][y0:y1, x0:x1]
+            solid = False
+        else:
+            size = ATLAS_CONFIG['solid_size']
+            pixels = np.broadcast_to(np.asarray(entry.get('color', (1, 1, 1, 1)), dtype=np.float32), (size, size, 4))
+            width = height = size
+            x0, y0, x1, y1 = 0, 0, size, size
+            solid = True
+        regions.append({'pixels': pixels, 'rect': (x0, y0, x1, y1), 'image_size': (width, height), 'solid': solid})
+
+    source_sizes = np.array([r['pixels'].shape[1::-1] for r in regions], dtype=np.int64)
+    textured = np.array([not r['solid'] for r in regions])
+
+    def pack(region_scale):
+        scaled = source_sizes.copy()
+        scaled[textured] = np.maximum(np.round(source_sizes[textured] * region_scale), 1).astype(np.int64)
+        offsets, atlas_size = pack_rects(scaled + 2 * padding, max_size)
+        return scaled, offsets, atlas_size
+
+    # Padding and power-of-two rounding don't scale with the regions, so search for the largest scale that fits
+    region_scale = 1.0
+    packed = pack(region_scale)
+    if max(packed[2]) > max_size and textured.any():
+        low, high, packed = 0.0, 1.0, pack(0.0)
+        for _ in range(ATLAS_CONFIG['scale_steps']):
+            middle = (low + high) / 2
+            candidate = pack(middle)
+            if max(candidate[2]) <= max_size:
+                low, packed = middle, candidate
+            else:
+                high = middle
+        region_scale = low
+    scaled, offsets, (atlas_width, atlas_height) = packed
+    atlas = np.zeros((atlas_height, atlas_width, 4), dtype=np.float32)
+
+    transforms = []
+    for region, (x, y), (w, h) in zip(regions, offsets, scaled):
+        pixels = resize_region(np.asarray(region['pixels']), int(w), int(h))
+        # Edge-extend into the gutter so bilinear filtering and mips don't bleed
+        atlas[y:y + h + 2 * padding, x:x + w + 2 * padding] = np.pad(
+            pixels, ((padding, padding), (padding, padding), (0, 0)), mode='edge')
+
+        # Map old UV -> pixel in the source region -> pixel in the atlas -> new UV
+        x0, y0, x1, y1 = region['rect']
+        image_width, image_height = region['image_size']
+        if region['solid']:
+            scale = np.zeros(2)
+            offset = (np.array([x, y]) + padding + (w / 2.0, h / 2.0)) / (atlas_width, atlas_height)
+        else:
+            # Source pixels per atlas pixel of this region, per axis
+            ratio = np.array([w / (x1 - x0), h / (y1 - y0)])
+            scale = np.array([image_width, image_height]) * ratio / (atlas_width, atlas_height)
+            offset = (np.array([x, y]) + padding - np.array([x0, y0]) * ratio) / (atlas_width, atlas_height)
+        transforms.append((scale, offset))
+
+    used = float((scaled[:, 0] * scaled[:, 1]).sum())
+    stats = {
+        'atlas_size': [atlas_width, atlas_height],
+        'regions': len(regions),
+        'region_scale': round(region_scale, 4),
+        'fill_ratio': round(used / (atlas_width * atlas_height), 4)
+    }
+    return atlas, transforms, stats
+
+def remap_uvs(uvs, material_indices, transforms):
+    """Move every loop UV into its material's atlas region."""
+    scales = np.array([t[0] for t in transforms])
+    offsets = np.array([t[1] for t in transforms])
+    clamped = np.clip(uvs, 0.0, 1.0)
+    return clamped * scales[material_indices] + offsets[material_indices]
+
+def texture_memory(sizes, bytes_per_pixel=4):
+    """Uncompressed RGBA8 texture memory including a full mip chain."""
+    return int(sum(w * h * bytes_per_pixel * 4 // 3 for w, h in sizes))
@@ -0,0 +1,122 @@
+import io
+import os
+import hashlib
+import tempfile
+
+from image_header import sniff_format, read_image_header, PNG_SIGNATURE, TruncatedHeader
+
+UPLOAD_CONFIG = {
+    # The normalized output, not the upload, has to meet the 10MB Masterpiece X limit; matches MAX_CONTENT_LENGTH
+    'max_bytes': int(os.getenv('UPLOAD_MAX_BYTES', str(16 * 1024 * 1024))),
+    'formats': ['PNG', 'JPEG'],
+    'header_bytes': 256 * 1024     # Kept by HeaderStream, and past that until IHDR/tRNS or the JPEG frame header is complete
+}
+
+class UploadRejected(Exception):
+    """An upload failed a check while it was being received."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class IngestStream:
+    """
+    Writable upload target for the multipart parser.
+
+    Every chunk goes straight to a temporary file next to its destination
+    while the SHA-256 and size are updated; the format is sniffed from the
+    first bytes and the size limit is enforced per chunk, so a bad upload
+    is rejected and its partial file removed before the rest is received.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.max_bytes = max_bytes or UPLOAD_CONFIG['max_bytes']
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.format = None
+        self._head = b''
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+
+    def _sniff(self):
+        self.format = sniff_format(self._head)
+        if self.format not in UPLOAD_CONFIG['formats']:
+            self.close()
+            raise UploadRejected(f"Unsupported file type. Allowed: {', '.join(UPLOAD_CONFIG['formats'])}", 415)
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.close()
+            raise UploadRejected(f"File exceeds the {self.max_bytes // (1024 * 1024)}MB limit", 413)
+        if self.format is None:
+            self._head += data[:len(PNG_SIGNATURE) - len(self._head)]
+            if len(self._head) >= len(PNG_SIGNATURE):
+                self._sniff()
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def finalize(self, path):
+        """
+        Move the received file to its destination and describe it.
+
+        Returns the digest, size and header fields (format, width, height,
+        mode, alpha) read from the header bytes alone.
+        """
+        if self.format is None:
+            self._sniff()
+        self._file.flush()
+        header = read_image_header(self._file)
+        self._file.close()
+        os.replace(self.temp_path, path)
+        return dict(header, sha256=self.sha256.hexdigest(), size=self.size)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+class HeaderStream:
+    """
+    Upload target for validation-only requests: keeps the leading header
+    bytes in memory and counts the rest without storing it.
+
+    header_bytes covers the usual metadata; when large EXIF or ICC
+    segments push the frame header past it, buffering continues until the
+    header parses or max_bytes is reached. The full size is still counted,
+    so an oversized file is reported invalid by the size check.
+    """
+
+    def __init__(self, header_bytes=None, max_bytes=None):
+        self.header_bytes = header_bytes or UPLOAD_CONFIG['header_bytes']
+        self.max_bytes = max_bytes or UPLOAD_CONFIG['max_bytes']
+        self.size = 0
+        self._head = io.BytesIO()
+        self._complete = False
+
+    def _header_complete(self):
+        try:
+            read_image_header(self._head)
+        except TruncatedHeader:
+            return False
+        except ValueError:
+            pass  # Malformed or unsupported; more bytes will not change the verdict
+        return True
+
+    def write(self, data):
+        if not self._complete:
+            self._head.seek(0, os.SEEK_END)
+            self._head.write(data[:self.max_bytes - self._head.tell()])
+            if self._head.tell() >= self.max_bytes:
+                self._complete = True
+            elif self._head.tell() >= self.header_bytes:
+                self._complete = self._header_complete()
+        self.size += len(data)
+        return len(data)
+
+    def __getattr__(self, name):
+        return getattr(self._head, name)
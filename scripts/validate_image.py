@@ -3,67 +3,113 @@ import sys
 import json
 from PIL import Image
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from image_header import read_image_header
+from normalize_image import NORMALIZE_CONFIG
+from upload_ingest import UPLOAD_CONFIG
+
+def describe_image(f):
+    """
+    Format, size and color layout of an image file object.
+
+    PNG and JPEG are read from their headers alone; other formats fall back
+    to Pillow, which also stops at the header without decoding pixels.
+    """
+    try:
+        return read_image_header(f)
+    except ValueError:
+        f.seek(0)
+        with Image.open(f) as img:
+            return {
+                'format': img.format,
+                'width': img.size[0],
+                'height': img.size[1],
+                'mode': img.mode,
+                'has_alpha': 'A' in img.getbands() or 'transparency' in img.info
+            }
+
+def check_image(info, file_size_bytes):
+    """
+    Check image header fields against the Masterpiece X input requirements.
+
+    Resolutions outside the MPX range pass with "normalize" set, since
+    normalize_image brings them within it before submission; the byte
+    limit is the upload limit for the same reason.
+    """
+    width, height = info['width'], info['height']
+    format = info['format']
+    file_size = file_size_bytes / (1024 * 1024)  # Size in MB
+    max_file_size = UPLOAD_CONFIG['max_bytes'] / (1024 * 1024)
+    
+    requirements_status = {
+        "success": True,
+        "current": {
+            "width": width,
+            "height": height,
+            "format": format,
+            "file_size_mb": round(file_size, 2),
+            "mode": info.get('mode'),
+            "has_alpha": info.get('has_alpha')
+        },
+        "requirements": {
+            "min_resolution": "512x512",
+            "max_resolution": "4096x4096",
+            "formats": ["JPEG", "PNG"],
+            "max_file_size_mb": round(max_file_size, 2)
+        },
+        "checks": {
+            "resolution": True,
+            "format": True,
+            "file_size": True
+        },
+        "normalize": False,
+        "message": "Image meets all requirements"
+    }
+    
+    # Out-of-range resolutions are fixed by normalize_image rather than rejected
+    if width < 512 or height < 512 or width > 4096 or height > 4096:
+        requirements_status["normalize"] = True
+        requirements_status["message"] = (
+            f"Image resolution ({width}x{height}) is outside 512x512-4096x4096; it will be normalized "
+            f"to {NORMALIZE_CONFIG['min_size']}-{NORMALIZE_CONFIG['max_size']}px before conversion"
+        )
+    
+    # Check format
+    if format not in ['JPEG', 'PNG']:
+        requirements_status["success"] = False
+        requirements_status["checks"]["format"] = False
+        requirements_status["message"] = f"Invalid format: {format}. Must be JPEG or PNG"
+        return requirements_status
+    
+    # Check file size
+    if file_size > max_file_size:
+        requirements_status["success"] = False
+        requirements_status["checks"]["file_size"] = False
+        requirements_status["message"] = f"File size ({round(file_size, 2)}MB) exceeds {round(max_file_size, 2)}MB limit"
+        return requirements_status
+        
+    return requirements_status
+
+def validate_image_stream(f, file_size_bytes):
+    """
+    Validates an open image file object of the given size
+    """
+    try:
+        return check_image(describe_image(f), file_size_bytes)
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error checking image: {str(e)}",
+            "error": str(e)
+        }
+
 def validate_image(image_path):
     """
     Validates image and returns detailed feedback about requirements
     """
     try:
-        with Image.open(image_path) as img:
-            width, height = img.size
-            format = img.format
-            file_size = os.path.getsize(image_path) / (1024 * 1024)  # Size in MB
-            
-            requirements_status = {
-                "success": True,
-                "current": {
-                    "width": width,
-                    "height": height,
-                    "format": format,
-                    "file_size_mb": round(file_size, 2)
-                },
-                "requirements": {
-                    "min_resolution": "512x512",
-                    "max_resolution": "4096x4096",
-                    "formats": ["JPEG", "PNG"],
-                    "max_file_size_mb": 10
-                },
-                "checks": {
-                    "resolution": True,
-                    "format": True,
-                    "file_size": True
-                },
-                "message": "Image meets all requirements"
-            }
-            
-            # Check resolution
-            if width < 512 or height < 512:
-                requirements_status["success"] = False
-                requirements_status["checks"]["resolution"] = False
-                requirements_status["message"] = f"Image resolution ({width}x{height}) is too low. Minimum required: 512x512"
-                return requirements_status
-                
-            if width > 4096 or height > 4096:
-                requirements_status["success"] = False
-                requirements_status["checks"]["resolution"] = False
-                requirements_status["message"] = f"Image resolution ({width}x{height}) is too high. Maximum allowed: 4096x4096"
-                return requirements_status
-            
-            # Check format
-            if format not in ['JPEG', 'PNG']:
-                requirements_status["success"] = False
-                requirements_status["checks"]["format"] = False
-                requirements_status["message"] = f"Invalid format: {format}. Must be JPEG or PNG"
-                return requirements_status
-            
-            # Check file size
-            if file_size > 10:
-                requirements_status["success"] = False
-                requirements_status["checks"]["file_size"] = False
-                requirements_status["message"] = f"File size ({round(file_size, 2)}MB) exceeds 10MB limit"
-                return requirements_status
-                
-            return requirements_status
-            
+        with open(image_path, 'rb') as f:
+            return validate_image_stream(f, os.path.getsize(image_path))
     except Exception as e:
         return {
             "success": False,